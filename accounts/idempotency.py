@@ -0,0 +1,169 @@
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from config.metrics import counter
+from .models import IdempotencyKey
+
+# Idempotency-Key 헤더로 POST 재시도를 한 번만 처리
+# - (사용자, 키)마다 첫 응답을 DB에 저장하고, 같은 키로 다시 오면 저장된 응답을 그대로 돌려줌
+# - 첫 요청이 아직 처리 중이면 끝날 때까지 기다렸다가 그 결과를 돌려줌 (워커 프로세스가 달라도 동작)
+# - 5xx/예외는 저장하지 않음 -> 클라이언트가 같은 키로 재시도하면 다시 처리
+# - 본문 해시를 같이 저장해, 같은 키로 내용이 다른 요청이 오면 저장된 응답 대신 422
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.25  # 처리 중인 요청을 기다릴 때 확인 간격(초)
+
+
+def _request_digest(request) -> str:
+    """
+    파싱된 본문(request.data)의 sha256. JSON/폼/multipart 어느 형식이든 같은 값이면 같은 해시
+    업로드 파일은 내용을 조각으로 읽어 해시 (request.body는 큰 업로드에서 메모리 제한에 걸림)
+    """
+    data = request.data
+    h = hashlib.sha256()
+    if hasattr(data, "lists"):  # QueryDict (폼/multipart, 파일 포함)
+        for name, values in sorted(data.lists(), key=lambda item: item[0]):
+            h.update(json.dumps(name).encode())
+            for value in values:
+                if hasattr(value, "chunks"):
+                    h.update(f"file:{value.name}:{value.size}:".encode())
+                    for chunk in value.chunks():
+                        h.update(chunk)
+                    value.seek(0)
+                else:
+                    h.update(json.dumps(str(value), ensure_ascii=False).encode())
+    else:
+        h.update(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode())
+    return h.hexdigest()
+
+
+def _claim(user, key: str, path: str, digest: str):
+    """
+    키를 새로 잡으면 (row, True), 이미 있으면 (row, False)
+    만료된 행(보관 기간이 지났거나 처리하던 워커가 죽은 경우)은 지우고 다시 잡는다.
+    """
+    for _ in range(3):
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                row = IdempotencyKey.objects.create(
+                    user=user,
+                    key=key,
+                    path=path,
+                    request_digest=digest,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+                )
+            return row, True
+        except IntegrityError:
+            pass
+
+        row = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if row is None:
+            continue
+        if row.expires_at > now:
+            return row, False
+        IdempotencyKey.objects.filter(pk=row.pk, expires_at__lte=now).delete()
+    return None, False
+
+
+def _wait_for(row):
+    # 첫 요청이 끝나길 기다림. 첫 요청이 실패해 키를 놓으면 None
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        row = IdempotencyKey.objects.filter(pk=row.pk).first()
+        if row is None or row.status == "done":
+            return row
+    return row
+
+
+def _replay(row) -> Response:
+    counter("accounts.idempotency.replayed").inc()
+    return Response(row.response_body, status=row.response_status, headers={"Idempotent-Replayed": "true"})
+
+
+def _run_and_store(row, view_method, view, request, args, kwargs):
+    try:
+        response = view_method(view, request, *args, **kwargs)
+    except Exception:
+        IdempotencyKey.objects.filter(pk=row.pk).delete()
+        raise
+
+    if response.status_code >= 500 or not hasattr(response, "data"):
+        IdempotencyKey.objects.filter(pk=row.pk).delete()
+        return response
+
+    # 처리 중 잠금이 만료돼 다른 요청이 키를 가져갔다면 (status가 running이 아님) 덮어쓰지 않음
+    IdempotencyKey.objects.filter(pk=row.pk, status="running").update(
+        status="done",
+        response_status=response.status_code,
+        response_body=response.data,
+        expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    )
+    return response
+
+
+def idempotent(view_method):
+    """
+    APIView의 post 등에 붙이는 데코레이터. Idempotency-Key 헤더가 없으면 그대로 실행.
+    같은 키를 다른 API나 다른 본문에 쓰면 422, 기다려도 첫 요청이 안 끝나면 409
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} 헤더는 1~{MAX_KEY_LENGTH}자여야 합니다."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        path = request.path[:255]
+        digest = _request_digest(request)
+        for _ in range(2):
+            row, created = _claim(request.user, key, path, digest)
+            if created:
+                return _run_and_store(row, view_method, self, request, args, kwargs)
+            if row is None:
+                break
+            if row.path != path:
+                return Response(
+                    {"detail": f"이미 다른 요청({row.path})에 사용한 {HEADER}입니다."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            # 해시가 비어 있으면 이 필드가 생기기 전에 저장된 키
+            if row.request_digest and row.request_digest != digest:
+                counter("accounts.idempotency.body_mismatch").inc()
+                return Response(
+                    {"detail": f"같은 {HEADER}로 내용이 다른 요청을 보냈습니다."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if row.status == "running":
+                counter("accounts.idempotency.waited").inc()
+                row = _wait_for(row)
+                if row is None:
+                    continue  # 첫 요청이 실패해 키를 놓음 -> 이번 요청이 처리
+            if row.status == "done":
+                return _replay(row)
+            break
+
+        return Response(
+            {"detail": f"같은 {HEADER}의 요청이 아직 처리 중입니다."},
+            status=status.HTTP_409_CONFLICT,
+            headers={"Retry-After": "1"},
+        )
+
+    return wrapper
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = '보관 기간이 지난 Idempotency-Key 응답을 삭제합니다. (cron 등으로 주기 실행)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = 0
+        while True:
+            ids = list(
+                IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'만료된 Idempotency-Key 삭제: {deleted}건'))
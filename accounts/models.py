@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 
 class User(AbstractUser):
     # AbstractUser의 기본 필드(username, email, password 등)를 재정의하지 않습니다.
@@ -46,4 +47,24 @@ class RewardHistory(models.Model):
         indexes = [
             models.Index(fields=['user', '-created']),
         ]
-        ordering = ['-created']
\ No newline at end of file
+        ordering = ['-created']
+
+class IdempotencyKey(models.Model):
+    # 클라이언트 재시도(Idempotency-Key 헤더)의 첫 응답 저장 (accounts/idempotency.py)
+    STATUS_CHOICES = [("running", "running"), ("done", "done")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)  # 같은 키를 다른 API에 다시 쓰면 거절
+    request_digest = models.CharField(max_length=64, blank=True, default="")  # 요청 본문 sha256, 같은 키로 다른 본문이 오면 거절
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="running")
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created = models.DateTimeField(auto_now_add=True)
+    # running이면 처리 중 잠금 만료 시각, done이면 저장된 응답의 보관 만료 시각
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
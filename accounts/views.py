@@ -11,6 +11,7 @@ from django.db.models import Count
 from django.db import transaction
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from .models import User, RewardHistory
+from .idempotency import idempotent
 
 from json import JSONDecodeError
 from django.http import JsonResponse
@@ -175,6 +176,7 @@ class RewardView(APIView):
         )
 
 
+    @idempotent
     def post(self, request):
         serializer = RewardChangeSerializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
@@ -0,0 +1,92 @@
+from collections import defaultdict
+from datetime import date, datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Feedback, FeedbackTagDailyCount
+
+# 피드백 태그 일별 집계
+# 채팅마다 Feedback 전체를 조인/집계하지 않도록, 피드백 저장 때 (날짜, 태그, 사용자) 카운터를 올려 두고 읽을 때는 일수만큼만 합산
+# (날짜, 태그, 사용자)마다 한 행 (유니크 제약). 두 요청이 동시에 처음 행을 만들면 늦은 쪽은 F() 증가로 바꿔 반영
+
+
+def _as_day(value) -> date:
+    if isinstance(value, datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def bump_feedback_tag_counts(tag_ids, user_id=None, day=None, delta: int = 1):
+    """피드백 1건의 태그들을 집계에 반영. 피드백 저장과 같은 트랜잭션 안에서 호출"""
+    day = _as_day(day) if day is not None else timezone.localdate()
+    scopes = (None, user_id) if user_id is not None else (None,)
+    for scope in scopes:
+        for tag_id in tag_ids:
+            _bump(day, tag_id, scope, delta)
+
+
+def _bump(day, tag_id, user_id, delta: int):
+    rows = FeedbackTagDailyCount.objects.filter(day=day, tag_id=tag_id, user_id=user_id)
+    if rows.update(count=F("count") + delta) or delta <= 0:
+        return
+    try:
+        with transaction.atomic():
+            FeedbackTagDailyCount.objects.create(day=day, tag_id=tag_id, user_id=user_id, count=delta)
+    except IntegrityError:
+        # 다른 요청이 방금 같은 행을 만듦
+        rows.update(count=F("count") + delta)
+
+
+def top_tags_by_polarity(limit: int = 3, user=None, since=None, polarities=("positive", "negative")) -> dict:
+    """
+    집계 테이블에서 polarity별 상위 태그 이름 목록.
+    since는 날짜 단위 (그 날짜 전체 포함), user가 없으면 전체 합계 행만 읽음
+    """
+    qs = FeedbackTagDailyCount.objects.filter(tag__polarity__in=polarities)
+    if user is not None:
+        qs = qs.filter(user=user)
+    else:
+        qs = qs.filter(user__isnull=True)
+    if since is not None:
+        qs = qs.filter(day__gte=_as_day(since))
+
+    rows = (
+        qs.values("tag__tag", "tag__polarity")
+        .annotate(total=Sum("count"))
+        .filter(total__gt=0)
+    )
+    ranked = defaultdict(list)
+    for row in sorted(rows, key=lambda r: (-r["total"], r["tag__tag"])):
+        ranked[row["tag__polarity"]].append(row["tag__tag"])
+    return {polarity: ranked[polarity][:limit] for polarity in polarities}
+
+
+def rebuild_feedback_tag_counts(since=None) -> int:
+    """Feedback 이력에서 집계를 다시 만든다. since가 있으면 그 날짜부터만. 만든 행 수를 반환"""
+    links = Feedback.tags.through.objects.annotate(day=TruncDate("feedback__created"))
+    if since is not None:
+        links = links.filter(day__gte=_as_day(since))
+    grouped = links.values("day", "feedbacktag_id", "feedback__user_id").annotate(n=Count("id"))
+
+    totals = defaultdict(int)
+    for row in grouped.iterator():
+        totals[(row["day"], row["feedbacktag_id"], None)] += row["n"]
+        if row["feedback__user_id"] is not None:
+            totals[(row["day"], row["feedbacktag_id"], row["feedback__user_id"])] += row["n"]
+
+    with transaction.atomic():
+        stale = FeedbackTagDailyCount.objects.all()
+        if since is not None:
+            stale = stale.filter(day__gte=_as_day(since))
+        stale.delete()
+        FeedbackTagDailyCount.objects.bulk_create(
+            [
+                FeedbackTagDailyCount(day=day, tag_id=tag_id, user_id=user_id, count=n)
+                for (day, tag_id, user_id), n in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
@@ -0,0 +1,54 @@
+import json
+
+# LLM이 '[{...}, {...}, ...]' 형태의 JSON 배열을 조각조각 보낼 때 완성된 원소(객체)를 바로 꺼내는 파서
+# 문자열 안의 괄호/따옴표(이스케이프 포함)는 무시하고 중괄호 깊이만 따라감
+
+
+class JsonArrayItems:
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item = None  # 현재 모으는 원소의 문자들
+        self.invalid = 0  # 완성됐지만 JSON으로 읽지 못한 원소 수
+
+    def feed(self, text: str) -> list[dict]:
+        """새 조각을 넣고 이번에 완성된 원소 목록을 반환"""
+        done = []
+        for ch in text:
+            collecting = self._item is not None
+            if self._in_string:
+                if collecting:
+                    self._item.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if collecting:
+                    self._item.append(ch)
+            elif ch in "[{":
+                self._depth += 1
+                if self._depth == 2 and ch == "{":
+                    self._item = []
+                if self._item is not None:
+                    self._item.append(ch)
+            elif ch in "]}":
+                if collecting:
+                    self._item.append(ch)
+                self._depth -= 1
+                if self._depth == 1 and collecting:
+                    raw = "".join(self._item)
+                    self._item = None
+                    try:
+                        done.append(json.loads(raw))
+                    except ValueError:
+                        self.invalid += 1
+            elif collecting:
+                self._item.append(ch)
+        return done
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+from config.metrics import counter, histogram
+
+# Gemini 클라이언트 공유
+# - 요청마다 genai.Client를 만들지 않고 프로세스마다 하나를 재사용 (httpx 커넥션 풀, keep-alive)
+# - 타임아웃/재시도(지수 백오프)는 settings의 GEMINI_* 값으로 SDK에 설정
+# - pre-fork 서버(gunicorn 등)에서 부모가 만든 클라이언트/소켓을 자식이 공유하지 않도록 pid 확인
+
+RETRY_STATUS = [408, 429, 500, 502, 503, 504]
+
+
+class LlmError(Exception):
+    def __init__(self, detail: str, status_code: int | None = None):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+def _build_client() -> genai.Client:
+    api_key = getattr(settings, "GEMINI_API_KEY", None)
+    if not api_key:
+        raise ImproperlyConfigured("GEMINI_API_KEY is not set in settings.")
+
+    pool_size = getattr(settings, "GEMINI_POOL_SIZE", 10)
+    http_options = genai_types.HttpOptions(
+        timeout=int(getattr(settings, "GEMINI_TIMEOUT", 30) * 1000),  # ms
+        retry_options=genai_types.HttpRetryOptions(
+            attempts=getattr(settings, "GEMINI_RETRY_ATTEMPTS", 3),
+            initial_delay=getattr(settings, "GEMINI_RETRY_INITIAL_DELAY", 0.5),
+            max_delay=getattr(settings, "GEMINI_RETRY_MAX_DELAY", 4),
+            http_status_codes=RETRY_STATUS,
+        ),
+        client_args={"limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)},
+    )
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+
+def get_llm_client() -> genai.Client:
+    # 처음 쓸 때 만들고 프로세스마다 하나
+    global _client, _client_pid
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = _build_client()
+            _client_pid = os.getpid()
+        return _client
+
+
+def generate_content(purpose: str, model: str, contents, config=None):
+    """
+    공유 클라이언트로 generate_content 호출. purpose("chat", "feedback")별로 지연/오류 지표를 남김
+    실패하면 LlmError
+    """
+    client = get_llm_client()
+    started = time.perf_counter()
+    try:
+        return client.models.generate_content(model=model, contents=contents, config=config)
+    except genai_errors.APIError as e:
+        counter(f"ai.llm.{purpose}.error").inc()
+        raise LlmError(f"LLM 호출 실패: HTTP {e.code} {e.message or ''}".strip(), status_code=e.code)
+    except httpx.TimeoutException as e:
+        counter(f"ai.llm.{purpose}.timeout").inc()
+        raise LlmError(f"LLM 호출 시간 초과: {e}")
+    except httpx.HTTPError as e:
+        counter(f"ai.llm.{purpose}.error").inc()
+        raise LlmError(f"LLM 호출 실패: {e}")
+    finally:
+        histogram(f"ai.llm.{purpose}.call_ms").observe((time.perf_counter() - started) * 1000)
+
+
+def stream_content(purpose: str, model: str, contents, config=None):
+    """
+    공유 클라이언트의 generate_content_stream 텍스트 조각을 차례로 내보내는 generator
+    첫 조각까지의 지연은 ai.llm.<purpose>.first_chunk_ms, 실패하면 LlmError
+    """
+    client = get_llm_client()
+    started = time.perf_counter()
+    first = True
+    try:
+        for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
+            text = chunk.text
+            if not text:
+                continue
+            if first:
+                histogram(f"ai.llm.{purpose}.first_chunk_ms").observe((time.perf_counter() - started) * 1000)
+                first = False
+            yield text
+    except genai_errors.APIError as e:
+        counter(f"ai.llm.{purpose}.error").inc()
+        raise LlmError(f"LLM 호출 실패: HTTP {e.code} {e.message or ''}".strip(), status_code=e.code)
+    except httpx.TimeoutException as e:
+        counter(f"ai.llm.{purpose}.timeout").inc()
+        raise LlmError(f"LLM 호출 시간 초과: {e}")
+    except httpx.HTTPError as e:
+        counter(f"ai.llm.{purpose}.error").inc()
+        raise LlmError(f"LLM 호출 실패: {e}")
+    finally:
+        histogram(f"ai.llm.{purpose}.call_ms").observe((time.perf_counter() - started) * 1000)
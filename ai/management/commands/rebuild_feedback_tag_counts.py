@@ -0,0 +1,25 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ai.feedback_counts import rebuild_feedback_tag_counts
+
+
+class Command(BaseCommand):
+    help = 'Feedback 이력에서 피드백 태그 일별 집계(FeedbackTagDailyCount)를 다시 만듭니다. (배포 직후 1회, 이후 어긋났을 때)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='최근 N일만 다시 계산 (없으면 전체)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days']:
+            since = timezone.localdate() - timedelta(days=options['days'] - 1)
+
+        started = time.perf_counter()
+        rows = rebuild_feedback_tag_counts(since=since)
+        elapsed = time.perf_counter() - started
+        scope = f'{since} 이후' if since else '전체'
+        self.stdout.write(self.style.SUCCESS(f'피드백 태그 집계 재계산 완료 ({scope}): {rows}행 ({elapsed:.1f}s)'))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0004_feedbacktagdailycount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatThread',
+            fields=[
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('thread_id', models.CharField(max_length=64)),
+                ('last_seq', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_threads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChatTurn',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('seq', models.PositiveIntegerField()),
+                ('role', models.CharField(max_length=10)),
+                ('parts', models.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turns', to='ai.chatthread')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='chatthread',
+            constraint=models.UniqueConstraint(fields=('user', 'thread_id'), name='chat_thread_user_tid_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='chatturn',
+            constraint=models.UniqueConstraint(fields=('thread', 'seq'), name='chat_turn_thread_seq_uniq'),
+        ),
+    ]
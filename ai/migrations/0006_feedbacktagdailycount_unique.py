@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:35
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_counts(apps, schema_editor):
+    # 유니크 제약을 걸기 전에 같은 (날짜, 태그, 사용자) 행을 하나로 합침
+    FeedbackTagDailyCount = apps.get_model('ai', 'FeedbackTagDailyCount')
+    duplicates = (
+        FeedbackTagDailyCount.objects.values('day', 'tag_id', 'user_id')
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('count'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        same = FeedbackTagDailyCount.objects.filter(day=row['day'], tag_id=row['tag_id'], user_id=row['user_id'])
+        same.exclude(id=row['keep']).delete()
+        FeedbackTagDailyCount.objects.filter(id=row['keep']).update(count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0005_chatthread_chatturn'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_counts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='feedbacktagdailycount',
+            constraint=models.UniqueConstraint(models.F('day'), models.F('tag'), django.db.models.functions.comparison.Coalesce('user', 0, output_field=models.IntegerField()), name='feedback_tag_count_day_tag_user_uniq'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from accounts.models import User
 
 # 추상 클래스
@@ -60,4 +61,53 @@ class Conversation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversations')
     category = models.CharField(max_length=40, null=False)
     topics = models.ManyToManyField(Topic, related_name="conversations", blank=False)
-    comment = models.TextField(blank=True, default="", max_length=500)
\ No newline at end of file
+    comment = models.TextField(blank=True, default="", max_length=500)
+
+class FeedbackTagDailyCount(models.Model):
+    # 날짜별 태그 사용 횟수 집계 (ai/feedback_counts.py)
+    # user가 NULL인 행은 전체 합계, user가 있는 행은 사용자별 합계 (피드백 1건이 두 행 모두 올림)
+    id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+    tag = models.ForeignKey(FeedbackTag, on_delete=models.CASCADE, related_name="daily_counts")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="feedback_tag_counts")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "day"], name="feedback_tag_count_user_day"),
+        ]
+        constraints = [
+            # (날짜, 태그, 사용자)마다 한 행. NULL끼리는 유니크 검사에 걸리지 않아 전체 합계 행은 user를 0으로 봄
+            models.UniqueConstraint(
+                "day", "tag", Coalesce("user", 0, output_field=models.IntegerField()),
+                name="feedback_tag_count_day_tag_user_uniq",
+            ),
+        ]
+
+
+class ChatThread(BaseModel):
+    # AI 채팅 스레드 (이전에는 세션의 chat_threads JSON에 전부 저장)
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chat_threads")
+    thread_id = models.CharField(max_length=64)  # 프론트가 보내는 값 (topic 등)
+    last_seq = models.PositiveIntegerField(default=0)  # 마지막 턴 번호
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "thread_id"], name="chat_thread_user_tid_uniq"),
+        ]
+
+
+class ChatTurn(models.Model):
+    # 턴은 추가만 함 (수정/재저장 없음), 최근 N개는 (thread, seq) 인덱스로 역순 조회
+    id = models.BigAutoField(primary_key=True)
+    thread = models.ForeignKey(ChatThread, on_delete=models.CASCADE, related_name="turns")
+    seq = models.PositiveIntegerField()
+    role = models.CharField(max_length=10)
+    parts = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["thread", "seq"], name="chat_turn_thread_seq_uniq"),
+        ]
@@ -0,0 +1,126 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+
+from config.metrics import counter, histogram
+from menu.models import Menu
+from stores.models import Store
+from .models import Topic
+
+# 채팅 프롬프트용 카탈로그 데이터 캐시 (store_id, category, topic) -> 토픽 예시, 메뉴 목록, 메뉴 가이드
+# 키에 점포/토픽 버전을 넣고, Menu/Store/Topic이 바뀌면 버전만 올려 이전 항목을 무효화 (ai/signals.py)
+# 버전 키는 기본 캐시에 있으므로 여러 워커가 같은 캐시 백엔드(Redis 등)를 써야 다른 프로세스에도 바로 반영됨
+# (프로세스별 locmem이면 PROMPT_CONTEXT_CACHE_TTL 동안 이전 값이 보일 수 있음)
+
+KEY_PREFIX = "ai:prompt_ctx"
+TOPIC_VERSION_KEY = f"{KEY_PREFIX}:ver:topics"
+
+
+def _store_version_key(store_id) -> str:
+    return f"{KEY_PREFIX}:ver:store:{store_id}"
+
+
+def _initial_version() -> int:
+    # 버전 키가 캐시에서 밀려나도 예전 버전 번호로 돌아가지 않도록 시각 기반으로 시작
+    return time.time_ns() // 1000
+
+
+def _versions(store_id) -> tuple[int, int]:
+    store_key = _store_version_key(store_id)
+    found = cache.get_many([store_key, TOPIC_VERSION_KEY])
+    versions = []
+    for key in (store_key, TOPIC_VERSION_KEY):
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _initial_version(), timeout=None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions[0], versions[1]
+
+
+def _bump(key: str):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+
+def invalidate_store(store_id):
+    _bump(_store_version_key(store_id))
+
+
+def invalidate_topics():
+    _bump(TOPIC_VERSION_KEY)
+
+
+# 메뉴 최대 3개 불러옴
+def get_store_menus_or_400(store_id):
+    store = get_object_or_404(Store, pk=store_id)
+    menus = list(
+        Menu.objects.filter(store=store)
+        .values("korean", "english", "price")[:3]
+    )
+
+    def fmt(m):
+        p = m.get("price")
+        return f'{m.get("korean")}' + ", price: " + (f'{p}' if p not in (None, "unknown") else "unknown")
+    menu_texts = [fmt(m) for m in menus]  # 0~3개
+    return store, menu_texts
+
+def build_menu_guide(menu_texts: list[str]) -> str:
+    if not menu_texts:
+        # 메뉴가 아예 없을 때: 메뉴 언급 강제 규칙을 비활성화
+        return (
+            "규칙:\n"
+            "이 매장은 등록된 메뉴가 없으므로 특정 메뉴 관련 대화 생성 절대 금지. "
+        )
+    # 1~3개 있는 만큼만 나열
+    bullet_lines = "\n".join(f"-{m}" for m in menu_texts)
+    return (
+        "규칙:\n"
+        "대화 맥락에서 특정 메뉴가 등장해야 하면 무조건 다음 메뉴들 중 하나를 선택해 생성.\n"
+        f"{bullet_lines}\n"
+        "메뉴가 필요 없는 상황에 억지로 넣어서 대화 생성 금지.\n"
+        "허용 목록 외 메뉴명 등장 시 응답 전부 무효이며 즉시 재생성.\n"
+    )
+
+
+def _build(store_id, category, topic) -> dict:
+    caption = get_object_or_404(Topic, category=category, topic=topic).caption
+    store, menu_texts = get_store_menus_or_400(store_id)
+    return {
+        "caption": caption,
+        "store": {"id": store.store_id, "name": getattr(store, "store_name", None)},
+        "menu_texts": menu_texts,
+        "menu_guide": build_menu_guide(menu_texts),
+    }
+
+
+def get_prompt_context(store_id, category, topic) -> dict:
+    """
+    {caption, store: {id, name}, menu_texts, menu_guide}
+    토픽/점포가 없으면 Http404 (캐시하지 않음)
+    """
+    started = time.perf_counter()
+    store_version, topic_version = _versions(store_id)
+    topic_hash = hashlib.sha1(f"{category}\x00{topic}".encode()).hexdigest()
+    key = f"{KEY_PREFIX}:{store_id}:{store_version}:{topic_version}:{topic_hash}"
+
+    context = cache.get(key)
+    if context is not None:
+        lookup_ms = (time.perf_counter() - started) * 1000
+        counter("ai.prompt_context.hit").inc()
+        # 절약한 시간 = 미스 때의 평균 생성 시간 - 이번 캐시 조회 시간
+        built = histogram("ai.prompt_context.build_ms")
+        if built.count:
+            counter("ai.prompt_context.saved_ms").inc(max(0, round(built.sum / built.count - lookup_ms)))
+        return context
+
+    counter("ai.prompt_context.miss").inc()
+    context = _build(store_id, category, topic)
+    cache.set(key, context, timeout=settings.PROMPT_CONTEXT_CACHE_TTL)
+    histogram("ai.prompt_context.build_ms").observe((time.perf_counter() - started) * 1000)
+    return context
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import Feedback, Topic, Conversation
 
 class ChatRequestSerializer(serializers.Serializer):
+    store_id = serializers.IntegerField(required=False)  # 없으면 점포를 찾지 못해 404
     thread_id = serializers.CharField(max_length=64, allow_blank=False)
     category = serializers.ChoiceField(
         choices=("fresh", "snacks", "goods", "restaurants"),
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from menu.models import Menu
+from stores.models import Store
+from .models import Topic
+from .prompt_context import invalidate_store, invalidate_topics
+
+
+# 카탈로그가 바뀌면 채팅 프롬프트 캐시 무효화
+@receiver([post_save, post_delete], sender=Store)
+def invalidate_store_prompt_context(sender, instance, **kwargs):
+    invalidate_store(instance.store_id)
+
+
+@receiver([post_save, post_delete], sender=Menu)
+def invalidate_menu_prompt_context(sender, instance, **kwargs):
+    invalidate_store(instance.store_id)
+
+
+@receiver([post_save, post_delete], sender=Topic)
+def invalidate_topic_prompt_context(sender, instance, **kwargs):
+    invalidate_topics()
@@ -1,3 +1,276 @@
-from django.test import TestCase
+import json
+import random
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, QuerySet
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from markets.models import Market
+from stores.models import Store
+from .feedback_counts import bump_feedback_tag_counts, rebuild_feedback_tag_counts, top_tags_by_polarity
+from .json_stream import JsonArrayItems
+from .models import Feedback, FeedbackTag, FeedbackTagDailyCount, Topic
+
+ITEMS = [
+    {"store": "가게 {1}", "reason": "말 \"따옴표\"와 [대괄호]"},
+    {"store": "역슬래시\\", "reason": "끝이 \\\\ 인 문자열 } ]"},
+    {"store": "중첩", "tags": [{"a": 1}, {"b": [2, 3]}], "note": "é \\u0022"},
+    {"store": "", "reason": "{\"not\": \"nested\"}"},
+]
+
+
+class JsonArrayItemsTests(SimpleTestCase):
+    # LLM 응답 조각을 어떻게 잘라 넣어도 json.loads(전체)와 같은 원소가 나오는지
+
+    def setUp(self):
+        self.text = "```json\n" + json.dumps(ITEMS, ensure_ascii=False, indent=2) + "\n```"
+
+    def feed_chunks(self, chunks):
+        parser = JsonArrayItems()
+        items = []
+        for chunk in chunks:
+            items.extend(parser.feed(chunk))
+        return parser, items
+
+    def test_single_chunk(self):
+        parser, items = self.feed_chunks([self.text])
+        self.assertEqual(items, ITEMS)
+        self.assertEqual(parser.invalid, 0)
+
+    def test_one_character_at_a_time(self):
+        parser, items = self.feed_chunks(list(self.text))
+        self.assertEqual(items, ITEMS)
+        self.assertEqual(parser.invalid, 0)
+
+    def test_random_chunk_boundaries(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            cuts = sorted(rng.sample(range(1, len(self.text)), rng.randint(1, 30)))
+            chunks = [self.text[a:b] for a, b in zip([0] + cuts, cuts + [len(self.text)])]
+            with self.subTest(cuts=cuts):
+                self.assertEqual(self.feed_chunks(chunks)[1], ITEMS)
+
+    def test_escape_split_across_chunks(self):
+        text = json.dumps([{"q": 'a\\"}b'}])
+        split = text.index("\\") + 1  # 첫 조각이 역슬래시로 끝남
+        self.assertEqual(self.feed_chunks([text[:split], text[split:]])[1], [{"q": 'a\\"}b'}])
+
+        text = json.dumps([{"q": '"}'}])
+        split = text.index('\\"') + 1  # 이스케이프된 따옴표 앞에서 자름
+        self.assertEqual(self.feed_chunks([text[:split], text[split:]])[1], [{"q": '"}'}])
+
+    def test_item_emitted_when_it_closes(self):
+        text = json.dumps(ITEMS[:2], ensure_ascii=False)
+        first_end = len(json.dumps(ITEMS[0], ensure_ascii=False)) + 1  # "[" + 첫 원소
+        parser = JsonArrayItems()
+        self.assertEqual(parser.feed(text[:first_end - 1]), [])
+        self.assertEqual(parser.feed(text[first_end - 1:first_end]), [ITEMS[0]])
+        self.assertEqual(parser.feed(text[first_end:]), [ITEMS[1]])
+
+    def test_invalid_item_is_counted_and_skipped(self):
+        parser, items = self.feed_chunks(['[{"a": 1,}, ', '{"b": 2}]'])
+        self.assertEqual(items, [{"b": 2}])
+        self.assertEqual(parser.invalid, 1)
+
+
+def _legacy_top_tags(limit=3, user=None, since=None):
+    # 집계 테이블 도입 전: Feedback 전체를 태그별로 Count
+    fb_qs = Feedback.objects.all()
+    if user is not None:
+        fb_qs = fb_qs.filter(user=user)
+    if since is not None:
+        fb_qs = fb_qs.filter(created__gte=since)
+    tag_qs = (
+        FeedbackTag.objects.exclude(polarity="neutral")
+        .annotate(usage_count=Count("feedbacks", filter=Q(feedbacks__in=fb_qs), distinct=True))
+        .filter(usage_count__gt=0)
+    )
+    return {
+        polarity: list(
+            tag_qs.filter(polarity=polarity).order_by("-usage_count", "tag").values_list("tag", flat=True)[:limit]
+        )
+        for polarity in ("positive", "negative")
+    }
+
+
+class FeedbackTagRollupTests(TestCase):
+    # 일별 집계로 읽은 상위 태그가 Feedback 전체 집계와 같은지, rebuild 전후로 같은지
+
+    def setUp(self):
+        rng = random.Random(0)
+        tags = [
+            FeedbackTag.objects.create(tag=tag, polarity=polarity)
+            for polarity, tag in [
+                ("positive", "친절해요"), ("positive", "정확해요"), ("positive", "빨라요"), ("positive", "자세해요"),
+                ("negative", "느려요"), ("negative", "틀려요"), ("negative", "불친절해요"), ("neutral", "기타"),
+            ]
+        ]
+        self.users = [User.objects.create(email=f"fb{i}@example.com", username=f"fb{i}") for i in range(3)]
+        now = timezone.now()
+        for _ in range(150):
+            fb = Feedback.objects.create(user=rng.choice(self.users + [None]))
+            # 최근 10일에 흩어 놓음 (created는 auto_now_add라 저장 후 변경)
+            fb.created = now - timedelta(days=rng.randrange(10), minutes=rng.randrange(600))
+            Feedback.objects.filter(pk=fb.pk).update(created=fb.created)
+            chosen = rng.sample(tags, rng.randint(1, 3))
+            fb.tags.set(chosen)
+            bump_feedback_tag_counts([t.id for t in chosen], user_id=fb.user_id, day=fb.created)
+        self.since_day = timezone.localdate() - timedelta(days=3)
+        self.since = timezone.make_aware(datetime.combine(self.since_day, time.min))
+
+    def assertMatchesLegacy(self):
+        self.assertEqual(top_tags_by_polarity(), _legacy_top_tags())
+        self.assertEqual(top_tags_by_polarity(limit=10), _legacy_top_tags(limit=10))
+        self.assertEqual(top_tags_by_polarity(since=self.since_day), _legacy_top_tags(since=self.since))
+        for user in self.users:
+            with self.subTest(user=user.pk):
+                self.assertEqual(top_tags_by_polarity(user=user), _legacy_top_tags(user=user))
+                self.assertEqual(
+                    top_tags_by_polarity(user=user, since=self.since_day), _legacy_top_tags(user=user, since=self.since),
+                )
+
+    def rows(self):
+        return sorted(FeedbackTagDailyCount.objects.values_list("day", "tag_id", "user_id", "count"), key=str)
+
+    def test_incremental_counts_match_feedback_table(self):
+        self.assertMatchesLegacy()
+
+    def test_rebuild_reproduces_incremental_counts(self):
+        before = self.rows()
+        rebuild_feedback_tag_counts()
+        self.assertEqual(self.rows(), before)
+        self.assertMatchesLegacy()
+
+    def test_rebuild_repairs_lost_counts(self):
+        FeedbackTagDailyCount.objects.filter(day__gte=self.since_day).delete()
+        rebuild_feedback_tag_counts(since=self.since_day)
+        self.assertMatchesLegacy()
+
+        FeedbackTagDailyCount.objects.all().delete()
+        self.assertEqual(top_tags_by_polarity(), {"positive": [], "negative": []})
+        rebuild_feedback_tag_counts()
+        self.assertMatchesLegacy()
+
+
+class FeedbackTagCountUniqueTests(TestCase):
+    # (날짜, 태그, 사용자)마다 집계 행은 하나뿐이고, 동시에 처음 만드는 경우에도 합계가 맞음
+
+    def setUp(self):
+        self.tag = FeedbackTag.objects.create(tag="친절해요", polarity="positive")
+        self.user = User.objects.create(email="uniq@example.com", username="uniq")
+        self.day = timezone.localdate()
+
+    def test_duplicate_rows_are_rejected(self):
+        for user in (None, self.user):
+            FeedbackTagDailyCount.objects.create(day=self.day, tag=self.tag, user=user, count=1)
+            with self.subTest(user=user), self.assertRaises(IntegrityError), transaction.atomic():
+                FeedbackTagDailyCount.objects.create(day=self.day, tag=self.tag, user=user, count=1)
+
+    def test_bump_after_losing_create_race(self):
+        bump_feedback_tag_counts([self.tag.id], user_id=self.user.pk, day=self.day)
+        real_update = QuerySet.update
+        calls = []
+
+        def racing_update(qs, **kwargs):
+            # 첫 update는 다른 요청이 행을 만들기 전에 실행된 것처럼 0건
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else real_update(qs, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", racing_update):
+            bump_feedback_tag_counts([self.tag.id], day=self.day, delta=2)
+        self.assertEqual(
+            list(FeedbackTagDailyCount.objects.order_by("user_id").values_list("user_id", "count")),
+            [(None, 3), (self.user.pk, 1)],
+        )
+
+
+SUGGESTIONS = [{"korean": f"네{i}", "romanization": f"ne{i}", "english_gloss": f"yes{i}"} for i in range(3)]
+
+
+class ChatFormRequestTests(TestCase):
+    # 폼/multipart 본문(QueryDict)으로 와도 JSON 본문과 같은 값으로 채팅 턴을 만듦
+
+    def setUp(self):
+        market = Market.objects.create(market_name="광장시장")
+        self.store = Store.objects.create(
+            market=market,
+            store_name="가게",
+            road_address="서울 종로구 창경궁로 88",
+            street_address="서울 종로구 예지동 6-1",
+            store_english="store",
+        )
+        Topic.objects.create(category="fresh", topic="과일", caption="사과 있어요?")
+        self.user = User.objects.create(email="chat@example.com", username="chat")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.body = {
+            "store_id": str(self.store.store_id),
+            "thread_id": "fresh-과일",
+            "category": "fresh",
+            "topic": "과일",
+            "retry": "false",
+            "role": "user",
+            "message": "사과 얼마예요?",
+        }
+        self.calls = []
+
+    def fake_generate(self, purpose, model, contents, config=None):
+        self.calls.append(contents)
+        return SimpleNamespace(parsed=None, text=json.dumps(SUGGESTIONS, ensure_ascii=False))
+
+    def fake_stream(self, purpose, model, contents, config=None):
+        self.calls.append(contents)
+        text = json.dumps(SUGGESTIONS, ensure_ascii=False)
+        for i in range(0, len(text), 7):
+            yield text[i:i + 7]
+
+    def assertTurn(self, body):
+        self.assertEqual(body["store"]["id"], self.store.store_id)
+        self.assertEqual((body["category"], body["topic"], body["role"]), ("fresh", "과일", "user"))
+        self.assertEqual(body["thread_id"], "fresh-과일")
+        self.assertEqual([d["korean"] for d in body["dialogue"]], ["네0", "네1", "네2"])
+        # retry="false"는 False로 읽혀 재지시 문구가 들어가지 않음
+        texts = [part["text"] for turn in self.calls[-1] for part in turn["parts"]]
+        self.assertFalse(any(t.startswith("이전 출력과 다른") for t in texts))
+
+    def test_chat_accepts_form_and_multipart_bodies(self):
+        with mock.patch("ai.views.generate_content", self.fake_generate):
+            form = self.client.post(
+                "/ai/chat/", urlencode(self.body), content_type="application/x-www-form-urlencoded",
+            )
+            self.assertEqual(form.status_code, 200, form.data)
+            self.assertTurn(form.data)
+
+            multipart = self.client.post("/ai/chat/", self.body, format="multipart")
+            self.assertEqual(multipart.status_code, 200, multipart.data)
+            self.assertTurn(multipart.data)
+
+            as_json = self.client.post("/ai/chat/", {**self.body, "store_id": self.store.store_id, "retry": False}, format="json")
+            self.assertEqual(as_json.status_code, 200, as_json.data)
+            self.assertEqual(as_json.data["store"], form.data["store"])
+
+    def test_chat_stream_accepts_form_body(self):
+        with mock.patch("ai.views.stream_content", self.fake_stream):
+            response = self.client.post(
+                "/ai/chat/stream/", urlencode(self.body), content_type="application/x-www-form-urlencoded",
+                HTTP_ACCEPT="text/event-stream",
+            )
+            self.assertEqual(response.status_code, 200)
+            events = b"".join(response.streaming_content).decode().strip().split("\n\n")
+        names = [e.split("\n")[0] for e in events]
+        self.assertEqual(names, ["event: suggestion"] * 3 + ["event: done"])
+        self.assertTurn(json.loads(events[-1].split("\n", 1)[1][len("data: "):]))
+
+    def test_invalid_store_id_is_rejected(self):
+        response = self.client.post(
+            "/ai/chat/", urlencode({**self.body, "store_id": "abc"}), content_type="application/x-www-form-urlencoded",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("store_id", response.data)
@@ -3,6 +3,7 @@ from ai.views import *
 
 urlpatterns = [
     path('chat/', AiChatView.as_view()),
+    path('chat/stream/', AiChatStreamView.as_view()),
     path('feedback/', FeedbackView.as_view()),
     path('topics/', TopicListView.as_view()),
     path('chat/conversation/', ConversationView.as_view())
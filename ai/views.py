@@ -1,22 +1,26 @@
 from django.shortcuts import render
-from django.http import JsonResponse
-from google import genai
+from django.http import JsonResponse, StreamingHttpResponse
 from google.genai import types as genai_types
 import os
-from django.conf import settings
 from rest_framework.views import APIView 
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404 
 from rest_framework import status
 from .serializers import ChatRequestSerializer, FeedbackClassifySerializer, TopicSerializer, ConversationSerializer
 from typing import Dict, List, Tuple
 import re
 import json
-from .models import FeedbackTag, Feedback, Topic, Conversation
-from django.db.models import Count, Q
+import time
+from .models import FeedbackTag, Feedback, Topic, Conversation, ChatThread, ChatTurn
+from django.db.models import Count, F, Q
+from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated
-from stores.models import Store
-from menu.models import Menu
+from accounts.idempotency import idempotent
+from django.db import transaction
+from .feedback_counts import bump_feedback_tag_counts, top_tags_by_polarity
+from .llm import LlmError, generate_content, stream_content
+from .json_stream import JsonArrayItems
+from config.metrics import histogram
+from .prompt_context import get_prompt_context
 
 ROLE_GUIDES = {
     "store": """[ROLE=STORE]
@@ -29,47 +33,35 @@ ROLE_GUIDES = {
 - 이번 턴에는 오직 USER 역할만 수행하고, STORE 문장을 출력하지 말 것."""
 }
 
-# 키가 없으면 명시적 에러
-GEMINI_API_KEY = getattr(settings, "GEMINI_API_KEY", None)
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY is not set in settings.")
-
 CHAT_MODEL_NAME = "gemini-2.0-flash"
 FEEDBACK_MODEL_NAME = "gemini-2.0-flash-lite"
 
-def get_threads(session):
-    if "chat_threads" not in session:
-        session["chat_threads"] = {}
-    if not session.session_key:
-        session.save()
-    return session["chat_threads"]
-
-def ensure_thread(session, thread_id: str | None):
-    threads = get_threads(session)
-    tid = thread_id
-    if tid not in threads:
-        threads[tid] = []
-    return tid, threads[tid]
-
-def set_thread(session, thread_id, history):
-    threads = get_threads(session)
-    threads[thread_id] = history
-    session["chat_threads"] = threads
-    session.modified = True
-
-def delete_thread(session, thread_id):
-    threads = get_threads(session)
-    if thread_id in threads:
-        del threads[thread_id]
-        session["chat_threads"] = threads
-        session.modified = True
-
-def clear_all_threads(session):
-    session["chat_threads"] = {}
-    session.modified = True
-
-def get_role(request):
-    role = (request.data.get("role") or "store").strip().lower()
+# 모델에 넣는 히스토리는 최근 N턴만
+RECENT_N_ROLES = 10
+
+# 채팅 스레드는 ChatThread/ChatTurn에 저장 (턴마다 한 행만 추가, 읽을 때는 최근 N턴만)
+def ensure_thread(user, thread_id: str, limit: int = RECENT_N_ROLES):
+    thread, _ = ChatThread.objects.get_or_create(user=user, thread_id=thread_id)
+    recent = list(thread.turns.order_by("-seq").values("role", "parts")[:limit])
+    recent.reverse()
+    return thread, recent
+
+def append_turn(thread, role: str, parts: list) -> dict:
+    with transaction.atomic():
+        # 스레드 행을 갱신하면서 잠그므로 동시에 추가해도 seq가 겹치지 않음
+        ChatThread.objects.filter(pk=thread.pk).update(last_seq=F("last_seq") + 1, updated=timezone.now())
+        seq = ChatThread.objects.values_list("last_seq", flat=True).get(pk=thread.pk)
+        ChatTurn.objects.create(thread=thread, seq=seq, role=role, parts=parts)
+    return {"role": role, "parts": parts}
+
+def delete_thread(user, thread_id):
+    ChatThread.objects.filter(user=user, thread_id=thread_id).delete()
+
+def clear_all_threads(user):
+    ChatThread.objects.filter(user=user).delete()
+
+def get_role(data):
+    role = (data.get("role") or "store").strip().lower()
     if role not in ("store", "user"):
         role = "store"
     return role
@@ -100,74 +92,9 @@ def top_k_keys(d: dict, k: int):
 def get_top_feedback_tags(limit: int = 3, user=None, since=None) -> dict:
     """
     Feedback에서 연결된 태그 중 polarity별(positive/negative) 상위 N개를 반환.
-    neutral은 제외.
+    neutral은 제외. 일별 집계(FeedbackTagDailyCount)에서 읽으므로 since는 날짜 단위.
     """
-    fb_qs = Feedback.objects.all().prefetch_related("tags")
-    if user is not None:
-        fb_qs = fb_qs.filter(user=user)
-    if since is not None:
-        fb_qs = fb_qs.filter(created__gte=since)
-
-    # FeedbackTag 기준으로 집계 (neutral 제외)
-    tag_qs = (
-        FeedbackTag.objects
-        .exclude(polarity="neutral")
-        .annotate(
-            usage_count=Count(
-                "feedbacks",
-                filter=Q(feedbacks__in=fb_qs),
-                distinct=True,
-            )
-        )
-        .filter(usage_count__gt=0)
-    )
-    # 상위 3개씩 분리
-    pos_top = (
-        tag_qs.filter(polarity="positive")
-        .order_by("-usage_count", "tag")
-        .values_list("tag", flat=True)[:limit]
-    )
-    neg_top = (
-        tag_qs.filter(polarity="negative")
-        .order_by("-usage_count", "tag")
-        .values_list("tag", flat=True)[:limit]
-    )
-
-    return {
-        "positive": list(pos_top),
-        "negative": list(neg_top),
-    }
-
-# 메뉴 최대 3개 불러옴
-def get_store_menus_or_400(store_id):
-    store = get_object_or_404(Store, pk=store_id)
-    menus = list(
-        Menu.objects.filter(store=store)
-        .values("korean", "english", "price")[:3]
-    )
-
-    def fmt(m):
-        p = m.get("price")
-        return f'{m.get("korean")}' + ", price: " + (f'{p}' if p not in (None, "unknown") else "unknown")
-    menu_texts = [fmt(m) for m in menus]  # 0~3개
-    return store, menu_texts
-
-def build_menu_guide(menu_texts: list[str]) -> str:
-    if not menu_texts:
-        # 메뉴가 아예 없을 때: 메뉴 언급 강제 규칙을 비활성화
-        return (
-            "규칙:\n"
-            "이 매장은 등록된 메뉴가 없으므로 특정 메뉴 관련 대화 생성 절대 금지. "
-        )
-    # 1~3개 있는 만큼만 나열
-    bullet_lines = "\n".join(f"-{m}" for m in menu_texts)
-    return (
-        "규칙:\n"
-        "대화 맥락에서 특정 메뉴가 등장해야 하면 무조건 다음 메뉴들 중 하나를 선택해 생성.\n"
-        f"{bullet_lines}\n"
-        "메뉴가 필요 없는 상황에 억지로 넣어서 대화 생성 금지.\n"
-        "허용 목록 외 메뉴명 등장 시 응답 전부 무효이며 즉시 재생성.\n"
-    )
+    return top_tags_by_polarity(limit=limit, user=user, since=since)
 
 class TopicListView(APIView):
     permission_classes = [IsAuthenticated]
@@ -198,110 +125,155 @@ class TopicListView(APIView):
             status=status.HTTP_200_OK,
         )
 
-class AiChatView(APIView):
-    permission_classes = [IsAuthenticated]
-    # 채팅 시작
-    def post(self, request):
-        store_id = request.data.get("store_id")
-        serializer = ChatRequestSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        raw_user_input = serializer.validated_data["message"].strip()
-        category = request.data.get("category")
-        topic = request.data.get("topic")
-        caption = get_object_or_404(Topic, category=category, topic=topic).caption
-        retry = bool(request.data.get("retry"))
-
-        # 1) store 메뉴 3개 로드
-        store, menu_texts = get_store_menus_or_400(store_id) 
-        filled_menu_guide = build_menu_guide(menu_texts)
-
-        # 피드백 태그 중 집계 많은 상위 3개 불러옴
-        top_tags = get_top_feedback_tags(limit=3)
-        pos_top3 = top_tags.get("positive", [])
-        neg_top3 = top_tags.get("negative", [])
-
-        reinforce_line = (
-            f"긍정 태그 상위 3개를 자연스럽게 강화해 대화를 생성하시오: {', '.join(pos_top3)}."
-            if pos_top3 else "강화할 긍정 태그가 없습니다."
-        )
-        improve_line = (
-            f"부정 태그 상위 3개를 보완/개선해 대화를 생성하시오: {', '.join(neg_top3)}."
-            if neg_top3 else "보완할 부정 태그가 없습니다."
-        )
+CHAT_RESPONSE_SCHEMA = genai_types.Schema(
+    type=genai_types.Type.ARRAY,
+    items=genai_types.Schema(
+        type=genai_types.Type.OBJECT,
+        properties={
+            "korean": genai_types.Schema(type=genai_types.Type.STRING),
+            "romanization": genai_types.Schema(type=genai_types.Type.STRING),
+            "english_gloss": genai_types.Schema(type=genai_types.Type.STRING),
+        },
+        required=["korean", "romanization", "english_gloss"],
+    )
+)
 
-        # 첫 요청: "category에 속하는 'topic'과 매우 연관된, store 입장에서 고객에게 말을 거는 3가지 한국어 대화 생성해."
-        prompt = (
-            '각 항목은 {korean, romanization, english_gloss} 필드를 포함. '
-            "romanization 필드는 라틴 알파벳(ASCII A-Z/a-z), 공백과 기본 구두점만 허용. 한글/숫자/기타 기호가 하나라도 포함되면 응답은 무효이며 즉시 재생성. "
-            "romanization must use Latin letters only (ASCII A-Z/a-z), spaces, and basic punctuation. Do not include any Korean characters or digits. "
-            "english_gloss must be in English (ASCII letters), no Korean. "
-            "If the romanization field & english field contains any Korean characters, the entire response is invalid and must be regenerated immediately.\n"
-            '각 korean은 15자 이내. '
-            "category와 topic에서 벗어나지 않는 선에서 자연스러운 대화 생성. "
-            '요청된 message에 대한 현재 role의 답변을 생성. '
-            f'각 대화는 {category}, 특히 {topic}과 매우 강한 연관성. '
-            f'(topic에 대한 예시: {caption}) 그대로 생성하지 말고 참고만 할 것. '
-            'category가 fresh면 신선식품을 의미. '
-            "\n\n"
-            "[Menu Constraint]\n"
-            f"{filled_menu_guide}\n"
-            "[Feedback Hints]\n"
-            f"{reinforce_line}\n"
-            f"{improve_line}\n"
-        )
+def prepare_chat_turn(data, user) -> dict:
+    """
+    채팅 한 턴의 프롬프트/모델 입력을 만든다. (AiChatView, AiChatStreamView 공용)
+    data는 ChatRequestSerializer의 validated_data (폼/multipart 요청도 값이 리스트가 아닌 단일 값)
+    """
+    store_id = data.get("store_id")
+    raw_user_input = data["message"].strip()
+    category = data.get("category")
+    topic = data.get("topic")
+    retry = bool(data.get("retry"))
+
+    # 1) 토픽 예시 + store 메뉴 3개 로드 (캐시, ai/prompt_context.py)
+    context = get_prompt_context(store_id, category, topic)
+    caption = context["caption"]
+    filled_menu_guide = context["menu_guide"]
+
+    # 피드백 태그 중 집계 많은 상위 3개 불러옴
+    top_tags = get_top_feedback_tags(limit=3)
+    pos_top3 = top_tags.get("positive", [])
+    neg_top3 = top_tags.get("negative", [])
+
+    reinforce_line = (
+        f"긍정 태그 상위 3개를 자연스럽게 강화해 대화를 생성하시오: {', '.join(pos_top3)}."
+        if pos_top3 else "강화할 긍정 태그가 없습니다."
+    )
+    improve_line = (
+        f"부정 태그 상위 3개를 보완/개선해 대화를 생성하시오: {', '.join(neg_top3)}."
+        if neg_top3 else "보완할 부정 태그가 없습니다."
+    )
 
-        # 역할 파라미터 수신
-        role = get_role(request)
-        role_guide = ROLE_GUIDES[role]
+    # 첫 요청: "category에 속하는 'topic'과 매우 연관된, store 입장에서 고객에게 말을 거는 3가지 한국어 대화 생성해."
+    prompt = (
+        '각 항목은 {korean, romanization, english_gloss} 필드를 포함. '
+        "romanization 필드는 라틴 알파벳(ASCII A-Z/a-z), 공백과 기본 구두점만 허용. 한글/숫자/기타 기호가 하나라도 포함되면 응답은 무효이며 즉시 재생성. "
+        "romanization must use Latin letters only (ASCII A-Z/a-z), spaces, and basic punctuation. Do not include any Korean characters or digits. "
+        "english_gloss must be in English (ASCII letters), no Korean. "
+        "If the romanization field & english field contains any Korean characters, the entire response is invalid and must be regenerated immediately.\n"
+        '각 korean은 15자 이내. '
+        "category와 topic에서 벗어나지 않는 선에서 자연스러운 대화 생성. "
+        '요청된 message에 대한 현재 role의 답변을 생성. '
+        f'각 대화는 {category}, 특히 {topic}과 매우 강한 연관성. '
+        f'(topic에 대한 예시: {caption}) 그대로 생성하지 말고 참고만 할 것. '
+        'category가 fresh면 신선식품을 의미. '
+        "\n\n"
+        "[Menu Constraint]\n"
+        f"{filled_menu_guide}\n"
+        "[Feedback Hints]\n"
+        f"{reinforce_line}\n"
+        f"{improve_line}\n"
+    )
 
-        # 프론트에서 요청할 때 thread_id에 topic을 넣어줘야 함!
-        raw_tid = request.data.get("thread_id")
-        thread_id = str(raw_tid).strip()
+    # 역할 파라미터 수신
+    role = get_role(data)
+    role_guide = ROLE_GUIDES[role]
 
-        # 유효한 thread_id만 ensure
-        thread_id, history = ensure_thread(request.session, thread_id)
+    # 프론트에서 요청할 때 thread_id에 topic을 넣어줘야 함!
+    raw_tid = data.get("thread_id")
+    thread_id = str(raw_tid).strip()
 
-        client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    # 유효한 thread_id만 ensure (최근 N턴만 읽음)
+    thread, history = ensure_thread(user, thread_id)
 
-        # 히스토리에 최근 N턴만 저장
-        recent_n_roles = 10
-        trimmed = history[-recent_n_roles:] if len(history) > recent_n_roles else history
-        contents = []
+    contents = []
+    # 재지시 문구 추가
+    if retry:
+        contents.append({"role": "user", "parts": [{"text": f"이전 출력과 다른 새로운 대화 3개를 {role} 입장에서 생성. 표현/내용 중복 금지."}]})
+    contents.append({"role": "user", "parts": [{"text": role_guide}]}) # 역할 가이드 먼저
+    contents.append({"role": "user", "parts": [{"text": filled_menu_guide}]}) # 메뉴 가이드
+    contents.extend([normalize_turn(t) for t in history]) # 과거 히스토리
+    contents.append({"role": "user", "parts": [{"text": raw_user_input}]}) # 원문
+    contents.append({"role": "user", "parts": [{"text": prompt}]}) # 출력 규칙
 
-        contents = []
-        # 재지시 문구 추가
-        if retry:
-            contents.append({"role": "user", "parts": [{"text": f"이전 출력과 다른 새로운 대화 3개를 {role} 입장에서 생성. 표현/내용 중복 금지."}]})
-        contents.append({"role": "user", "parts": [{"text": role_guide}]}) # 역할 가이드 먼저
-        contents.append({"role": "user", "parts": [{"text": filled_menu_guide}]}) # 메뉴 가이드
-        contents.extend([normalize_turn(t) for t in trimmed]) # 과거 히스토리
-        contents.append({"role": "user", "parts": [{"text": raw_user_input}]}) # 원문
-        contents.append({"role": "user", "parts": [{"text": prompt}]}) # 출력 규칙
+    return {
+        "contents": contents,
+        "config": {
+            "response_mime_type": "application/json",
+            "response_schema": CHAT_RESPONSE_SCHEMA,
+        },
+        "prompt": prompt,
+        "role": role,
+        "raw_user_input": raw_user_input,
+        "category": category,
+        "topic": topic,
+        "thread_id": thread_id,
+        "thread": thread,
+        "history": history,
+        "context": context,
+    }
 
-        response_schema = genai_types.Schema(
-            type=genai_types.Type.ARRAY,
-            items=genai_types.Schema(
-                type=genai_types.Type.OBJECT,
-                properties={
-                    "korean": genai_types.Schema(type=genai_types.Type.STRING),
-                    "romanization": genai_types.Schema(type=genai_types.Type.STRING),
-                    "english_gloss": genai_types.Schema(type=genai_types.Type.STRING),
-                },
-                required=["korean", "romanization", "english_gloss"],
-            )
-        )
-        
-        # 모델 호출
-        resp = client.models.generate_content(
-            model=CHAT_MODEL_NAME,
-            contents=contents,
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": response_schema,
-            },
-        )
+def dialogue_entry(role, item) -> dict:
+    return {
+        "role": role,
+        "korean": item.get("korean", ""),
+        "romanization": item.get("romanization", ""),
+        "english_gloss": item.get("english_gloss", ""),
+    }
+
+def finish_chat_turn(turn, dialogue) -> dict:
+    # 히스토리 업데이트(반드시 role/parts의 원시 형태로 저장) 후 응답 본문 반환
+    # 응답의 history는 최근 N턴
+    history = turn["history"]
+    history.append(append_turn(turn["thread"], "user", [{"text": f"[TO {turn['role'].upper()}] {turn['raw_user_input']}"}]))
+    # history.append({"role": "model", "parts": [{"text": reply_text}]})
+    history = history[-RECENT_N_ROLES:]
+
+    return {
+        "dialogue": dialogue,
+        "history": history,
+        "role": turn["role"],
+        "used_prompt": turn["prompt"],
+        "raw_user_input": turn["raw_user_input"],
+        "category": turn["category"],
+        "topic": turn["topic"],
+        "thread_id": turn["thread_id"],
+        "store": turn["context"]["store"],
+        "menus": turn["context"]["menu_texts"],
+    }
+
+class AiChatView(APIView):
+    permission_classes = [IsAuthenticated]
+    # 채팅 시작
+    def post(self, request):
+        serializer = ChatRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        turn = prepare_chat_turn(serializer.validated_data, request.user)
 
-        reply_text = (resp.text or "").strip() or ""
+        # 모델 호출 (공유 클라이언트, ai/llm.py)
+        try:
+            resp = generate_content(
+                "chat",
+                model=CHAT_MODEL_NAME,
+                contents=turn["contents"],
+                config=turn["config"],
+            )
+        except LlmError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
 
         parsed = getattr(resp, "parsed", None)
         if parsed is None:
@@ -311,41 +283,60 @@ class AiChatView(APIView):
             except Exception:
                 parsed = []
 
-        dialogue = []
-        for item in parsed:
-            dialogue.append({
-                "role": role,
-                "korean": item.get("korean", ""),
-                "romanization": item.get("romanization", ""),
-                "english_gloss": item.get("english_gloss", ""),
-            })
-
-        # 히스토리 업데이트(반드시 role/parts의 원시 형태로 저장)
-        history.append({"role": "user", "parts": [{"text": f"[TO {role.upper()}] {raw_user_input}"}]})
-        # history.append({"role": "model", "parts": [{"text": reply_text}]})
-        set_thread(request.session, thread_id, history)
-
-        return Response(
-            {
-                "dialogue": dialogue,
-                "history": history,
-                "role": role,
-                "used_prompt": prompt,
-                "raw_user_input": raw_user_input,  
-                "category": category,
-                "topic": topic,
-                "thread_id": thread_id,
-                "store": {"id": store.store_id, "name": getattr(store, "store_name", None)},
-                "menus": menu_texts,
-            },
-            status=status.HTTP_200_OK,
-        )
+        dialogue = [dialogue_entry(turn["role"], item) for item in parsed]
+        return Response(finish_chat_turn(turn, dialogue), status=status.HTTP_200_OK)
     
     # 전체 스레드 삭제
     def delete(self, request):
-        clear_all_threads(request.session)
+        clear_all_threads(request.user)
         return Response({"detail": "all threads cleared", "threads_index": []}, status=status.HTTP_200_OK)
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class AiChatStreamView(APIView):
+    """
+    AiChatView의 스트리밍 버전 (SSE)
+    모델이 JSON 배열을 만드는 동안 원소가 하나 완성될 때마다 suggestion 이벤트로 보내고,
+    끝나면 히스토리를 저장한 뒤 AiChatView와 같은 응답 본문을 done 이벤트로 보냄. 실패하면 error 이벤트
+    WSGI로 배포하므로 동기 generator로 보냄 (조각마다 바로 흘려보냄)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # EventSource 등은 Accept: text/event-stream 으로 요청하므로 406 대신 기본(JSON) 렌더러로 오류 응답
+        return super().perform_content_negotiation(request, force=True)
+
+    def post(self, request):
+        serializer = ChatRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        turn = prepare_chat_turn(serializer.validated_data, request.user)
+
+        response = StreamingHttpResponse(self._events(turn), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx 버퍼링 끔
+        return response
+
+    def _events(self, turn):
+        started = time.perf_counter()
+        parser = JsonArrayItems()
+        dialogue = []
+        try:
+            for text in stream_content("chat_stream", model=CHAT_MODEL_NAME, contents=turn["contents"], config=turn["config"]):
+                for item in parser.feed(text):
+                    if not isinstance(item, dict):
+                        continue
+                    if not dialogue:
+                        histogram("ai.chat_stream.first_item_ms").observe((time.perf_counter() - started) * 1000)
+                    entry = dialogue_entry(turn["role"], item)
+                    dialogue.append(entry)
+                    yield _sse("suggestion", entry)
+        except LlmError as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        yield _sse("done", finish_chat_turn(turn, dialogue))
+
 class FeedbackView(APIView):
     permission_classes = [IsAuthenticated]
     def build_tag_classify_prompt(self, allowed_pos: List[str], allowed_neg: List[str], allowed_neu: List[str], thumbs: bool, comment: str) -> str:
@@ -381,11 +372,10 @@ class FeedbackView(APIView):
         return merged[:limit]
     
 
+    @idempotent
     def post(self, request):
         # permission_classes = [IsAuthenticated]
 
-        client = genai.Client(api_key=settings.GEMINI_API_KEY)
-
         # 1) 입력 검증
         ser = FeedbackClassifySerializer(data=request.data)
         ser.is_valid(raise_exception=True)
@@ -421,14 +411,18 @@ class FeedbackView(APIView):
         )
 
         # 3) 모델 호출
-        resp = client.models.generate_content(
-            model=FEEDBACK_MODEL_NAME,
-            contents=[{"role": "user", "parts": [{"text": prompt}]}],
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": response_schema,
-            },
-        )
+        try:
+            resp = generate_content(
+                "feedback",
+                model=FEEDBACK_MODEL_NAME,
+                contents=[{"role": "user", "parts": [{"text": prompt}]}],
+                config={
+                    "response_mime_type": "application/json",
+                    "response_schema": response_schema,
+                },
+            )
+        except LlmError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
 
         text = (getattr(resp, "text", None) or "").strip()
         try:
@@ -446,14 +440,16 @@ class FeedbackView(APIView):
         chosen_names = self.filter_and_limit_tags(result, allowed_pos, allowed_neg, allowed_neu, limit=3)
         chosen_ids = [name_to_id[n] for n in chosen_names if n in name_to_id]
 
-        # 5) Feedback에 저장
-        fb = Feedback.objects.create(
-            user=request.user,
-            thumbs=thumbs,
-            comment=comment[:500],
-        )
-        if chosen_ids:
-            fb.tags.set(chosen_ids)
+        # 5) Feedback에 저장 (태그 일별 집계도 같은 트랜잭션에서 올림)
+        with transaction.atomic():
+            fb = Feedback.objects.create(
+                user=request.user,
+                thumbs=thumbs,
+                comment=comment[:500],
+            )
+            if chosen_ids:
+                fb.tags.set(chosen_ids)
+                bump_feedback_tag_counts(chosen_ids, user_id=fb.user_id, day=fb.created)
 
         # 6) 응답
         return Response(
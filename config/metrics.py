@@ -0,0 +1,101 @@
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# 프로세스 단위 인메모리 지표 (워커 프로세스마다 따로 집계됨)
+DEFAULT_MS_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_lock = threading.Lock()
+_counters: dict[str, "Counter"] = {}
+_histograms: dict[str, "Histogram"] = {}
+
+
+class Counter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, n: int = 1):
+        with self._lock:
+            self.value += n
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_MS_BUCKETS, window: int = 512):
+        self._lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)  # 분위수 계산용 최근 값
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.recent.append(value)
+
+    def quantile(self, q: float) -> float | None:
+        with self._lock:
+            values = sorted(self.recent)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{b}": c for b, c in zip(self.buckets, self.counts)}
+            buckets["inf"] = self.counts[-1]
+            data = {"count": self.count, "sum": round(self.sum, 3), "buckets": buckets}
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            v = self.quantile(q)
+            data[name] = round(v, 3) if v is not None else None
+        return data
+
+
+def counter(name: str) -> Counter:
+    with _lock:
+        if name not in _counters:
+            _counters[name] = Counter()
+        return _counters[name]
+
+
+def histogram(name: str, buckets=DEFAULT_MS_BUCKETS) -> Histogram:
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram(buckets)
+        return _histograms[name]
+
+
+@contextmanager
+def timed(name: str):
+    # 블록 실행 시간을 ms 단위로 히스토그램에 기록
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram(name).observe((time.perf_counter() - started) * 1000)
+
+
+def snapshot() -> dict:
+    with _lock:
+        counters = dict(_counters)
+        histograms = dict(_histograms)
+    return {
+        "counters": {k: c.value for k, c in sorted(counters.items())},
+        "histograms": {k: h.to_dict() for k, h in sorted(histograms.items())},
+    }
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(snapshot())
@@ -7,6 +7,7 @@ import os, json
 from django.core.exceptions import ImproperlyConfigured
 
 from datetime import timedelta #login
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -193,6 +194,9 @@ CORS_ALLOWED_ORIGIN_REGEXES = [
     r"^https://deploy-preview-\d+--oyes-hackaton\.netlify\.app$"
 ]
 
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed", "Retry-After"]
+
 ### LOGIN ###
 
 AUTH_USER_MODEL = 'accounts.User' #accounts
@@ -228,5 +232,54 @@ AWS_S3_OBJECT_PARAMETERS = {
 }
 
 X_OCR_SECRET = get_secret("X_OCR_SECRET")
-
-GEMINI_API_KEY = get_secret("GEMINI_API_KEY")
\ No newline at end of file
+X_OCR_URL = get_secret("X_OCR_URL")
+
+# OCR 클라이언트 (receipts/ocr_client.py)
+RECEIPT_OCR_POOL_SIZE = 10          # keep-alive 커넥션 풀 크기
+RECEIPT_OCR_CONNECT_TIMEOUT = 3.05  # 초
+RECEIPT_OCR_READ_TIMEOUT = 20       # 초
+RECEIPT_OCR_RETRIES = 2             # 연결 실패/429/503 재시도 횟수 (읽기 타임아웃/그 밖의 5xx는 재시도하지 않음)
+RECEIPT_OCR_BREAKER_FAILURES = 5    # 연속 실패가 이만큼 쌓이면 서킷 open
+RECEIPT_OCR_BREAKER_RESET = 30      # open 후 시험 호출까지 기다리는 시간(초)
+RECEIPT_OCR_HEDGE = os.getenv('RECEIPT_OCR_HEDGE', '0') == '1'  # p95 지연 후 중복 요청 (OCR 과금이 늘 수 있어 기본 off)
+RECEIPT_OCR_HEDGE_MIN_MS = 1000     # 헤징 대기 시간 하한
+
+# 영수증 OCR 처리 방식: 'async'(작업 큐 + run_receipt_jobs 워커) | 'sync'(요청 안에서 처리)
+RECEIPT_OCR_DEFAULT_MODE = os.getenv('RECEIPT_OCR_DEFAULT_MODE', 'sync')
+RECEIPT_JOB_MAX_ATTEMPTS = 3
+RECEIPT_JOB_STALE_SECONDS = 300  # running 상태로 이 시간 넘게 멈춘 작업은 다시 가져감
+RECEIPT_S3_UPLOAD_WORKERS = 8    # OCR과 동시에 돌리는 S3 업로드 스레드 수
+RECEIPT_OCR_MAX_EDGE = 2048  # OCR로 보내는 이미지의 최대 긴 변(px), 업로드는 이 근처로 바로 축소 디코딩
+RECEIPT_MAX_PIXELS = 40_000_000  # 이보다 큰 이미지는 디코딩 전에 거절 (압축 폭탄 방지)
+IMAGE_TRANSCODE_WORKERS = int(os.getenv('IMAGE_TRANSCODE_WORKERS', min(4, os.cpu_count() or 1)))  # 이미지 변환 프로세스 수, 0이면 요청 스레드에서 실행
+IMAGE_TRANSCODE_QUEUE = int(os.getenv('IMAGE_TRANSCODE_QUEUE', 8))  # 워커가 모두 바쁠 때 기다릴 수 있는 작업 수, 넘으면 503
+IMAGE_TRANSCODE_TIMEOUT = 30  # 변환 한 건의 최대 대기+실행 시간(초)
+RECEIPT_PREPROCESS_RATE = float(os.getenv('RECEIPT_PREPROCESS_RATE', 0))  # 흑백/crop/대비 전처리할 업로드 비율 (0이면 끔, 1이면 전부)
+RECEIPT_PREPROCESS_MAX_EDGE = 1600  # 전처리할 때의 최대 긴 변(px)
+RECEIPT_REWARD_MIN_SCORE = 85  # receipt/verify/: 1순위 점포 점수가 이 이상이면 적립
+RECEIPT_REWARD_POINTS = int(os.getenv('RECEIPT_REWARD_POINTS', 100))  # 영수증 인증 1건당 적립 포인트
+RECEIPT_UPLOAD_MAX_BYTES = 15 * 1024 * 1024  # presigned URL로 직접 올린 원본을 받아올 최대 크기
+RECEIPT_BATCH_MAX_IMAGES = 10  # 배치 업로드 한 번에 받는 최대 장수 (변환 풀 자리보다 많으면 나눠서 변환)
+RECEIPT_OCR_IMAGES_PER_CALL = 1  # OCR 호출 한 번에 묶어 보낼 장수 (네이버 영수증 OCR은 현재 1장만 지원)
+RECEIPT_OCR_CONCURRENCY = 4  # 배치 업로드에서 동시에 보내는 OCR 호출 수
+RECEIPT_OCR_CACHE_TTL = int(os.getenv('RECEIPT_OCR_CACHE_TTL', 60 * 60 * 24))  # 같은 사진 OCR 결과 재사용 기간(초), 0이면 끔
+
+# Idempotency-Key 헤더 (accounts/idempotency.py)
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24  # 첫 응답 보관 기간(초), 만료된 행은 purge_idempotency_keys로 정리
+IDEMPOTENCY_LOCK_TIMEOUT = 120      # 처리 중 잠금 유지 시간(초), 넘으면 워커가 죽은 것으로 보고 다시 처리
+IDEMPOTENCY_WAIT = 30               # 같은 키의 요청이 처리 중일 때 기다리는 최대 시간(초), 넘으면 409
+
+# 영수증-점포 주소 매칭 (rapidfuzz cdist 워커 수, -1이면 CPU 코어 수만큼)
+RECEIPT_MATCH_WORKERS = int(os.getenv('RECEIPT_MATCH_WORKERS', -1))
+
+GEMINI_API_KEY = get_secret("GEMINI_API_KEY")
+
+# Gemini 클라이언트 (ai/llm.py)
+GEMINI_POOL_SIZE = 10              # 프로세스당 keep-alive 커넥션 수
+GEMINI_TIMEOUT = 30                # 호출 1회 타임아웃(초)
+GEMINI_RETRY_ATTEMPTS = 3          # 429/5xx/타임아웃 시 첫 호출 포함 최대 시도 횟수
+GEMINI_RETRY_INITIAL_DELAY = 0.5   # 재시도 대기(초), 지수 증가 + 지터
+GEMINI_RETRY_MAX_DELAY = 4
+
+# AI 채팅 프롬프트 캐시 (ai/prompt_context.py), Menu/Store/Topic 변경 시 signal로 무효화
+PROMPT_CONTEXT_CACHE_TTL = 60 * 10  # 초, 다른 워커 프로세스의 캐시가 따로일 때 이전 값이 보일 수 있는 최대 시간
\ No newline at end of file
@@ -6,6 +6,7 @@ from stores.views import *
 from markets.views import *
 from menu.views import *
 from image.views import *
+from config.metrics import MetricsView
 
 
 urlpatterns = [
@@ -17,6 +18,7 @@ urlpatterns = [
     path('menu/', include('menu.urls')),
     path('ai/', include('ai.urls')),
     path('reviews/', include('reviews.urls')),
-    path('images/', include('image.urls'))
+    path('images/', include('image.urls')),
+    path('metrics/', MetricsView.as_view()),
 
 ]
\ No newline at end of file
@@ -1,3 +1,26 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, override_settings
 
-# Create your tests here.
+from . import transcode
+
+
+@override_settings(IMAGE_TRANSCODE_WORKERS=1, IMAGE_TRANSCODE_QUEUE=1)
+class TranscodeRunManyTests(SimpleTestCase):
+    # 풀 자리(workers + queue = 2)보다 많은 작업도 나눠서 모두 처리
+
+    def setUp(self):
+        transcode.shutdown()  # 바뀐 설정으로 풀/자리를 새로 만들도록
+        self.addCleanup(transcode.shutdown)
+
+    def test_more_jobs_than_capacity(self):
+        results = transcode.run_many(abs, [(-i,) for i in range(7)])
+        self.assertEqual(results, list(range(7)))
+
+    def test_errors_are_returned_in_place(self):
+        results = transcode.run_many(int, [("1",), ("x",), ("3",), ("4",), ("y",)])
+        self.assertEqual([r for r in results if not isinstance(r, Exception)], [1, 3, 4])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertIsInstance(results[4], ValueError)
+
+    def test_slots_are_released(self):
+        transcode.run_many(abs, [(-i,) for i in range(5)])
+        self.assertEqual(transcode.run(abs, -9), 9)
@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+
+from config import metrics
+
+# 이미지 변환(디코딩/리사이즈/JPEG 인코딩) 같은 CPU 작업을 요청 스레드 밖에서 돌리는 공용 프로세스 풀
+# - 워커 수: IMAGE_TRANSCODE_WORKERS (0이면 풀 없이 요청 스레드에서 바로 실행)
+# - 대기열: 실행 중 + 대기 작업이 workers + IMAGE_TRANSCODE_QUEUE 를 넘으면 바로 거절 (503)
+# - 작업별 대기/실행 시간은 image.transcode.wait_ms / run_ms 히스토그램에 기록
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_slots = None
+
+
+class TranscodePoolSaturated(Exception):
+    """풀이 가득 찼거나 제한 시간 안에 끝나지 않은 경우 (클라이언트는 잠시 후 재시도)"""
+
+    def __init__(self, detail: str, retry_after: int = 1):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def _workers() -> int:
+    return getattr(settings, "IMAGE_TRANSCODE_WORKERS", os.cpu_count() or 1)
+
+
+def _capacity() -> int:
+    return _workers() + getattr(settings, "IMAGE_TRANSCODE_QUEUE", 0)
+
+
+def _timeout() -> float:
+    return getattr(settings, "IMAGE_TRANSCODE_TIMEOUT", 30)
+
+
+def _get_executor():
+    # fork된 워커(gunicorn 등)에서 부모의 풀을 물려받지 않도록 pid가 바뀌면 새로 만든다
+    global _executor, _executor_pid, _slots
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            context = multiprocessing.get_context(getattr(settings, "IMAGE_TRANSCODE_START_METHOD", "spawn"))
+            # spawn된 워커는 빈 인터프리터라 작업 모듈을 import하기 전에 Django 초기화
+            _executor = ProcessPoolExecutor(max_workers=_workers(), mp_context=context, initializer=django.setup)
+            _executor_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(_capacity())
+        return _executor, _slots
+
+
+def _reset_executor(broken):
+    # 워커가 죽어 풀이 깨지면 다음 요청부터 새 풀 사용
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _timed_call(fn, submitted_at, args):
+    # 워커 프로세스에서 실행: (결과, 대기 ms, 실행 ms)
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (started - submitted_at) * 1000, (time.perf_counter() - started) * 1000
+
+
+def run(fn, *args, timeout: float | None = None):
+    """
+    fn(*args)를 변환 풀에서 실행하고 결과를 돌려준다. fn과 인자는 pickle 가능해야 함.
+    fn이 던진 예외는 그대로 다시 던지고, 풀이 가득 차거나 시간 초과면 TranscodePoolSaturated.
+    """
+    result = run_many(fn, [args], timeout=timeout)[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def run_many(fn, arg_list: list[tuple], timeout: float | None = None) -> list:
+    """
+    여러 작업을 풀에 넣어 병렬로 실행하고 입력 순서대로 돌려준다.
+    각 원소는 결과값 또는 fn이 던진 예외 객체. 빈자리가 모자라면 TranscodePoolSaturated.
+    풀 전체 자리(workers + queue)보다 많으면 그만큼씩 나눠 차례로 넣는다 (풀보다 큰 배치도 처리되도록).
+    timeout은 전체 작업에 대한 제한 시간.
+    """
+    if _workers() <= 0:
+        results = []
+        for args in arg_list:
+            try:
+                with metrics.timed("image.transcode.run_ms"):
+                    results.append(fn(*args))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    deadline = time.monotonic() + (timeout or _timeout())
+    capacity = max(1, _capacity())
+    results = []
+    for start in range(0, len(arg_list), capacity):
+        results.extend(_run_chunk(fn, arg_list[start:start + capacity], deadline))
+    return results
+
+
+def _run_chunk(fn, arg_list: list[tuple], deadline: float) -> list:
+    # 빈자리를 작업 수만큼 한 번에 잡고(모자라면 하나도 넣지 않음) 실행
+    executor, slots = _get_executor()
+    acquired = 0
+    for _ in arg_list:
+        if not slots.acquire(blocking=False):
+            for _ in range(acquired):
+                slots.release()
+            metrics.counter("image.transcode.rejected").inc()
+            raise TranscodePoolSaturated("이미지 처리 요청이 많습니다. 잠시 후 다시 시도해주세요.")
+        acquired += 1
+
+    futures = []
+    try:
+        for args in arg_list:
+            # perf_counter는 시스템 전체 단조 시계라 프로세스 간 비교 가능
+            future = executor.submit(_timed_call, fn, time.perf_counter(), args)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+    except BrokenProcessPool:
+        for _ in range(acquired - len(futures)):
+            slots.release()
+        _abandon(futures)
+        _reset_executor(executor)
+        metrics.counter("image.transcode.broken").inc()
+        raise TranscodePoolSaturated("이미지 처리 워커를 다시 시작하는 중입니다. 잠시 후 다시 시도해주세요.")
+
+    results = []
+    for future in futures:
+        try:
+            result, wait_ms, run_ms = future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            _abandon(futures)
+            metrics.counter("image.transcode.timeout").inc()
+            raise TranscodePoolSaturated("이미지 처리 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.")
+        except BrokenProcessPool:
+            _abandon(futures)
+            _reset_executor(executor)
+            metrics.counter("image.transcode.broken").inc()
+            raise TranscodePoolSaturated("이미지 처리 워커를 다시 시작하는 중입니다. 잠시 후 다시 시도해주세요.")
+        except Exception as e:
+            results.append(e)
+            continue
+        metrics.histogram("image.transcode.wait_ms").observe(wait_ms)
+        metrics.histogram("image.transcode.run_ms").observe(run_ms)
+        results.append(result)
+    return results
+
+
+def _abandon(futures):
+    # 아직 시작 안 한 작업은 취소 (이미 도는 작업은 끝나면 자리 반납)
+    for future in futures:
+        future.cancel()
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
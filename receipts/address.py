@@ -0,0 +1,78 @@
+import re
+
+from stores.address import normalize_address
+
+
+def address_ngrams(norm_addr: str, n: int = 2) -> set[str]:
+    # 공백을 제거한 정규화 주소의 글자 n-gram 집합 (후보 검색용)
+    s = "".join((norm_addr or "").split())
+    if not s:
+        return set()
+    if len(s) <= n:
+        return {s}
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+
+# 구조화 파싱: 시/도, 구, 동, 로/길, 번지(건물번호)
+SIDO_NAMES = {
+    "서울", "부산", "대구", "인천", "광주", "대전", "울산", "세종",
+    "경기", "강원", "충북", "충남", "전북", "전남", "경북", "경남", "제주",
+}
+_SIDO_RE = re.compile(r"^[가-힣]+(?:특별자치시|특별자치도|특별시|광역시|도)$")
+_GU_RE = re.compile(r"^[가-힣]+(?:구|군)$")
+_CITY_RE = re.compile(r"^[가-힣]+시$")
+_DONG_RE = re.compile(r"^[가-힣0-9]+?(?:동|[0-9]+가|리|읍|면)$")
+_ROAD_RE = re.compile(r"^[가-힣0-9]+?(?:로|길)$")
+_NUMBER_RE = re.compile(r"^(?:산\s?)?0*([0-9]+)(?:\s?-\s?0*([0-9]+))?(?:번지|번)?$")
+# OCR이 붙여 쓴 "창경궁로88", "예지동6-1" 분리용
+_GLUED_RE = re.compile(r"^([가-힣0-9]*?[가-힣](?:로|길|동|가|리))(\d+(?:-\d+)?)(?:번지)?$")
+
+
+def _normalize_number(main: str, sub: str | None) -> str:
+    return f"{int(main)}-{int(sub)}" if sub else str(int(main))
+
+
+def parse_address(addr: str) -> dict | None:
+    """
+    정규화 주소를 {sido, gu, dong, road, number}로 분해.
+    구와 (로/길 또는 동)과 번지가 모두 나와야 성공, 아니면 None.
+    """
+    s = normalize_address(addr)
+    if not s:
+        return None
+    tokens = []
+    for tok in s.split():
+        m = _GLUED_RE.match(tok)
+        if m:
+            tokens.extend([m.group(1), m.group(2)])
+        else:
+            tokens.append(tok)
+
+    parts = {"sido": None, "gu": None, "dong": None, "road": None, "number": None}
+    for tok in tokens:
+        if parts["sido"] is None and parts["gu"] is None and (tok in SIDO_NAMES or _SIDO_RE.match(tok)):
+            parts["sido"] = tok
+        elif parts["gu"] is None and _GU_RE.match(tok):
+            parts["gu"] = tok
+        elif parts["gu"] is None and _CITY_RE.match(tok):
+            # 구가 없는 시(예: 성남시 분당구의 "성남시")는 구가 나오면 덮어씀
+            parts["gu"] = tok
+        elif parts["road"] is None and parts["number"] is None and _ROAD_RE.match(tok):
+            parts["road"] = tok
+        elif parts["dong"] is None and parts["number"] is None and _DONG_RE.match(tok):
+            parts["dong"] = tok
+        elif parts["number"] is None and (parts["road"] or parts["dong"]):
+            m = _NUMBER_RE.match(tok)
+            if m:
+                parts["number"] = _normalize_number(m.group(1), m.group(2))
+                break  # 번지 이후(층/호수 등)는 무시
+    # "성남시 분당구"처럼 시 다음에 구가 오는 경우
+    if parts["gu"] and _CITY_RE.match(parts["gu"]):
+        for tok in tokens:
+            if _GU_RE.match(tok):
+                parts["gu"] = tok
+                break
+
+    if not parts["gu"] or not parts["number"] or not (parts["road"] or parts["dong"]):
+        return None
+    return parts
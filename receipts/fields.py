@@ -0,0 +1,89 @@
+import re
+from datetime import date as _date, time as _time
+
+# 네이버 영수증 OCR 필드(날짜/시간/금액) 파서
+# 날짜/시간은 strptime 연쇄 대신 미리 컴파일한 정규식으로 한 번에 처리.
+# 결과는 기존 strptime 기반 구현과 같게 맞춤 (bench_receipt_fields로 확인)
+# 금액은 정규식 빠른 경로가 오히려 느려서(측정 0.8배) 기존 구현 그대로 둠
+
+# strptime의 %Y/%m/%d 정규식과 같은 규칙, 구분자는 -, ., / 중 하나로 통일
+_DATE_RE = re.compile(
+    r"(\d\d\d\d)([-./])(1[0-2]|0[1-9]|[1-9])\2(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])"
+)
+# strptime의 %H:%M:%S 정규식과 같은 규칙 (초 60, 61은 time()에서 걸러짐)
+_TIME_RE = re.compile(r"(2[0-3]|[0-1]\d|\d):([0-5]\d|\d):(6[0-1]|[0-5]\d|\d)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def parse_date(date_obj):
+    if not isinstance(date_obj, dict):
+        return None
+
+    fmt = date_obj.get("formatted") or {}
+    y, m, d = fmt.get("year"), fmt.get("month"), fmt.get("day")
+    if y and m and d:
+        try:
+            # 날짜는 반드시 date 객체로
+            return _date(int(y), int(m), int(d))
+        except Exception:
+            pass
+
+    # 폴백: "2025-08-14", "2025.08.14", "2025/08/14"
+    text = date_obj.get("text")
+    if text:
+        matched = _DATE_RE.fullmatch(str(text).strip())
+        if matched:
+            try:
+                return _date(int(matched[1]), int(matched[3]), int(matched[4]))
+            except ValueError:
+                pass
+    return None
+
+
+def _match_time(s: str):
+    matched = _TIME_RE.fullmatch(s)
+    if not matched:
+        return None
+    try:
+        return _time(int(matched[1]), int(matched[2]), int(matched[3]))
+    except ValueError:
+        return None
+
+
+def parse_time(time_obj):
+    if not isinstance(time_obj, dict):
+        return None
+
+    fmt = time_obj.get("formatted") or {}
+    hh, mm, ss = fmt.get("hour"), fmt.get("minute"), fmt.get("second")
+    if hh and mm and ss:
+        parsed = _match_time(f"{str(hh).zfill(2)}:{str(mm).zfill(2)}:{str(ss).zfill(2)}")
+        if parsed is not None:
+            return parsed
+
+    # 폴백: "18: 59: 29"처럼 공백 포함 형태
+    text = time_obj.get("text")
+    if text:
+        return _match_time(_WHITESPACE_RE.sub("", str(text)))
+    return None
+
+
+def parse_number(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    s = str(value).strip()
+    if not s:
+        return None
+    neg = False
+    if s.startswith("(") and s.endswith(")"):
+        neg = True
+        s = s[1:-1]
+    for sym in [" ", ",", "KRW", "₩", "원", "$", "USD"]:
+        s = s.replace(sym, "")
+    try:
+        num = float(s)
+        return -num if neg else num
+    except Exception:
+        return None
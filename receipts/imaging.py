@@ -0,0 +1,335 @@
+import hashlib
+import math
+from io import BytesIO
+import numpy as np
+from django.conf import settings
+from PIL import Image, ImageOps
+
+MAX_OCR_BYTES = 1_000_000  # 1MB
+
+QUALITY_MAX = 85
+QUALITY_MIN = 50
+MIN_EDGE = 64        # 이보다 작게는 줄이지 않음
+SCALE_MARGIN = 0.92  # 면적 비례 추정이 살짝 빗나가도 한 번에 들어오도록 여유
+MAX_RESCALES = 4
+QUALITY_STEP = 2     # 이 폭 안으로 좁혀지면 탐색 종료
+DRAFT_TOLERANCE = 0.9  # draft 축소 후 긴 변이 OCR 최대 긴 변의 이 비율 이상이면 허용
+
+# 전처리 (RECEIPT_PREPROCESS_RATE > 0 일 때)
+PAPER_SAMPLE_EDGE = 512   # 종이 영역 찾을 때 쓰는 축소본의 긴 변
+PAPER_FILL = 0.3          # 행/열에서 밝은 픽셀이 이 비율 이상이면 종이로 봄
+PAPER_MARGIN = 0.02       # crop 여백 (긴 변 대비)
+CONTRAST_PERCENTILES = (1, 99)
+
+
+def _trial_size(im: Image.Image, quality: int) -> int:
+    # 크기 가늠용 시험 인코딩 (optimize/progressive 없이 빠르게)
+    buf = BytesIO()
+    im.save(buf, format="JPEG", quality=quality)
+    return buf.tell()
+
+
+def _final_encode(im: Image.Image, quality: int) -> bytes:
+    buf = BytesIO()
+    try:
+        im.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+    except OSError:
+        # optimize 실패 시 재시도
+        buf = BytesIO()
+        im.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _search_quality(im: Image.Image, target_bytes: int, lo: int, lo_size: int, hi: int, hi_size: int) -> int:
+    """
+    lo는 target 이하, hi는 초과인 구간에서 target 이하가 되는 가장 높은 quality를 찾는다.
+    크기는 quality에 대해 단조 증가하므로 선형 보간으로 다음 시험 지점을 고른다(보통 2~3회).
+    """
+    while hi - lo > QUALITY_STEP:
+        q = lo + int((target_bytes - lo_size) * (hi - lo) / max(1, hi_size - lo_size))
+        q = min(max(q, lo + 1), hi - 1)
+        size = _trial_size(im, q)
+        if size <= target_bytes:
+            lo, lo_size = q, size
+        else:
+            hi, hi_size = q, size
+    return lo
+
+
+def _encode_jpeg_under_limit(im: Image.Image, target_bytes=MAX_OCR_BYTES, known_sizes: dict | None = None,
+                             estimated: frozenset = frozenset()):
+    # known_sizes: 이미 알고 있는 {quality: 시험 인코딩 크기}, estimated: 그중 실측이 아니라 추정인 quality
+    known = dict(known_sizes or {})
+    max_size = known.get(QUALITY_MAX)
+    # 추정치가 target 이하라고 나오면 그대로 믿고 최고 quality를 쓰지 않도록 한 번 실측 (실측값은 다시 재지 않음)
+    if max_size is None or (QUALITY_MAX in estimated and max_size <= target_bytes):
+        max_size = _trial_size(im, QUALITY_MAX)
+
+    if max_size <= target_bytes:
+        quality = QUALITY_MAX
+    else:
+        min_size = known.get(QUALITY_MIN)
+        if min_size is None:
+            min_size = _trial_size(im, QUALITY_MIN)
+        if min_size > target_bytes:
+            return None
+        quality = _search_quality(im, target_bytes, QUALITY_MIN, min_size, QUALITY_MAX, max_size)
+
+    # 최종 결과만 optimize/progressive로 인코딩 (보통 시험 인코딩보다 작음)
+    data = _final_encode(im, quality)
+    while len(data) > target_bytes and quality > QUALITY_MIN:
+        quality = max(QUALITY_MIN, quality - 5)
+        data = _final_encode(im, quality)
+    return data if len(data) <= target_bytes else None
+
+
+def _fit_scale(im: Image.Image, target_bytes: int, min_size: int) -> tuple[Image.Image | None, int]:
+    """
+    최저 quality로도 target을 넘으면 해상도를 줄인다.
+    JPEG 크기는 픽셀 수에 거의 비례하므로 (target / 현재 크기)의 제곱근으로 배율을 추정해 바로 줄인다.
+    (줄인 이미지, 그 이미지의 최저 quality 시험 크기)를 반환.
+    """
+    w, h = im.size
+    current = im
+    factor = 1.0
+    size = min_size
+    for _ in range(MAX_RESCALES):
+        if size <= target_bytes:
+            return current, size
+        factor *= math.sqrt(target_bytes / size) * SCALE_MARGIN
+        nw, nh = int(w * factor), int(h * factor)
+        if nw < MIN_EDGE or nh < MIN_EDGE:
+            return None, size
+        # 항상 원본에서 줄여서 화질 손실 누적 방지
+        current = im.resize((nw, nh), Image.LANCZOS)
+        size = _trial_size(current, QUALITY_MIN)
+    return (current if size <= target_bytes else None), size
+
+
+def encode_jpeg_for_ocr(im: Image.Image, target_bytes: int = MAX_OCR_BYTES) -> bytes | None:
+    # 원본 해상도에서 quality만으로 맞출 수 있는지 먼저 보고, 안 되면 배율 추정 후 quality 탐색
+    max_size = _trial_size(im, QUALITY_MAX)
+    if max_size <= target_bytes:
+        return _encode_jpeg_under_limit(im, target_bytes, {QUALITY_MAX: max_size})
+    min_size = _trial_size(im, QUALITY_MIN)
+    if min_size <= target_bytes:
+        return _encode_jpeg_under_limit(im, target_bytes, {QUALITY_MAX: max_size, QUALITY_MIN: min_size})
+
+    fitted, fitted_min = _fit_scale(im, target_bytes, min_size)
+    if fitted is None:
+        return None
+    # 줄인 이미지의 최고 quality 크기는 원본 비율로 추정 (시험 인코딩 1회 절약)
+    est_max = int(max_size * fitted_min / min_size)
+    return _encode_jpeg_under_limit(
+        fitted, target_bytes, {QUALITY_MAX: est_max, QUALITY_MIN: fitted_min}, estimated=frozenset({QUALITY_MAX}),
+    )
+
+
+def _jpeg_name(django_file) -> str:
+    # 파일명 교체 (파일 객체 또는 파일명 문자열)
+    base_name = django_file if isinstance(django_file, str) else getattr(django_file, "name", "upload")
+    base_name = base_name or "upload"
+    if "." in base_name:
+        base_name = base_name.rsplit(".", 1)[0]
+    return f"{base_name}.jpg"
+
+
+def _ocr_max_edge() -> int:
+    return getattr(settings, "RECEIPT_OCR_MAX_EDGE", 2048)
+
+
+def _max_pixels() -> int:
+    return getattr(settings, "RECEIPT_MAX_PIXELS", 40_000_000)
+
+
+def _preprocess_max_edge() -> int:
+    return getattr(settings, "RECEIPT_PREPROCESS_MAX_EDGE", 1600)
+
+
+def _should_preprocess(sample_key) -> bool:
+    # RECEIPT_PREPROCESS_RATE 비율만큼만 전처리 (0이면 끔, 1이면 전부) - 전/후 지표 비교용
+    # sample_key(사용자 id)의 해시로 정해서 같은 사용자는 항상 같은 쪽: 같은 사진을 다시 올려도 같은 JPEG가 나와 캐시가 맞음
+    rate = getattr(settings, "RECEIPT_PREPROCESS_RATE", 0.0)
+    if rate <= 0:
+        return False
+    digest = hashlib.sha256(str(sample_key).encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64 < rate
+
+
+def open_for_ocr(fp, max_edge: int | None = None, max_pixels: int | None = None) -> Image.Image:
+    """
+    업로드 파일을 OCR에 필요한 해상도 근처로 바로 디코딩.
+    - 헤더만 읽고 픽셀 수가 max_pixels를 넘으면 디코딩 전에 거절 (압축 폭탄 방지)
+    - JPEG는 draft 모드로 DCT 단계에서 1/2, 1/4, 1/8 축소 디코딩
+    - 그 외 포맷은 디코딩 후 reduce()로 정수배 축소
+    """
+    max_edge = max_edge or _ocr_max_edge()
+    max_pixels = max_pixels or _max_pixels()
+
+    im = Image.open(fp)
+    w, h = im.size
+    if w * h > max_pixels:
+        raise ValueError(f"이미지 해상도가 너무 큽니다: {w}x{h}")
+
+    if im.format == "JPEG" and max(w, h) > max_edge:
+        # draft는 요청 크기 이상을 유지하는 배율만 고르므로, 긴 변이 max_edge의 90% 이상 남는
+        # 가장 큰 1/2^n 배율을 직접 골라 그 크기로 요청
+        scale = 1
+        while scale < 8 and max(w, h) / (scale * 2) >= max_edge * DRAFT_TOLERANCE:
+            scale *= 2
+        if scale > 1:
+            im.draft("RGB", (math.ceil(w / scale), math.ceil(h / scale)))
+    im.load()
+
+    factor = max(im.size) // max_edge
+    if factor >= 2:
+        im = im.reduce(factor)
+    return im
+
+
+def _otsu_threshold(gray: np.ndarray) -> int:
+    # 밝기 히스토그램에서 두 집단(종이/배경)의 분산이 가장 크게 갈리는 값
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    cum_mean = np.cumsum(hist * np.arange(256))
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def _paper_box(gray: np.ndarray) -> tuple[int, int, int, int] | None:
+    """
+    배경보다 밝은 종이 영역의 (left, top, right, bottom). 찾지 못하거나 crop할 게 없으면 None.
+    축소본에서 Otsu로 밝은 픽셀을 고르고, 밝은 픽셀이 충분한 행/열 범위를 종이로 본다.
+    """
+    h, w = gray.shape
+    step = max(1, max(h, w) // PAPER_SAMPLE_EDGE)
+    small = gray[::step, ::step]
+    bright = small > _otsu_threshold(small)
+
+    rows = np.flatnonzero(bright.mean(axis=1) >= PAPER_FILL)
+    cols = np.flatnonzero(bright.mean(axis=0) >= PAPER_FILL)
+    if not len(rows) or not len(cols):
+        return None
+
+    margin = int(max(h, w) * PAPER_MARGIN)
+    top = max(0, rows[0] * step - margin)
+    bottom = min(h, (rows[-1] + 1) * step + margin)
+    left = max(0, cols[0] * step - margin)
+    right = min(w, (cols[-1] + 1) * step + margin)
+
+    # 거의 전체거나(배경 없음) 너무 작으면(잘못 찾음) crop하지 않음
+    ratio = (bottom - top) * (right - left) / (h * w)
+    if ratio > 0.95 or ratio < 0.1:
+        return None
+    return left, top, right, bottom
+
+
+def preprocess_for_ocr(im: Image.Image, max_edge: int) -> Image.Image:
+    """
+    OCR 전송량을 줄이는 전처리: 흑백 변환 -> 종이 영역 crop -> 대비 정규화 -> 긴 변 제한.
+    흑백 변환은 Pillow, crop/대비는 같은 버퍼를 NumPy로 처리한다. 결과는 'L' 모드.
+    """
+    gray = np.asarray(im.convert("L"))
+
+    box = _paper_box(gray)
+    if box is not None:
+        left, top, right, bottom = box
+        gray = gray[top:bottom, left:right]
+
+    # 양 끝 1%를 잘라 0~255로 늘림 (LUT 한 번으로 적용)
+    step = max(1, max(gray.shape) // PAPER_SAMPLE_EDGE)
+    lo, hi = np.percentile(gray[::step, ::step], CONTRAST_PERCENTILES)
+    if hi - lo >= 16:
+        lut = np.clip((np.arange(256) - lo) * (255.0 / (hi - lo)), 0, 255).astype(np.uint8)
+        gray = lut[gray]
+
+    out = Image.fromarray(np.ascontiguousarray(gray), mode="L")
+    if max(out.size) > max_edge:
+        out.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    return out
+
+
+def _convert(fp, max_edge: int, max_pixels: int, preprocess: bool = False) -> bytes:
+    with open_for_ocr(fp, max_edge=max_edge, max_pixels=max_pixels) as im:
+        im = ImageOps.exif_transpose(im)
+        if preprocess:
+            im = preprocess_for_ocr(im, min(max_edge, _preprocess_max_edge()))
+            return encode_jpeg_for_ocr(im, target_bytes=MAX_OCR_BYTES)
+
+        if im.mode != "RGB":
+            im = im.convert("RGB")
+
+        # 정수배 축소 후에도 긴 변이 남으면 마지막으로 맞춤
+        if max(im.size) > max_edge:
+            im.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        return encode_jpeg_for_ocr(im, target_bytes=MAX_OCR_BYTES)
+
+
+def ocr_variant(jpeg_bytes: bytes) -> str:
+    # 지표 구분용: 전처리된(흑백) JPEG면 'gray', 아니면 'color' (헤더만 읽음)
+    with Image.open(BytesIO(jpeg_bytes)) as im:
+        return "gray" if im.mode == "L" else "color"
+
+
+def transcode_for_ocr(source, name: str, max_edge: int, max_pixels: int, preprocess: bool = False) -> tuple[bytes, str]:
+    """
+    프로세스 풀에서 돌릴 수 있는 변환 함수 (인자는 모두 pickle 가능).
+    source: 디스크에 스풀된 업로드의 경로(str) 또는 메모리 업로드의 bytes
+    """
+    try:
+        fp = open(source, "rb") if isinstance(source, str) else BytesIO(source)
+        with fp:
+            jpeg_bytes = _convert(fp, max_edge, max_pixels, preprocess)
+    except Exception as e:
+        raise ValueError(f"이미지 변환 실패: {e}")
+
+    if jpeg_bytes is None:
+        raise ValueError("1MB 이하 JPEG로 변환 실패")
+    return jpeg_bytes, _jpeg_name(name)
+
+
+def transcode_args(django_file, sample_key) -> tuple:
+    """
+    transcode_for_ocr에 넘길 인자 (source, name, max_edge, max_pixels, preprocess).
+    큰 업로드는 임시 파일 경로만 넘기고(복사 없음), 메모리 업로드는 bytes로 넘김
+    sample_key: 전처리 여부를 정하는 값 (업로드한 사용자 id)
+    """
+    return (
+        _upload_source(django_file), getattr(django_file, "name", "upload"),
+        _ocr_max_edge(), _max_pixels(), _should_preprocess(sample_key),
+    )
+
+
+def path_transcode_args(path: str, name: str, sample_key) -> tuple:
+    # 디스크에 있는 파일(S3에서 받은 임시 파일 등)용 transcode_for_ocr 인자
+    return (path, name, _ocr_max_edge(), _max_pixels(), _should_preprocess(sample_key))
+
+
+def _upload_source(django_file):
+    if hasattr(django_file, "temporary_file_path"):
+        return django_file.temporary_file_path()
+    django_file.seek(0)
+    data = django_file.read()
+    django_file.seek(0)
+    return data
+
+
+def to_jpeg_under_1mb(django_file, preprocess: bool = False) -> tuple[bytes, str]:
+    # 1MB 넘는 파일 다운그레이드, jpeg 변환 (업로드 파일에서 바로 디코딩, 별도 복사 없음)
+    django_file.seek(0)
+
+    try:
+        jpeg_bytes = _convert(django_file, _ocr_max_edge(), _max_pixels(), preprocess)
+    except Exception as e:
+        raise ValueError(f"이미지 변환 실패: {e}")
+    finally:
+        django_file.seek(0)
+
+    if jpeg_bytes is None:
+        raise ValueError("1MB 이하 JPEG로 변환 실패")
+    return jpeg_bytes, _jpeg_name(django_file)
@@ -0,0 +1,90 @@
+import random
+import time
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from stores.address import normalize_address
+from receipts.matching import StoreAddressIndex, best_of_store
+from config.metrics import counter
+
+GU = ["종로구", "중구", "용산구", "성동구", "광진구", "동대문구", "중랑구", "성북구", "강북구", "도봉구",
+      "노원구", "은평구", "서대문구", "마포구", "양천구", "강서구", "구로구", "금천구", "영등포구", "동작구",
+      "관악구", "서초구", "강남구", "송파구", "강동구"]
+DONG_SUFFIX = ["동", "1동", "2동", "3가", "4가"]
+ROAD_HEAD = ["세종", "을지", "퇴계", "청계", "종", "율곡", "창경궁", "돈화문", "삼일", "충무",
+             "남대문", "소공", "명동", "장충단", "다산", "동호", "왕십리", "마장", "천호", "올림픽"]
+ROAD_TAIL = ["로", "대로", "길", "로1길", "로2길", "로3길", "로4길", "로5길"]
+
+
+def synthetic_rows(n: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(1, n + 1):
+        gu = rng.choice(GU)
+        road = f"{rng.choice(ROAD_HEAD)}{rng.choice(ROAD_TAIL)}"
+        dong = f"{rng.choice(ROAD_HEAD)}{rng.choice(DONG_SUFFIX)}"
+        rows.append({
+            "store_id": i,
+            "store_name": f"가게{i}",
+            "store_image": None,
+            # 유니크 보장을 위해 번호에 id를 섞음
+            "road_address": f"서울특별시 {gu} {road} {i % 400 + 1}-{i // 400 + 1}",
+            "street_address": f"서울특별시 {gu} {dong} {i // 7 + 1}-{i % 7 + 1}",
+        })
+    return rows
+
+
+class Command(BaseCommand):
+    help = '영수증-점포 주소 매칭의 요청당 비용을 점포 수별로 측정합니다 (DB 미사용, 합성 데이터).'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="100,1000,10000,100000")
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--scan-max", type=int, default=10000,
+                            help="전체 스캔(기존 방식) 비교를 수행할 최대 점포 수")
+
+    def handle(self, *args, **options):
+        sizes = [int(x) for x in options["sizes"].split(",") if x]
+        n_queries = options["queries"]
+        rng = random.Random(7)
+
+        self.stdout.write(f"{'stores':>8} {'build(s)':>9} {'index(ms/q)':>12} {'scan(ms/q)':>11} {'top5 same':>10} {'tree hit':>9}")
+        for size in sizes:
+            rows = synthetic_rows(size)
+            t0 = time.perf_counter()
+            index = StoreAddressIndex()
+            index.rebuild(rows)
+            build_s = time.perf_counter() - t0
+
+            # 영수증 OCR처럼 약간 흐트러진 주소로 조회
+            picks = [rng.choice(rows) for _ in range(n_queries)]
+            queries = []
+            for row in picks:
+                addr = row["road_address"] if rng.random() < 0.5 else row["street_address"]
+                queries.append(normalize_address(f"({addr.replace('서울특별시', '서울')} 1층)"))
+
+            hits_before = counter("receipts.match.tree_hit").value
+            t0 = time.perf_counter()
+            index_results = [index.top_matches(q, k=5) for q in queries]
+            index_ms = (time.perf_counter() - t0) * 1000 / n_queries
+            tree_hit = f"{counter('receipts.match.tree_hit').value - hits_before}/{n_queries}"
+
+            scan_ms = "-"
+            same = "-"
+            if size <= options["scan_max"]:
+                stores = [SimpleNamespace(**r) for r in rows]
+                scan_queries = queries[: max(1, min(n_queries, 20))]
+                t0 = time.perf_counter()
+                scan_results = []
+                for q in scan_queries:
+                    scored = [best_of_store(q, s) for s in stores]
+                    scored.sort(key=lambda x: (-x["score"], x["id"]))
+                    scan_results.append(scored[:5])
+                scan_ms = f"{(time.perf_counter() - t0) * 1000 / len(scan_queries):.2f}"
+                # 색인은 n-gram 후보 안에서만 채점하므로, 흐트러진 실제 주소라면 전체 스캔과 같은지 확인 (상위 5개 점포/점수 전체 비교)
+                agree = sum(
+                    [(c["store_id"], c["score"]) for c in a] == [(c["store_id"], c["score"]) for c in b]
+                    for a, b in zip(index_results, scan_results)
+                )
+                same = f"{agree}/{len(scan_results)}"
+
+            self.stdout.write(f"{size:>8} {build_s:>9.2f} {index_ms:>12.2f} {scan_ms:>11} {same:>10} {tree_hit:>9}")
@@ -0,0 +1,135 @@
+import random
+import time
+from io import BytesIO
+from unittest import mock
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+from receipts.imaging import MAX_OCR_BYTES, to_jpeg_under_1mb
+
+# 휴대폰 카메라 해상도 (세로/가로 섞어서)
+PHONE_SIZES = [(3024, 4032), (4032, 3024), (3000, 4000), (2268, 4032), (1080, 1920), (4284, 5712)]
+
+
+def make_receipt_photo(size: tuple[int, int], seed: int) -> bytes:
+    # 책상 위 영수증 사진을 흉내낸 합성 이미지 (종이 + 글자 줄 + 그림자/노이즈)
+    rng = random.Random(seed)
+    w, h = size
+    desk = Image.linear_gradient("L").resize((w, h)).convert("RGB")
+    desk = Image.blend(desk, Image.new("RGB", (w, h), (120, 95, 70)), 0.6)
+
+    pw, ph = int(w * rng.uniform(0.45, 0.6)), int(h * rng.uniform(0.75, 0.9))
+    paper = Image.new("RGB", (pw, ph), (245, 244, 238))
+    draw = ImageDraw.Draw(paper)
+    font = ImageFont.load_default(size=max(12, pw // 28))
+    y = pw // 20
+    line_h = max(14, pw // 22)
+    while y < ph - line_h * 2:
+        words = rng.randint(2, 6)
+        text = " ".join(
+            "".join(rng.choice("0123456789ABCDEFGHJKLMNPRSTUVWXYZ,.-:") for _ in range(rng.randint(2, 9)))
+            for _ in range(words)
+        )
+        draw.text((pw // 15, y), text, fill=(30, 30, 30), font=font)
+        if rng.random() < 0.3:
+            draw.text((pw * 2 // 3, y), f"{rng.randint(1, 99)},{rng.randint(0, 999):03d}", fill=(30, 30, 30), font=font)
+        y += line_h
+    paper = paper.rotate(rng.uniform(-4, 4), expand=True, fillcolor=(0, 0, 0))
+    mask = paper.convert("L").point(lambda v: 255 if v > 10 else 0)
+    desk.paste(paper, ((w - paper.width) // 2, (h - paper.height) // 2), mask)
+
+    noise = Image.merge("RGB", [Image.effect_noise((w, h), 40) for _ in range(3)])
+    photo = Image.blend(desk, noise, 0.18).filter(ImageFilter.GaussianBlur(0.4))
+
+    buf = BytesIO()
+    photo.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+# 기존 구현 (비교 기준): quality 85->50 선형 탐색 x 배율 0.9->0.5, 매번 optimize/progressive
+def _legacy_encode(im, target_bytes=MAX_OCR_BYTES):
+    for q in (85, 80, 75, 70, 60, 50):
+        buf = BytesIO()
+        try:
+            im.save(buf, format="JPEG", quality=q, optimize=True, progressive=True)
+        except OSError:
+            buf = BytesIO()
+            im.save(buf, format="JPEG", quality=q)
+        data = buf.getvalue()
+        if len(data) <= target_bytes:
+            return data
+    return None
+
+
+def legacy_to_jpeg_under_1mb(raw: bytes) -> bytes:
+    with Image.open(BytesIO(raw)) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode != "RGB":
+            im = im.convert("RGB")
+        data = _legacy_encode(im)
+        if data is not None:
+            return data
+        w, h = im.size
+        for scale in (0.9, 0.8, 0.7, 0.6, 0.5):
+            nw, nh = int(w * scale), int(h * scale)
+            if nw < 64 or nh < 64:
+                break
+            data = _legacy_encode(im.resize((nw, nh), Image.LANCZOS))
+            if data is not None:
+                return data
+    raise ValueError("1MB 이하 JPEG로 변환 실패")
+
+
+class _Upload(BytesIO):
+    name = "receipt.jpg"
+
+
+class Command(BaseCommand):
+    help = '영수증 JPEG 변환(1MB 이하) 기존/신규 구현의 인코딩 횟수와 소요 시간을 비교합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=len(PHONE_SIZES), help="합성 영수증 사진 수")
+        parser.add_argument("--skip-legacy", action="store_true")
+
+    def _measure(self, fn):
+        original_save = Image.Image.save
+        calls = {"n": 0, "opt": 0}
+
+        def counting_save(im, fp, format=None, **params):
+            if (format or "").upper() == "JPEG":
+                calls["n"] += 1
+                calls["opt"] += bool(params.get("optimize"))
+            return original_save(im, fp, format, **params)
+
+        with mock.patch.object(Image.Image, "save", counting_save):
+            started = time.perf_counter()
+            try:
+                out = fn()
+                size = len(out)
+            except ValueError:
+                size = None
+            elapsed = time.perf_counter() - started
+        return f"{calls['n']}({calls['opt']})", elapsed, size
+
+    def handle(self, *args, **options):
+        corpus = [
+            (PHONE_SIZES[i % len(PHONE_SIZES)], make_receipt_photo(PHONE_SIZES[i % len(PHONE_SIZES)], seed=i))
+            for i in range(options["count"])
+        ]
+
+        self.stdout.write(f"{'size':>11} {'input':>8} | {'old enc':>8} {'old s':>6} {'old out':>8} | {'new enc':>8} {'new s':>6} {'new out':>8}")
+        # 인코딩 횟수 표기: 전체(그중 optimize/progressive 인코딩)
+        totals = {"old": 0.0, "new": 0.0}
+        for (w, h), raw in corpus:
+            if options["skip_legacy"]:
+                old = ("-", 0.0, None)
+            else:
+                old = self._measure(lambda: legacy_to_jpeg_under_1mb(raw))
+            new = self._measure(lambda: to_jpeg_under_1mb(_Upload(raw))[0])
+            totals["old"] += old[1]
+            totals["new"] += new[1]
+            self.stdout.write(
+                f"{w:>5}x{h:<5} {len(raw) // 1024:>6}KB | "
+                f"{old[0]:>8} {old[1]:>6.2f} {str(old[2] // 1024) + 'KB' if old[2] else 'FAIL':>8} | "
+                f"{new[0]:>8} {new[1]:>6.2f} {str(new[2] // 1024) + 'KB' if new[2] else 'FAIL':>8}"
+            )
+        self.stdout.write(f"total wall time: old {totals['old']:.2f}s, new {totals['new']:.2f}s")
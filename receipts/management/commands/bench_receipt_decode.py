@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from io import BytesIO
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+from receipts.imaging import encode_jpeg_for_ocr, to_jpeg_under_1mb
+from .bench_jpeg_encode import PHONE_SIZES, make_receipt_photo
+
+
+class _SpooledUpload:
+    # 디스크에 스풀된 업로드(TemporaryUploadedFile)처럼 name/read/seek만 제공
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self._fp = open(path, "rb")
+
+    def __getattr__(self, item):
+        return getattr(self._fp, item)
+
+
+def legacy_to_jpeg(upload) -> bytes:
+    # 기존 경로: 업로드 전체를 메모리로 읽고 BytesIO로 한 번 더 감싼 뒤 원본 해상도로 디코딩
+    raw = upload.read()
+    upload.seek(0)
+    with Image.open(BytesIO(raw)) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode != "RGB":
+            im = im.convert("RGB")
+        return encode_jpeg_for_ocr(im)
+
+
+def new_to_jpeg(upload) -> bytes:
+    return to_jpeg_under_1mb(upload)[0]
+
+
+IMPLS = {"legacy": legacy_to_jpeg, "new": new_to_jpeg}
+
+
+def _vm_kb(field: str) -> int | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _run_one(impl: str, path: str, queue):
+    # 자식 프로세스에서 한 장만 처리하고 (최대 RSS 증가량 KB, 소요 시간, 출력 크기) 보고
+    getattr(settings, "RECEIPT_OCR_MAX_EDGE", None)  # settings/플러그인 import 비용은 측정에서 제외
+    Image.init()
+    base = _vm_kb("VmRSS") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    out = IMPLS[impl](_SpooledUpload(path))
+    elapsed = time.perf_counter() - started
+    peak = _vm_kb("VmHWM") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((peak - base, elapsed, len(out)))
+
+
+class Command(BaseCommand):
+    help = '영수증 이미지 디코딩 경로별 장당 최대 RSS(메모리) 증가량과 소요 시간을 측정합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=len(PHONE_SIZES), help="합성 영수증 사진 수")
+
+    def handle(self, *args, **options):
+        # 부모의 힙을 물려받지 않도록 매번 새 프로세스(spawn)에서 측정
+        ctx = multiprocessing.get_context("spawn")
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(options["count"]):
+                size = PHONE_SIZES[i % len(PHONE_SIZES)]
+                path = os.path.join(tmp, f"receipt_{i}.jpg")
+                with open(path, "wb") as f:
+                    f.write(make_receipt_photo(size, seed=i))
+                paths.append((size, path))
+
+            self.stdout.write(f"{'size':>11} {'input':>8} | {'legacy RSS':>10} {'s':>5} | {'new RSS':>10} {'s':>5} {'out':>7}")
+            for (w, h), path in paths:
+                row = {}
+                for impl in IMPLS:
+                    queue = ctx.Queue()
+                    proc = ctx.Process(target=_run_one, args=(impl, path, queue))
+                    proc.start()
+                    row[impl] = queue.get()
+                    proc.join()
+                (old_kb, old_s, _), (new_kb, new_s, out) = row["legacy"], row["new"]
+                self.stdout.write(
+                    f"{w:>5}x{h:<5} {os.path.getsize(path) // 1024:>6}KB | "
+                    f"{old_kb / 1024:>8.1f}MB {old_s:>5.2f} | {new_kb / 1024:>8.1f}MB {new_s:>5.2f} {out // 1024:>5}KB"
+                )
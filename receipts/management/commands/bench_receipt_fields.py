@@ -0,0 +1,163 @@
+import json
+import random
+import timeit
+from datetime import datetime as _dt, date as _date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from receipts.fields import parse_date, parse_number, parse_time
+
+SAMPLES_PATH = Path(__file__).resolve().parents[2] / "samples" / "ocr_fields.json"
+
+
+# 기존 구현 (비교 기준): strptime 연쇄 + 함수 안 import + replace 7번
+
+def legacy_parse_date(date_obj):
+    fmt = (date_obj or {}).get("formatted") or {}
+    y, m, d = fmt.get("year"), fmt.get("month"), fmt.get("day")
+    if y and m and d:
+        try:
+            # 날짜는 반드시 date 객체로
+            return _date(int(y), int(m), int(d))
+        except Exception:
+            pass
+
+    # 폴백: "YYYY-MM-DD" 문자열
+    text = (date_obj or {}).get("text")
+    if text:
+        s = str(text).strip()
+        for fmt_str in ("%Y-%m-%d", "%Y.%m.%d", "%Y/%m/%d"):
+            try:
+                return _dt.strptime(s, fmt_str).date()
+            except Exception:
+                continue
+    return None
+
+
+def legacy_parse_time(time_obj):
+    fmt = (time_obj or {}).get("formatted") or {}
+    hh, mm, ss = fmt.get("hour"), fmt.get("minute"), fmt.get("second")
+    if hh and mm and ss:
+        try:
+            # "HH:MM:SS"로 파싱하여 time 객체 반환
+            return _dt.strptime(f"{str(hh).zfill(2)}:{str(mm).zfill(2)}:{str(ss).zfill(2)}", "%H:%M:%S").time()
+        except Exception:
+            pass
+
+    # 폴백: "18: 59: 29"처럼 공백 포함 형태
+    text = (time_obj or {}).get("text")
+    if text:
+        import re
+        cleaned = re.sub(r"\s+", "", str(text))  # "18: 59: 29" -> "18:59:29"
+        for fmt_str in ("%H:%M:%S",):
+            try:
+                return _dt.strptime(cleaned, fmt_str).time()
+            except Exception:
+                continue
+    return None
+
+def legacy_parse_number(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    s = str(value).strip()
+    if not s:
+        return None
+    neg = False
+    if s.startswith("(") and s.endswith(")"):
+        neg = True
+        s = s[1:-1]
+    for sym in [" ", ",", "KRW", "₩", "원", "$", "USD"]:
+        s = s.replace(sym, "")
+    try:
+        num = float(s)
+        return -num if neg else num
+    except Exception:
+        return None
+
+
+def _mutations(text: str, rng: random.Random, n: int) -> list[str]:
+    # 샘플 문자열을 조금씩 흔든 변형 (공백/구분자/숫자 바꾸기, 글자 빼기/넣기)
+    alphabet = "0123456789 .-/:,()원₩$KRWUSD\t"
+    out = []
+    for _ in range(n):
+        chars = list(text)
+        for _ in range(rng.randint(1, 3)):
+            op = rng.random()
+            pos = rng.randint(0, len(chars))
+            if op < 0.4 and chars:
+                chars[min(pos, len(chars) - 1)] = rng.choice(alphabet)
+            elif op < 0.7:
+                chars.insert(pos, rng.choice(alphabet))
+            elif chars:
+                del chars[min(pos, len(chars) - 1)]
+        out.append("".join(chars))
+    return out
+
+
+def _same(a, b) -> bool:
+    # nan은 자기 자신과 같지 않으므로 repr로 비교
+    return type(a) is type(b) and repr(a) == repr(b)
+
+
+class Command(BaseCommand):
+    help = '영수증 날짜/시간/금액 파서의 기존 구현과 결과가 같은지 확인하고 속도를 비교합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fuzz", type=int, default=200, help="샘플마다 만들 변형 수")
+        parser.add_argument("--number", type=int, default=2000, help="timeit 반복 횟수")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        samples = json.loads(SAMPLES_PATH.read_text(encoding="utf-8"))
+        rng = random.Random(options["seed"])
+
+        dates, times, prices = [], [], []
+        for sample in samples:
+            dates.append(sample.get("date"))
+            times.append(sample.get("time"))
+            prices.append(sample.get("price"))
+            for key, bucket in (("date", dates), ("time", times)):
+                text = (sample.get(key) or {}).get("text")
+                if text:
+                    bucket.extend({"text": t} for t in _mutations(text, rng, options["fuzz"]))
+            if isinstance(sample.get("price"), str) and sample["price"]:
+                prices.extend(_mutations(sample["price"], rng, options["fuzz"]))
+
+        cases = (
+            ("date", legacy_parse_date, parse_date, dates),
+            ("time", legacy_parse_time, parse_time, times),
+            ("amount", legacy_parse_number, parse_number, prices),
+        )
+
+        mismatches = 0
+        for name, old, new, inputs in cases:
+            for value in inputs:
+                expected, actual = old(value), new(value)
+                if not _same(expected, actual):
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(f"[{name}] {value!r}: old={expected!r} new={actual!r}"))
+
+        # 속도는 변형 없이 샘플 원본(실제 OCR 형태)만으로 측정
+        number = options["number"]
+        timed_cases = (
+            ("date", legacy_parse_date, parse_date, [s.get("date") for s in samples]),
+            ("time", legacy_parse_time, parse_time, [s.get("time") for s in samples]),
+            ("amount", legacy_parse_number, parse_number, [s.get("price") for s in samples]),
+        )
+        self.stdout.write(f"{'field':>8} {'inputs':>7} | {'old us':>8} {'new us':>8} {'speedup':>8}")
+        for name, old, new, corpus in timed_cases:
+            old_s = timeit.timeit(lambda: [old(v) for v in corpus], number=number)
+            new_s = timeit.timeit(lambda: [new(v) for v in corpus], number=number)
+            per = number * len(corpus)
+            self.stdout.write(
+                f"{name:>8} {len(corpus):>7} | {old_s / per * 1e6:>8.2f} {new_s / per * 1e6:>8.2f} {old_s / new_s:>7.1f}x"
+            )
+
+        total = sum(len(c[3]) for c in cases)
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"결과 불일치 {mismatches}/{total}건"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{total}개 입력 모두 기존 구현과 같은 결과"))
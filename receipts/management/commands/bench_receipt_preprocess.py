@@ -0,0 +1,101 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from receipts.imaging import to_jpeg_under_1mb
+from receipts.management.commands.bench_jpeg_encode import PHONE_SIZES, _Upload, make_receipt_photo
+from receipts.pipeline import ReceiptPipelineError, call_ocr, parse_receipt_image
+
+# OCR 결과 비교에 쓰는 필드 (원본 JSON/uid 제외)
+COMPARE_FIELDS = ("payment_date", "payment_time", "store_name", "store_address", "total_amount")
+
+
+class Command(BaseCommand):
+    help = '영수증 전처리(흑백/crop/대비) 전후의 OCR 전송 크기, 변환 시간, (선택) OCR 지연과 추출 결과를 비교합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help="실제 영수증 사진 폴더 (없으면 합성 사진 사용)")
+        parser.add_argument("--count", type=int, default=len(PHONE_SIZES), help="합성 사진 수")
+        parser.add_argument("--ocr", action="store_true", help="실제 OCR을 호출해 지연/추출 필드까지 비교 (과금 주의)")
+
+    def _corpus(self, options):
+        if options["dir"]:
+            paths = sorted(p for p in Path(options["dir"]).iterdir() if p.is_file())
+            return [(p.name, p.read_bytes()) for p in paths]
+        return [
+            (f"synthetic-{i}.jpg", make_receipt_photo(PHONE_SIZES[i % len(PHONE_SIZES)], seed=i))
+            for i in range(options["count"])
+        ]
+
+    def _transcode(self, name, raw, preprocess):
+        upload = _Upload(raw)
+        upload.name = name
+        started = time.perf_counter()
+        jpeg_bytes, new_name = to_jpeg_under_1mb(upload, preprocess=preprocess)
+        return jpeg_bytes, new_name, (time.perf_counter() - started) * 1000
+
+    def _ocr(self, jpeg_bytes, name):
+        started = time.perf_counter()
+        try:
+            ocr = call_ocr(jpeg_bytes, name)
+        except ReceiptPipelineError as e:
+            return None, (time.perf_counter() - started) * 1000, e.body.get("detail")
+        elapsed = (time.perf_counter() - started) * 1000
+        images = ocr.get("images") or [{}]
+        fields, skip = parse_receipt_image(images[0])
+        if fields is None:
+            return None, elapsed, skip["reason"]
+        return {k: fields.get(k) for k in COMPARE_FIELDS}, elapsed, None
+
+    def handle(self, *args, **options):
+        totals = {"color": 0, "gray": 0, "color_ms": 0.0, "gray_ms": 0.0, "ocr_color": 0.0, "ocr_gray": 0.0}
+        same_fields = 0
+        compared = 0
+
+        self.stdout.write(f"{'image':>20} | {'color':>8} {'ms':>6} | {'gray':>8} {'ms':>6} {'size':>10}")
+        for name, raw in self._corpus(options):
+            try:
+                color, color_name, color_ms = self._transcode(name, raw, preprocess=False)
+                gray, gray_name, gray_ms = self._transcode(name, raw, preprocess=True)
+            except ValueError as e:
+                self.stdout.write(self.style.WARNING(f"{name:>20} | 변환 실패: {e}"))
+                continue
+
+            totals["color"] += len(color)
+            totals["gray"] += len(gray)
+            totals["color_ms"] += color_ms
+            totals["gray_ms"] += gray_ms
+            with Image.open(_Upload(gray)) as im:
+                gray_size = im.size
+            self.stdout.write(
+                f"{name[:20]:>20} | {len(color) // 1024:>6}KB {color_ms:>6.0f} | "
+                f"{len(gray) // 1024:>6}KB {gray_ms:>6.0f} {gray_size[0]:>4}x{gray_size[1]:<5}"
+            )
+
+            if options["ocr"]:
+                color_fields, color_ocr_ms, color_err = self._ocr(color, color_name)
+                gray_fields, gray_ocr_ms, gray_err = self._ocr(gray, gray_name)
+                totals["ocr_color"] += color_ocr_ms
+                totals["ocr_gray"] += gray_ocr_ms
+                compared += 1
+                if color_fields == gray_fields and color_err == gray_err:
+                    same_fields += 1
+                    verdict = "같음"
+                else:
+                    verdict = f"다름 color={color_fields or color_err} gray={gray_fields or gray_err}"
+                self.stdout.write(f"{'':>20}   OCR {color_ocr_ms:.0f}ms -> {gray_ocr_ms:.0f}ms, 추출 필드 {verdict}")
+
+        if not totals["color"]:
+            return
+        saved = 1 - totals["gray"] / totals["color"]
+        self.stdout.write(
+            f"전송 크기 합계: {totals['color']:,} -> {totals['gray']:,} bytes ({saved * 100:.1f}% 감소), "
+            f"변환 시간 {totals['color_ms']:.0f}ms -> {totals['gray_ms']:.0f}ms"
+        )
+        if compared:
+            self.stdout.write(
+                f"OCR 지연 합계: {totals['ocr_color']:.0f}ms -> {totals['ocr_gray']:.0f}ms, "
+                f"추출 필드 일치 {same_fields}/{compared}"
+            )
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from receipts.models import Receipt, ReceiptRawPayload
+
+
+def _column_bytes(ids: list[int]) -> int:
+    # DB에 실제로 저장된 JSON 컬럼 크기 (LENGTH는 MySQL/SQLite/PostgreSQL 공통)
+    table = connection.ops.quote_name(Receipt._meta.db_table)
+    column = connection.ops.quote_name("receipt_result_raw")
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(SUM(LENGTH({column})), 0) FROM {table} WHERE id IN ({placeholders})", ids)
+        return int(cursor.fetchone()[0] or 0)
+
+
+class Command(BaseCommand):
+    help = 'Receipt.receipt_result_raw에 남은 OCR 원본 JSON을 압축해 ReceiptRawPayload로 옮기고 절약한 용량을 보고합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--dry-run', action='store_true', help='옮기지 않고 절약될 용량만 계산')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        moved = 0
+        before = 0
+        after = 0
+        last_id = 0
+
+        while True:
+            # id 기준으로 끊어 읽기 (이미 옮긴 행은 NULL이 되어 다시 걸리지 않음)
+            batch = list(
+                Receipt.objects
+                .filter(id__gt=last_id, receipt_result_raw__isnull=False)
+                .order_by('id')
+                .values_list('id', 'receipt_result_raw')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            ids = [rid for rid, _ in batch]
+
+            payloads = [ReceiptRawPayload.build(rid, raw) for rid, raw in batch]
+            before += _column_bytes(ids)
+            after += sum(len(p.data) for p in payloads)
+            moved += len(payloads)
+
+            if not dry_run:
+                with transaction.atomic():
+                    # 이미 압축본이 있는 영수증은 그대로 두고 레거시 컬럼만 비움
+                    ReceiptRawPayload.objects.bulk_create(payloads, ignore_conflicts=True)
+                    Receipt.objects.filter(id__in=ids).update(receipt_result_raw=None)
+            self.stdout.write(f'{moved}건 처리 ({before // 1024}KB -> {after // 1024}KB)')
+
+        saved = before - after
+        ratio = (saved / before * 100) if before else 0
+        label = '압축 시 예상' if dry_run else '압축 완료'
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: {moved}건, {before:,} -> {after:,} bytes ({saved:,} bytes, {ratio:.1f}% 절약)'
+        ))
@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from receipts.matching import MATCH_TOP_K, record_store_matches, store_address_index
+from receipts.models import Receipt
+
+
+def rescore_chunk(ids: list[int], k: int) -> int:
+    # 스레드마다 DB 연결을 따로 쓰므로 끝나면 닫아 줌
+    try:
+        receipts = list(Receipt.objects.filter(id__in=ids).only("id", "store_address", "store_matched_at"))
+        record_store_matches(receipts, k=k)
+        return len(receipts)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = '가게 목록이 바뀐 뒤 영수증별 점포 후보(ReceiptStoreMatch)를 청크 단위로 병렬 재계산합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4, help='동시에 처리하는 청크 수')
+        parser.add_argument('--k', type=int, default=MATCH_TOP_K)
+        parser.add_argument('--missing', action='store_true', help='아직 후보를 계산하지 않은 영수증만')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        qs = Receipt.objects.order_by('id')
+        if options['missing']:
+            qs = qs.filter(store_matched_at__isnull=True)
+        ids = list(qs.values_list('id', flat=True))
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+
+        # 점포 색인은 한 번만 읽어 모든 스레드가 공유 (채점(cdist)은 GIL을 놓고 돌아감)
+        store_address_index.ensure_loaded()
+
+        started = time.perf_counter()
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = [executor.submit(rescore_chunk, chunk, options['k']) for chunk in chunks]
+            for future in as_completed(futures):
+                done += future.result()
+                self.stdout.write(f'{done}/{len(ids)}')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'점포 후보 재계산 완료: {done}건 ({elapsed:.1f}s)'))
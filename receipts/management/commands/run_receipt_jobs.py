@@ -0,0 +1,109 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction, close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from receipts.models import ReceiptJob
+from receipts.pipeline import ReceiptPipelineError, run_receipt_pipeline
+
+
+def claim_next_job():
+    # 대기 중이거나 오래 멈춘 작업 하나를 잠그고 running으로 전환 (여러 워커 동시 실행 가능)
+    stale_before = timezone.now() - timedelta(seconds=settings.RECEIPT_JOB_STALE_SECONDS)
+    with transaction.atomic():
+        job = (
+            ReceiptJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ReceiptJob.STATUS_PENDING)
+                | Q(status=ReceiptJob.STATUS_RUNNING, locked_at__lt=stale_before)
+            )
+            .order_by("id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ReceiptJob.STATUS_RUNNING
+        job.attempts += 1
+        job.locked_at = timezone.now()
+        job.save(update_fields=["status", "attempts", "locked_at", "updated"])
+        return job
+
+
+def finish_job(job: ReceiptJob, status: str, result, http_status: int, error: str = "", receipt_id=None):
+    job.status = status
+    job.result = result
+    job.http_status = http_status
+    job.error = error
+    job.receipt_id = receipt_id
+    job.image = b""  # 끝난 작업의 이미지는 S3에만 남김
+    with transaction.atomic():
+        job.save(update_fields=["status", "result", "http_status", "error", "receipt", "image", "updated"])
+
+
+def requeue_job(job: ReceiptJob, error: str):
+    job.status = ReceiptJob.STATUS_PENDING
+    job.error = error
+    with transaction.atomic():
+        job.save(update_fields=["status", "error", "updated"])
+
+
+def process_job(job: ReceiptJob):
+    # OCR/S3 호출은 트랜잭션 밖에서 하고(네트워크를 기다리는 동안 DB 트랜잭션/잠금을 잡지 않음) 결과만 짧게 기록
+    # 첫 시도의 캐시 확인은 작업을 넣을 때 뷰에서 했다. 재시도면 앞선 시도가 영수증을 저장한 뒤 멈췄을 수 있으므로
+    # 같은 사진으로 저장된 본인 영수증(OCR 캐시)을 먼저 찾아 중복 저장하지 않음
+    try:
+        body, http_status, rows = run_receipt_pipeline(
+            bytes(job.image), job.filename, user=job.user, skip_cache=job.attempts <= 1,
+        )
+    except ReceiptPipelineError as e:
+        # OCR이 요청을 처리하지 않은 실패(503)만 남은 횟수만큼 다시 대기열로
+        # 502(읽기 타임아웃 등)는 이미 과금됐을 수 있으므로 다시 보내지 않음
+        if e.status == 503 and job.attempts < settings.RECEIPT_JOB_MAX_ATTEMPTS:
+            requeue_job(job, e.body.get("detail", ""))
+            return
+        # 주소 없음 등 영수증 자체 문제는 재시도해도 같으므로 바로 종료
+        finish_job(
+            job,
+            ReceiptJob.STATUS_FAILED if e.status >= 400 else ReceiptJob.STATUS_DONE,
+            e.body,
+            e.status,
+            error=e.body.get("detail", "") if e.status >= 400 else "",
+        )
+        return
+    except Exception as e:
+        if job.attempts < settings.RECEIPT_JOB_MAX_ATTEMPTS:
+            requeue_job(job, str(e))
+            return
+        finish_job(job, ReceiptJob.STATUS_FAILED, None, 500, error=str(e))
+        return
+
+    saved = body.get("saved") or []
+    finish_job(job, ReceiptJob.STATUS_DONE, body, http_status, receipt_id=saved[0]["id"] if saved else None)
+
+
+class Command(BaseCommand):
+    help = '영수증 OCR 작업 큐(ReceiptJob)를 처리합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='대기 중인 작업을 모두 처리하고 종료')
+        parser.add_argument('--sleep', type=float, default=1.0, help='대기 작업이 없을 때 쉬는 시간(초)')
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            process_job(job)
+            processed += 1
+            self.stdout.write(f"job {job.job_id}: {job.status}")
+
+        self.stdout.write(self.style.SUCCESS(f'영수증 작업 {processed}건 처리 완료'))
@@ -0,0 +1,552 @@
+import heapq
+import math
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rapidfuzz import fuzz, process
+
+from stores.address import normalize_address
+from stores.catalog import bump_catalog_version, catalog_changes, catalog_version
+from stores.models import Store
+from config.metrics import counter
+from .address import address_ngrams, parse_address
+from .models import Receipt, ReceiptStoreMatch
+
+# n-gram 후보 검색 파라미터
+NGRAM_SIZE = 2
+CANDIDATE_LIMIT = 50          # 퍼지 채점까지 가는 후보 수
+BOUND_POOL_LIMIT = 500        # 점수 상한을 계산해 추가 채점 여부를 보는 n-gram 후보 수
+POSTING_BUDGET = 8_000        # 요청 1건당 훑는 posting 항목 수 상한
+BRANCH_LIMIT = 50             # 번지 없이 로/동 단위로 확정할 때 허용하는 최대 점포 수
+MATRIX_CELLS = 4_000_000      # cdist 한 번에 계산하는 (영수증 x 점포) 셀 수 상한
+SCORE_EPSILON = 1e-9          # 점수 상한 비교 시 부동소수 오차 여유
+STORE_FIELDS = (
+    "store_id", "store_name", "store_image", "road_address", "street_address",
+    "road_address_norm", "street_address_norm",
+)
+
+
+def score_pair(a: str, b: str) -> dict:
+    na, nb = normalize_address(a), normalize_address(b)
+    return {
+        "ratio": fuzz.ratio(na, nb),
+        "partial": fuzz.partial_ratio(na, nb),
+        "a": na,  # 디버깅용
+        "b": nb,  # 디버깅용
+    }
+
+
+def choose_select_type(road_ratio, road_partial, num_ratio, num_partial) -> tuple[str, float]:
+    # 도로명/지번 각각 채점 후 더 좋은 쪽을 점포의 대표 점수로 채택
+    road_score = max(road_ratio, road_partial)
+    num_score = max(num_ratio, num_partial)
+
+    if (road_score > num_score) or (road_score == num_score and road_partial >= num_partial):
+        return "roadname", road_score
+    return "number", num_score
+
+
+def build_candidate(store, chosen_type: str, chosen_score) -> dict:
+    return {
+        "store_id": getattr(store, "store_id", getattr(store, "id", None)),
+        "store_name": getattr(store, "store_name", None),
+        "store_image": getattr(store, "store_image", None),
+        "select_type": chosen_type,           # 'roadname' | 'number'
+        "score": chosen_score,
+        "road_address": getattr(store, "road_address", None),
+        "street_address": getattr(store, "street_address", None),
+        "id": getattr(store, "id", getattr(store, "store_id", 0)), # 보조 정렬용
+    }
+
+
+def best_of_store(ocr_addr: str, store) -> dict:
+    road = getattr(store, "road_address", "") or ""
+    street = getattr(store, "street_address", "") or ""
+
+    road_s = score_pair(ocr_addr, road)
+    num_s  = score_pair(ocr_addr, street)
+
+    chosen_type, chosen_score = choose_select_type(
+        road_s["ratio"], road_s["partial"], num_s["ratio"], num_s["partial"]
+    )
+    return build_candidate(store, chosen_type, chosen_score)
+
+
+@dataclass(slots=True)
+class StoreEntry:
+    store_id: int
+    store_name: str | None
+    store_image: str | None
+    road_address: str
+    street_address: str
+    norm_road: str
+    norm_street: str
+    grams: frozenset
+    paths: tuple  # 계층 색인 경로 ((구, 로/동, 번지), ...)
+    road_chars: tuple  # (글자들, 글자별 개수) 점수 상한 계산용
+    street_chars: tuple
+
+
+def _char_counts(text: str) -> tuple[str, bytes]:
+    # 글자별 개수를 작게 보관 (주소는 100자 이하라 개수가 255를 넘지 않음)
+    counts = Counter(text)
+    return "".join(counts), bytes(min(n, 255) for n in counts.values())
+
+
+def _field_bound(query: Counter, query_len: int, chars: tuple, length: int) -> float:
+    # 공통 글자 수 c, 짧은 쪽 길이 m일 때 ratio/partial_ratio 상한 200c/(m+c)
+    common = 0
+    for ch, n in zip(*chars):
+        qc = query.get(ch)
+        if qc:
+            common += n if n < qc else qc
+    denom = min(length, query_len) + common
+    return 200 * common / denom if denom else 0.0
+
+
+class StoreAddressIndex:
+    """
+    Store 도로명/지번 주소의 글자 n-gram 역색인 + (구 -> 로/동 -> 번지) 계층 색인.
+    영수증 주소가 구조화 파싱되면 계층 색인의 해당 가지 점포를, 아니면 n-gram이 많이 겹치는 후보를 먼저 채점하고,
+    나머지 n-gram 후보(BOUND_POOL_LIMIT개까지) 중 글자 겹침으로 본 점수 상한이 k번째 점수에 닿는 점포만 추가 채점한다.
+    요청당 비용은 점포 수가 아니라 후보 수에 비례한다.
+    Store 저장/삭제 시그널로 점포 단위 증분 갱신된다.
+    track_catalog=True면 점포 카탈로그 공유 버전(stores/catalog.py)을 확인해 다른 프로세스의 변경도 반영한다
+    (바뀐 점포만 다시 읽고, 백필처럼 목록 없는 변경이면 전체를 다시 만듦).
+    """
+
+    def __init__(self, n: int = NGRAM_SIZE, track_catalog: bool = False):
+        self.n = n
+        self.track_catalog = track_catalog
+        self._lock = threading.RLock()
+        self._entries: dict[int, StoreEntry] = {}
+        self._postings: dict[str, set[int]] = defaultdict(set)
+        self._tree: dict[str, dict[str, dict[str, set[int]]]] = {}
+        self._loaded = False
+        self._shared_version = None
+        self.version = 0  # 색인이 바뀔 때마다 증가 (배치 매처 스냅샷 무효화용)
+
+    def __len__(self):
+        return len(self._entries)
+
+    # 색인 구축/갱신
+    def rebuild(self, rows=None):
+        if rows is None:
+            rows = Store.objects.values(*STORE_FIELDS).iterator(chunk_size=2000)
+        with self._lock:
+            self._entries = {}
+            self._postings = defaultdict(set)
+            self._tree = {}
+            for row in rows:
+                self._add(row)
+            self._loaded = True
+            self.version += 1
+
+    def ensure_loaded(self):
+        shared = catalog_version() if self.track_catalog else None
+        if self._loaded and shared == self._shared_version:
+            return
+        with self._lock:
+            if self._loaded and shared == self._shared_version:
+                return
+            changed = catalog_changes(self._shared_version, shared) if self._loaded else None
+            if changed is None:
+                self.rebuild()
+            else:
+                self._reload(changed)
+            self._shared_version = shared
+
+    def _reload(self, store_ids):
+        # 다른 프로세스가 바꾼 점포만 DB에서 다시 읽어 반영 (지워진 점포는 색인에서 뺌)
+        rows = {r["store_id"]: r for r in Store.objects.filter(store_id__in=store_ids).values(*STORE_FIELDS)}
+        for store_id in store_ids:
+            self._remove(store_id)
+            if store_id in rows:
+                self._add(rows[store_id])
+        self.version += 1
+
+    def upsert(self, store):
+        row = {f: getattr(store, f, None) for f in STORE_FIELDS}
+        with self._lock:
+            if self._loaded:  # 아직 안 만들어졌으면 첫 조회 때 전체 구축
+                self._remove(row["store_id"])
+                self._add(row)
+                self.version += 1
+        self._publish(row["store_id"])
+
+    def remove(self, store_id):
+        with self._lock:
+            if self._loaded:
+                self._remove(store_id)
+                self.version += 1
+        self._publish(store_id)
+
+    def _publish(self, store_id):
+        # 커밋 후 공유 버전을 올리고 바뀐 점포를 기록해 다른 프로세스가 그 점포만 다시 읽게 함
+        # 이 프로세스는 이미 반영했으므로, 그 사이 다른 프로세스의 변경이 없었을 때만(+1) 버전을 따라감
+        if self.track_catalog:
+            transaction.on_commit(lambda: self._follow_shared_version(store_id))
+
+    def _follow_shared_version(self, store_id):
+        version = bump_catalog_version([store_id])
+        with self._lock:
+            if version is not None and self._shared_version is not None and version == self._shared_version + 1:
+                self._shared_version = version
+
+    def _add(self, row: dict):
+        road = row.get("road_address") or ""
+        street = row.get("street_address") or ""
+        # 저장된 정규화 주소 우선, 백필 전 행만 직접 정규화
+        norm_road = row.get("road_address_norm") or normalize_address(road)
+        norm_street = row.get("street_address_norm") or normalize_address(street)
+        grams = frozenset(address_ngrams(norm_road, self.n) | address_ngrams(norm_street, self.n))
+        paths = set()
+        for parsed in (parse_address(norm_road), parse_address(norm_street)):
+            if parsed:
+                paths.add((parsed["gu"], parsed["road"] or parsed["dong"], parsed["number"]))
+        entry = StoreEntry(
+            store_id=row["store_id"],
+            store_name=row.get("store_name"),
+            store_image=row.get("store_image"),
+            road_address=road,
+            street_address=street,
+            norm_road=norm_road,
+            norm_street=norm_street,
+            grams=grams,
+            paths=tuple(paths),
+            road_chars=_char_counts(norm_road),
+            street_chars=_char_counts(norm_street),
+        )
+        self._entries[entry.store_id] = entry
+        for g in grams:
+            self._postings[g].add(entry.store_id)
+        for gu, key, number in entry.paths:
+            self._tree.setdefault(gu, {}).setdefault(key, {}).setdefault(number, set()).add(entry.store_id)
+
+    def _remove(self, store_id):
+        entry = self._entries.pop(store_id, None)
+        if entry is None:
+            return
+        for g in entry.grams:
+            ids = self._postings.get(g)
+            if ids is not None:
+                ids.discard(store_id)
+                if not ids:
+                    del self._postings[g]
+        for gu, key, number in entry.paths:
+            numbers = self._tree.get(gu, {}).get(key, {})
+            ids = numbers.get(number)
+            if ids is not None:
+                ids.discard(store_id)
+                if not ids:
+                    del numbers[number]
+                    if not numbers:
+                        del self._tree[gu][key]
+                        if not self._tree[gu]:
+                            del self._tree[gu]
+
+    # 조회
+    def shortlist(self, norm_addr: str, limit: int = CANDIDATE_LIMIT) -> list[StoreEntry]:
+        grams = address_ngrams(norm_addr, self.n)
+        with self._lock:
+            total = len(self._entries) or 1
+            postings = [(g, self._postings[g]) for g in grams if g in self._postings]
+            # 희귀한 n-gram부터 IDF 가중치로 누적, posting 예산을 넘으면 흔한 n-gram은 생략
+            postings.sort(key=lambda gp: len(gp[1]))
+            scores: dict[int, float] = defaultdict(float)
+            budget = POSTING_BUDGET
+            for _, ids in postings:
+                if budget <= 0:
+                    break
+                weight = math.log(1 + total / len(ids))
+                for sid in ids:
+                    scores[sid] += weight
+                budget -= len(ids)
+            best = heapq.nsmallest(limit, scores.items(), key=lambda kv: (-kv[1], kv[0]))
+            return [self._entries[sid] for sid, _ in best]
+
+    def resolve(self, parsed: dict | None) -> list[StoreEntry] | None:
+        # 파싱된 영수증 주소로 계층 색인을 바로 따라가 해당 가지 점포를 반환 (없으면 None)
+        if not parsed:
+            return None
+        with self._lock:
+            numbers = self._tree.get(parsed["gu"], {})
+            ids = set()
+            for key in (parsed["road"], parsed["dong"]):
+                if not key or key not in numbers:
+                    continue
+                hit = numbers[key].get(parsed["number"])
+                if hit:
+                    ids |= hit
+                elif sum(len(v) for v in numbers[key].values()) <= BRANCH_LIMIT:
+                    # 번지가 색인에 없으면 작은 로/동 가지 전체를 후보로
+                    for v in numbers[key].values():
+                        ids |= v
+            if not ids:
+                return None
+            return [self._entries[sid] for sid in sorted(ids)]
+
+    def entries(self) -> list[StoreEntry]:
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda e: e.store_id)
+
+    def score_bounds(self, norm_addr: str, entries=None) -> tuple[list[StoreEntry], np.ndarray]:
+        """
+        점포별 퍼지 점수(best_of_store)의 상한 (entries가 없으면 전체 점포). 공통 부분열 길이 L은 두 주소의 공통 글자 수 c 이하이고,
+        ratio/partial_ratio는 짧은 쪽 길이 m에 대해 2L/(m+L) 이하이므로 200c/(m+c)를 넘지 못한다.
+        """
+        if entries is None:
+            entries = self.entries()
+        if not norm_addr:
+            # 빈 주소끼리는 100점이므로 상한을 두지 않음
+            return entries, np.full(len(entries), 100.0)
+        query = Counter(norm_addr)
+        size = len(norm_addr)
+        bound = np.fromiter(
+            (
+                max(_field_bound(query, size, e.road_chars, len(e.norm_road)),
+                    _field_bound(query, size, e.street_chars, len(e.norm_street)))
+                for e in entries
+            ),
+            dtype=np.float64,
+            count=len(entries),
+        )
+        return entries, bound
+
+    def top_matches(self, norm_addr: str, k: int = 5) -> list[dict]:
+        """
+        n-gram/계층 색인 후보 안에서 best_of_store를 돌린 것과 같은 상위 k개 ((-score, store_id) 순).
+        계층 색인 가지(부족하면 n-gram 후보도)를 먼저 채점하고, 나머지 n-gram 후보 중 점수 상한이 k번째 점수 이상인 점포만 추가 채점.
+        """
+        self.ensure_loaded()
+        na = normalize_address(norm_addr)
+        pool = self.shortlist(na, limit=BOUND_POOL_LIMIT)
+        branch = self.resolve(parse_address(na))
+        if branch is not None:
+            counter("receipts.match.tree_hit").inc()
+            candidates = branch
+            if len(candidates) < k:
+                seen = {e.store_id for e in candidates}
+                candidates = candidates + [e for e in pool[:CANDIDATE_LIMIT] if e.store_id not in seen]
+        else:
+            counter("receipts.match.tree_fallback").inc()
+            candidates = pool[:CANDIDATE_LIMIT]
+        results = match_entries([na], candidates, k=k)[0]
+
+        # 아직 채점하지 않은 n-gram 후보가 k번째 점수 이상(동점이면 store_id로 앞설 수 있음)일 수 있으면 추가 채점
+        scored = {e.store_id for e in candidates}
+        rest = [e for e in pool if e.store_id not in scored]
+        if not rest:
+            return results
+        kth = results[k - 1]["score"] if len(results) >= k else -1.0
+        _, bound = self.score_bounds(na, rest)
+        extra = [rest[i] for i in np.flatnonzero(bound + SCORE_EPSILON >= kth)]
+        if extra:
+            counter("receipts.match.widened").inc()
+            merged = results + match_entries([na], extra, k=k)[0]
+            results = sorted(merged, key=lambda c: (-c["score"], c["store_id"]))[:k]
+        return results
+
+
+def _match_workers() -> int:
+    return getattr(settings, "RECEIPT_MATCH_WORKERS", -1)
+
+
+def match_entries(norm_addrs: list[str], entries: list[StoreEntry], k: int = 5,
+                  roads: list[str] | None = None, streets: list[str] | None = None) -> list[list[dict]]:
+    """
+    정규화된 영수증 주소 여러 개를 점포 목록 전체와 한 번에 채점.
+    rapidfuzz.process.cdist로 도로명/지번 x ratio/partial_ratio 4개 행렬을 만들고
+    best_of_store와 같은 규칙(동점이면 partial이 큰 도로명 우선)으로 점포별 대표 점수를 고른 뒤
+    (-score, store_id) 순 상위 k개를 반환한다.
+    """
+    if not norm_addrs:
+        return []
+    if not entries:
+        return [[] for _ in norm_addrs]
+    if roads is None:
+        roads = [e.norm_road for e in entries]
+    if streets is None:
+        streets = [e.norm_street for e in entries]
+    ids = np.fromiter((e.store_id for e in entries), dtype=np.int64, count=len(entries))
+
+    workers = _match_workers()
+    step = max(1, MATRIX_CELLS // len(entries))
+    results = []
+    for start in range(0, len(norm_addrs), step):
+        queries = norm_addrs[start:start + step]
+        kw = {"workers": workers, "dtype": np.float64}
+        road_ratio = process.cdist(queries, roads, scorer=fuzz.ratio, **kw)
+        road_partial = process.cdist(queries, roads, scorer=fuzz.partial_ratio, **kw)
+        num_ratio = process.cdist(queries, streets, scorer=fuzz.ratio, **kw)
+        num_partial = process.cdist(queries, streets, scorer=fuzz.partial_ratio, **kw)
+
+        road_score = np.maximum(road_ratio, road_partial)
+        num_score = np.maximum(num_ratio, num_partial)
+        road_wins = (road_score > num_score) | ((road_score == num_score) & (road_partial >= num_partial))
+        scores = np.where(road_wins, road_score, num_score)
+
+        for row in range(len(queries)):
+            results.append(_top_k_row(scores[row], road_wins[row], ids, entries, k))
+    return results
+
+
+def _top_k_row(scores, road_wins, ids, entries, k) -> list[dict]:
+    n = len(scores)
+    if n > k:
+        # k번째 점수 이상인 점포만 남긴 뒤(동점 포함) 정렬
+        kth = np.partition(scores, n - k)[n - k]
+        cand = np.flatnonzero(scores >= kth)
+    else:
+        cand = np.arange(n)
+    order = cand[np.lexsort((ids[cand], -scores[cand]))][:k]
+    return [
+        build_candidate(
+            entries[i],
+            "roadname" if road_wins[i] else "number",
+            float(scores[i]),
+        )
+        for i in order
+    ]
+
+
+class BatchStoreMatcher:
+    """
+    전체 점포의 정규화 주소를 연속된 두 리스트(도로명/지번)로 들고 있다가
+    영수증 주소 여러 개를 행렬 연산 한 번으로 채점한다. 색인이 바뀌면 스냅샷을 다시 만든다.
+    """
+
+    def __init__(self, index: StoreAddressIndex):
+        self.index = index
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries: list[StoreEntry] = []
+        self._roads: list[str] = []
+        self._streets: list[str] = []
+
+    def _snapshot(self):
+        self.index.ensure_loaded()
+        with self._lock:
+            if self._version != self.index.version:
+                version = self.index.version
+                entries = self.index.entries()
+                self._entries = entries
+                self._roads = [e.norm_road for e in entries]
+                self._streets = [e.norm_street for e in entries]
+                self._version = version
+            return self._entries, self._roads, self._streets
+
+    def match_many(self, addrs: list[str], k: int = 5) -> list[list[dict]]:
+        # 정규화 주소가 그대로 일치하는 점포는 SQL로 먼저 확정해 맨 앞에 두고, k개가 안 되면 나머지를 퍼지 채점으로 채움
+        norm = [normalize_address(a) for a in addrs]
+        results = exact_matches(norm, k=k)
+        pending = [i for i, r in enumerate(results) if len(r) < k]
+        if pending:
+            entries, roads, streets = self._snapshot()
+            fuzzy = match_entries([norm[i] for i in pending], entries, k=k, roads=roads, streets=streets)
+            for i, cands in zip(pending, fuzzy):
+                results[i] = _with_exact_first(results[i], cands, k)
+        return results
+
+    def match_one(self, addr: str, k: int = 5) -> list[dict]:
+        # 정확 일치 점포를 앞에 두고, 남은 자리는 n-gram/계층 색인으로 추린 후보의 퍼지 채점으로 채움
+        na = normalize_address(addr)
+        exact = exact_matches([na], k=k)[0]
+        if len(exact) >= k:
+            return exact
+        return _with_exact_first(exact, self.index.top_matches(na, k=k), k)
+
+
+def _with_exact_first(exact: list[dict], fuzzy: list[dict], k: int) -> list[dict]:
+    # 정확 일치 후보 + (겹치지 않는) 퍼지 후보, 상위 k개
+    if not exact:
+        return fuzzy[:k]
+    seen = {c["store_id"] for c in exact}
+    return (exact + [c for c in fuzzy if c["store_id"] not in seen])[:k]
+
+
+def exact_matches(norm_addrs: list[str], k: int = 5) -> list[list[dict]]:
+    """
+    Store의 정규화 주소 컬럼(인덱스)과 완전히 같은 영수증 주소를 SQL 한 번으로 찾는다.
+    일치하면 퍼지 점수도 100점이므로 채점 없이 바로 후보로 확정 (도로명 일치 우선). 나머지 자리는 호출하는 쪽에서 채움.
+    """
+    wanted = {a for a in norm_addrs if a}
+    results = [[] for _ in norm_addrs]
+    if not wanted:
+        return results
+    rows = (
+        Store.objects
+        .filter(Q(road_address_norm__in=wanted) | Q(street_address_norm__in=wanted))
+        .values(*STORE_FIELDS)
+        .order_by("store_id")
+    )
+    by_addr = defaultdict(list)
+    for row in rows:
+        entry = SimpleNamespace(**row)
+        if row["road_address_norm"] in wanted:
+            by_addr[row["road_address_norm"]].append(build_candidate(entry, "roadname", 100.0))
+        if row["street_address_norm"] in wanted and row["street_address_norm"] != row["road_address_norm"]:
+            by_addr[row["street_address_norm"]].append(build_candidate(entry, "number", 100.0))
+    for i, a in enumerate(norm_addrs):
+        results[i] = by_addr.get(a, [])[:k]
+    return results
+
+
+# 프로세스 전역 색인/배치 매처
+store_address_index = StoreAddressIndex(track_catalog=True)
+store_matcher = BatchStoreMatcher(store_address_index)
+
+
+MATCH_TOP_K = 5  # 영수증마다 저장하는 점포 후보 수
+
+
+def record_store_matches(receipts, k: int = MATCH_TOP_K) -> dict[int, list[dict]]:
+    """
+    영수증들의 점포 후보 상위 k개를 계산해 ReceiptStoreMatch로 저장 (기존 후보는 교체).
+    {receipt id: 후보 목록}을 반환.
+    """
+    receipts = list(receipts)
+    if not receipts:
+        return {}
+    if len(receipts) == 1:
+        matches = [store_matcher.match_one(receipts[0].store_address or "", k=k)]
+    else:
+        matches = store_matcher.match_many([r.store_address or "" for r in receipts], k=k)
+
+    ids = [r.id for r in receipts]
+    objs = [
+        ReceiptStoreMatch(
+            receipt_id=r.id,
+            store_id=c["store_id"],
+            score=float(c["score"]),
+            select_type=c["select_type"],
+            rank=rank,
+        )
+        for r, cands in zip(receipts, matches)
+        for rank, c in enumerate(cands, start=1)
+    ]
+    with transaction.atomic():
+        ReceiptStoreMatch.objects.filter(receipt_id__in=ids).delete()
+        ReceiptStoreMatch.objects.bulk_create(objs, batch_size=1000)
+        Receipt.objects.filter(id__in=ids).update(store_matched_at=timezone.now())
+    return {r.id: cands for r, cands in zip(receipts, matches)}
+
+
+def stored_store_matches(receipt) -> list[dict]:
+    # 저장된 후보를 (receipt, rank) 인덱스로 읽음, 아직 계산 전이면 지금 계산해 저장
+    if receipt.store_matched_at is None:
+        return record_store_matches([receipt])[receipt.id]
+    rows = (
+        ReceiptStoreMatch.objects
+        .filter(receipt=receipt)
+        .select_related("store")
+        .order_by("rank")
+    )
+    return [build_candidate(m.store, m.select_type, m.score) for m in rows]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('receipts', '0003_receiptjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='image_sha256',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('receipts', '0005_receipt_user'),
+        ('stores', '0003_store_road_address_norm_store_street_address_norm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='store_matched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ReceiptStoreMatch',
+            fields=[
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('score', models.FloatField()),
+                ('select_type', models.CharField(max_length=10)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('receipt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='store_matches', to='receipts.receipt')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipt_matches', to='stores.store')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('receipt', 'rank'), name='uniq_receipt_store_match_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('receipts', '0006_receipt_store_matched_at_receiptstorematch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptRawPayload',
+            fields=[
+                ('receipt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='raw_payload', serialize=False, to='receipts.receipt')),
+                ('data', models.BinaryField()),
+                ('raw_size', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='receipt',
+            options={'base_manager_name': 'objects'},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('receipts', '0007_receiptrawpayload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(fields=['user', '-payment_datetime', '-id'], name='receipt_user_paid_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_rewardhistory_balance'),
+        ('receipts', '0008_receipt_receipt_user_paid_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='reward_history',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='receipts', to='accounts.rewardhistory'),
+        ),
+        migrations.AddField(
+            model_name='receipt',
+            name='rewarded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,8 @@
+import json
+import uuid
+import zlib
 from django.db import models
+from accounts.models import User
 
 # 추상 클래스 정의
 class BaseModel(models.Model):
@@ -8,8 +12,15 @@ class BaseModel(models.Model):
     class Meta:
         abstract = True
 
+class ReceiptManager(models.Manager):
+    # 원본 OCR JSON(레거시 컬럼)은 기본으로 읽지 않음
+    def get_queryset(self):
+        return super().get_queryset().defer("receipt_result_raw")
+
+
 class Receipt(BaseModel):
     id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="receipts")  # 올린 사용자
 
     # images[i] 식별 (필수: 어떤 이미지의 receipt인지 연결)
     image_uid = models.CharField(max_length=128, db_index=True)  # images[i].uid
@@ -26,12 +37,108 @@ class Receipt(BaseModel):
     # 합계/금액 요약
     total_amount = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True)  # 총금액
 
-    # 원본 보존: receipt.result 원본 그대로 저장
+    # 변환된 JPEG의 SHA-256 (같은 사진 재업로드 시 OCR 결과 재사용)
+    image_sha256 = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
+    # 레거시: 예전에는 receipt.result 원본을 여기 저장했음. 새 영수증은 ReceiptRawPayload에 압축 저장하고
+    # 남은 행은 compact_receipt_raw 명령으로 옮긴다
     receipt_result_raw = models.JSONField(blank=True, null=True)  # images[i].receipt.result 전체 JSON
 
+    # 점포 후보(ReceiptStoreMatch)를 마지막으로 계산한 시각 (None이면 아직 계산 안 함)
+    store_matched_at = models.DateTimeField(blank=True, null=True)
+
+    # 영수증 인증 보상 (receipt/verify/), 한 영수증에 한 번만 지급
+    rewarded_at = models.DateTimeField(blank=True, null=True)
+    reward_history = models.ForeignKey(
+        "accounts.RewardHistory", on_delete=models.SET_NULL, null=True, blank=True, related_name="receipts",
+    )
+
+    objects = ReceiptManager()
+
     class Meta:
+        base_manager_name = "objects"
         indexes = [
             models.Index(fields=["image_uid"]),
             models.Index(fields=["payment_date"]),
             models.Index(fields=["store_name"]),
-        ]
\ No newline at end of file
+            # 사용자별 영수증 내역 (payment_datetime, id 키셋 페이지네이션)
+            models.Index(fields=["user", "-payment_datetime", "-id"], name="receipt_user_paid_idx"),
+        ]
+
+    def raw_result(self) -> dict | None:
+        # receipt.result 원본 (필요할 때만 따로 읽음)
+        try:
+            return self.raw_payload.result
+        except ReceiptRawPayload.DoesNotExist:
+            pass
+        return Receipt.objects.filter(pk=self.pk).values_list("receipt_result_raw", flat=True).first()
+
+
+class ReceiptRawPayload(models.Model):
+    # OCR 원본 JSON을 zlib으로 압축해 본 테이블과 분리 보관
+    receipt = models.OneToOneField(Receipt, on_delete=models.CASCADE, primary_key=True, related_name="raw_payload")
+    data = models.BinaryField()
+    raw_size = models.PositiveIntegerField(default=0)  # 압축 전 JSON 바이트 수
+
+    @staticmethod
+    def pack(result) -> tuple[bytes, int]:
+        raw = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return zlib.compress(raw, 6), len(raw)
+
+    @classmethod
+    def build(cls, receipt_id: int, result) -> "ReceiptRawPayload":
+        data, raw_size = cls.pack(result)
+        return cls(receipt_id=receipt_id, data=data, raw_size=raw_size)
+
+    @property
+    def result(self):
+        return json.loads(zlib.decompress(bytes(self.data)).decode("utf-8"))
+
+
+class ReceiptStoreMatch(BaseModel):
+    # 영수증 주소와 가장 비슷한 점포 후보 상위 k개 (수집 시 계산, rescore_receipt_matches로 재계산)
+    id = models.AutoField(primary_key=True)
+    receipt = models.ForeignKey(Receipt, on_delete=models.CASCADE, related_name="store_matches")
+    store = models.ForeignKey("stores.Store", on_delete=models.CASCADE, related_name="receipt_matches")
+    score = models.FloatField()
+    select_type = models.CharField(max_length=10)  # 'roadname' | 'number'
+    rank = models.PositiveSmallIntegerField()      # 1부터, 점수 높은 순
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["receipt", "rank"], name="uniq_receipt_store_match_rank"),
+        ]
+
+class ReceiptJob(BaseModel):
+    # 비동기 OCR 작업 큐 (DB 기반, run_receipt_jobs 워커가 처리)
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "pending"),
+        (STATUS_RUNNING, "running"),
+        (STATUS_DONE, "done"),
+        (STATUS_FAILED, "failed"),
+    )
+
+    id = models.AutoField(primary_key=True)
+    job_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="receipt_jobs")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    image = models.BinaryField(blank=True, default=b"")   # 1MB 이하로 변환된 JPEG (완료되면 비움)
+    filename = models.CharField(max_length=255)
+
+    receipt = models.ForeignKey(Receipt, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs")
+    result = models.JSONField(blank=True, null=True)      # 동기 모드와 같은 응답 body
+    http_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    error = models.TextField(blank=True, default="")
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"]),
+        ]
@@ -0,0 +1,261 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from io import BytesIO
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from config.metrics import counter, histogram
+
+# 네이버 OCR 전용 HTTP 클라이언트
+# - keep-alive 세션 + 커넥션 풀 (매 호출마다 TLS 핸드셰이크 하지 않음)
+# - connect/read 타임아웃 분리, 재시도(지터 있는 지수 백오프)
+#   OCR 호출은 과금되고 멱등이 아니므로 요청이 처리되지 않은 게 확실한 경우(연결 실패, 429, 503)만 재시도
+# - 서킷 브레이커: 연속 실패가 쌓이면 한동안 호출하지 않고 바로 실패
+# - (선택) 헤징: p95 지연이 지나도 응답이 없으면 같은 요청을 하나 더 보내 먼저 온 응답 사용
+
+RETRY_STATUS = {429, 503}  # 제공자가 요청을 처리하지 않고 돌려보낸 응답
+HEDGE_MIN_SAMPLES = 20  # p95를 믿을 만큼 표본이 쌓이기 전엔 헤징하지 않음
+
+
+class OcrError(Exception):
+    def __init__(self, detail: str, retryable: bool = True):
+        super().__init__(detail)
+        self.retryable = retryable
+
+
+class CircuitOpen(OcrError):
+    # 서킷이 열려 호출하지 않고 바로 실패
+    def __init__(self, retry_after: float):
+        super().__init__("OCR 서비스 장애로 잠시 호출을 중단했습니다.")
+        self.retry_after = max(1, int(retry_after))
+
+
+class CircuitBreaker:
+    """
+    closed: 정상 호출, 연속 실패가 failure_threshold에 닿으면 open
+    open: reset_timeout 동안 바로 실패
+    half-open: reset_timeout이 지나면 시험 호출 1건만 통과, 성공하면 closed / 실패하면 다시 open
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._probing:
+                raise CircuitOpen(max(remaining, 1))
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    counter("receipts.ocr.circuit_opened").inc()
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class OcrClient:
+    def __init__(
+        self,
+        url: str,
+        secret: str,
+        pool_size: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 20.0,
+        retries: int = 2,
+        backoff: float = 0.3,
+        breaker: CircuitBreaker | None = None,
+        hedge: bool = False,
+        hedge_min_ms: float = 1000.0,
+    ):
+        self.url = url
+        self.secret = secret
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_min_ms = hedge_min_ms
+
+        self.session = requests.Session()
+        # 재시도는 직접 처리하므로 어댑터 재시도는 끔
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._hedge_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="receipt-ocr-hedge") if hedge else None
+
+    def recognize(self, images: list[tuple[bytes, str]]) -> dict:
+        """
+        이미지 목록 [(jpeg bytes, 이름)]을 OCR에 보내 응답 JSON을 반환.
+        실패하면 OcrError (서킷이 열려 있으면 CircuitOpen)
+        """
+        started = time.perf_counter()
+        try:
+            if self._hedge_executor is not None:
+                return self._hedged(images)
+            return self._with_retries(images)
+        finally:
+            histogram("receipts.ocr.call_ms").observe((time.perf_counter() - started) * 1000)
+
+    def _with_retries(self, images) -> dict:
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(images)
+            except CircuitOpen:
+                raise
+            except OcrError as e:
+                if not e.retryable or attempt >= self.retries:
+                    raise
+                attempt += 1
+                counter("receipts.ocr.retry").inc()
+                # full jitter: 0 ~ backoff * 2^n 사이에서 무작위로 쉼 (동시에 재시도 몰리는 것 방지)
+                time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def _attempt(self, images) -> dict:
+        self.breaker.before_call()
+        started = time.perf_counter()
+        try:
+            res = self.session.post(self.url, headers={"X-OCR-SECRET": self.secret}, files=self._files(images), timeout=self.timeout)
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            counter("receipts.ocr.error").inc()
+            # 읽기 타임아웃 등은 이미 처리(과금)됐을 수 있으므로 다시 보내지 않음
+            raise OcrError(f"OCR 호출 실패: {e}", retryable=_not_sent(e))
+        histogram("receipts.ocr.attempt_ms").observe((time.perf_counter() - started) * 1000)
+
+        if res.status_code >= 400:
+            retryable = res.status_code in RETRY_STATUS
+            # 요청 자체가 잘못된 경우(4xx)는 제공자 장애가 아니므로 서킷에 반영하지 않음
+            if retryable or res.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            counter("receipts.ocr.error").inc()
+            raise OcrError(f"OCR 호출 실패: HTTP {res.status_code}", retryable=retryable)
+
+        try:
+            data = res.json()
+        except ValueError as e:
+            self.breaker.record_failure()
+            raise OcrError(f"OCR 응답 파싱 실패: {e}", retryable=False)
+        self.breaker.record_success()
+        return data
+
+    def _files(self, images):
+        # 재시도마다 새 BytesIO/requestId로 다시 만든다
+        message = {
+            "version": "V2",
+            "requestId": str(uuid.uuid4()),
+            "timestamp": int(timezone.now().timestamp() * 1000),
+            "images": [{"format": "jpg", "name": name} for _, name in images],
+        }
+        files = [("file", (name, BytesIO(data), "image/jpeg")) for data, name in images]
+        files.append(("message", (None, json.dumps(message), "application/json")))
+        return files
+
+    def _hedge_delay(self) -> float | None:
+        attempts = histogram("receipts.ocr.attempt_ms")
+        if attempts.count < HEDGE_MIN_SAMPLES:
+            return None
+        p95 = attempts.quantile(0.95)
+        return max(p95 or 0, self.hedge_min_ms) / 1000
+
+    def _hedged(self, images) -> dict:
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._with_retries(images)
+
+        first = self._hedge_executor.submit(self._with_retries, images)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+
+        # p95가 지나도 응답이 없으면 하나 더 보내고 먼저 성공한 쪽을 사용 (늦은 쪽은 버림)
+        counter("receipts.ocr.hedge").inc()
+        pending = {first, self._hedge_executor.submit(self._with_retries, images)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except OcrError as e:
+                    error = e
+        raise error
+
+
+def _not_sent(e: requests.RequestException) -> bool:
+    # 연결을 맺지 못한 실패(연결 타임아웃, 연결 거부, DNS)는 요청이 서버에 닿지 않았으므로 재시도해도 안전
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    if isinstance(e, requests.ConnectionError):
+        cause = e.args[0] if e.args else None
+        return isinstance(cause, MaxRetryError) and isinstance(cause.reason, NewConnectionError)
+    return False
+
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+
+def get_ocr_client() -> OcrClient:
+    # 프로세스마다 하나 (fork된 워커가 부모의 소켓을 공유하지 않도록 pid 확인)
+    global _client, _client_pid
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            if not getattr(settings, "X_OCR_URL", None):
+                raise ImproperlyConfigured("X_OCR_URL is not set in settings.")
+            _client = OcrClient(
+                url=settings.X_OCR_URL,
+                secret=settings.X_OCR_SECRET,
+                pool_size=getattr(settings, "RECEIPT_OCR_POOL_SIZE", 10),
+                connect_timeout=getattr(settings, "RECEIPT_OCR_CONNECT_TIMEOUT", 3.05),
+                read_timeout=getattr(settings, "RECEIPT_OCR_READ_TIMEOUT", 20),
+                retries=getattr(settings, "RECEIPT_OCR_RETRIES", 2),
+                breaker=CircuitBreaker(
+                    failure_threshold=getattr(settings, "RECEIPT_OCR_BREAKER_FAILURES", 5),
+                    reset_timeout=getattr(settings, "RECEIPT_OCR_BREAKER_RESET", 30),
+                ),
+                hedge=getattr(settings, "RECEIPT_OCR_HEDGE", False),
+                hedge_min_ms=getattr(settings, "RECEIPT_OCR_HEDGE_MIN_MS", 1000),
+            )
+            _client_pid = os.getpid()
+        return _client
@@ -0,0 +1,460 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import datetime as _dt, date as _date, time as _time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+import hashlib
+import time
+import uuid
+import logging
+from .models import Receipt, ReceiptRawPayload
+from .serializers import ReceiptSerializer
+from .fields import parse_date, parse_time, parse_number
+from .imaging import ocr_variant
+from .ocr_client import CircuitOpen, OcrError, get_ocr_client
+from .matching import record_store_matches, stored_store_matches
+from config.metrics import counter, histogram
+
+class ReceiptPipelineError(Exception):
+    # 파이프라인 단계 실패: 그대로 HTTP 응답(status, body)으로 변환된다
+    def __init__(self, detail: str, status: int = 502, **extra):
+        super().__init__(detail)
+        self.status = status
+        self.body = {"detail": detail, **extra}
+
+def upload_receipt_to_s3(data: bytes, filename: str | None = None) -> str:
+    s3_client = boto3.client(
+        "s3",
+        aws_access_key_id=getattr(settings, "AWS_ACCESS_KEY_ID", None),
+        aws_secret_access_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
+        region_name=getattr(settings, "AWS_REGION", None),
+    )
+    bucket = settings.AWS_STORAGE_BUCKET_NAME
+    region = settings.AWS_REGION
+
+    if not filename:
+        filename = f"{uuid.uuid4()}.jpg"
+    key = f"receipt/{filename}"
+
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=data,
+        ContentType="image/jpeg",
+    )
+
+    return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
+
+def delete_receipt_from_s3(filename: str):
+    s3_client = boto3.client(
+        "s3",
+        aws_access_key_id=getattr(settings, "AWS_ACCESS_KEY_ID", None),
+        aws_secret_access_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
+        region_name=getattr(settings, "AWS_REGION", None),
+    )
+    s3_client.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=f"receipt/{filename}")
+
+def fetch_receipt_from_s3(key: str, fp, max_bytes: int) -> int:
+    """
+    클라이언트가 presigned URL로 직접 올린 객체를 fp(파일 객체)에 스트리밍으로 받아 쓴다.
+    Range로 max_bytes + 1 바이트까지만 요청하므로 객체가 커도 그 이상은 읽지 않는다.
+    받은 바이트 수를 반환하고, max_bytes를 넘으면 ReceiptPipelineError(413).
+    """
+    s3_client = boto3.client(
+        "s3",
+        aws_access_key_id=getattr(settings, "AWS_ACCESS_KEY_ID", None),
+        aws_secret_access_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
+        region_name=getattr(settings, "AWS_REGION", None),
+    )
+    try:
+        obj = s3_client.get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key, Range=f"bytes=0-{max_bytes}")
+    except s3_client.exceptions.NoSuchKey:
+        raise ReceiptPipelineError("업로드된 이미지를 찾을 수 없습니다.", status=404)
+    except Exception as e:
+        raise ReceiptPipelineError(f"S3 다운로드 실패: {e}", status=502)
+
+    received = 0
+    for chunk in obj["Body"].iter_chunks(chunk_size=64 * 1024):
+        received += len(chunk)
+        if received > max_bytes:
+            raise ReceiptPipelineError("이미지 파일이 너무 큽니다.", status=413)
+        fp.write(chunk)
+    fp.flush()
+    return received
+
+# OCR 호출과 겹쳐서 S3 업로드를 돌리는 스레드 풀 (프로세스 공용, 크기 제한)
+_s3_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "RECEIPT_S3_UPLOAD_WORKERS", 8),
+    thread_name_prefix="receipt-s3",
+)
+
+def _timed_upload(data: bytes, filename: str) -> tuple[str, float]:
+    started = time.perf_counter()
+    url = upload_receipt_to_s3(data, filename=filename)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    histogram("receipts.s3_upload_ms").observe(elapsed_ms)
+    return url, elapsed_ms
+
+def _discard_upload(future, filename: str):
+    # 아직 시작 전이면 취소, 이미 올라가는 중이면 끝난 뒤 객체 삭제
+    if future.cancel():
+        return
+
+    def cleanup(f):
+        if f.cancelled() or f.exception() is not None:
+            return
+        try:
+            delete_receipt_from_s3(filename)
+        except Exception as e:
+            logger.warning("Failed to delete orphan receipt image %s: %s", filename, e)
+
+    future.add_done_callback(cleanup)
+
+logger = logging.getLogger(__name__)
+
+def safe_get(d, *path, default=None):
+    cur = d
+    for p in path:
+        if not isinstance(cur, dict):
+            return default
+        cur = cur.get(p)
+        if cur is None:
+            return default
+    return cur
+
+def serialize_with_matches(rows: list, fresh: bool = False) -> list:
+    """
+    응답용 직렬화 + 영수증마다 점포 후보(candidates)를 붙임.
+    fresh=True면 방금 저장한 영수증이므로 후보를 계산해 ReceiptStoreMatch에 저장하고,
+    아니면 저장된 후보를 읽는다. 후보 계산이 실패해도 영수증 응답은 그대로 돌려준다.
+    """
+    data = ReceiptSerializer(rows, many=True).data
+    try:
+        if fresh:
+            matches = record_store_matches(rows)
+        else:
+            matches = {row.id: stored_store_matches(row) for row in rows}
+    except Exception as e:
+        logger.warning("Failed to match receipts to stores: %s", e)
+        return data
+    for item in data:
+        item["candidates"] = matches.get(item["id"], [])
+    return data
+
+
+OCR_BYTES_BUCKETS = (50_000, 100_000, 200_000, 300_000, 500_000, 750_000, 1_000_000)
+
+def _observe_ocr(images: list[tuple[bytes, str]], ocr_ms: float):
+    # 전송 크기/OCR 지연을 전처리 여부(gray/color)별로도 기록해 전/후 비교
+    histogram("receipts.ocr_ms").observe(ocr_ms)
+    variants = set()
+    for jpeg_bytes, _ in images:
+        variant = ocr_variant(jpeg_bytes)
+        variants.add(variant)
+        histogram(f"receipts.ocr_bytes.{variant}", buckets=OCR_BYTES_BUCKETS).observe(len(jpeg_bytes))
+    if len(variants) == 1:
+        histogram(f"receipts.ocr_ms.{variants.pop()}").observe(ocr_ms)
+
+
+def jpeg_digest(jpeg_bytes: bytes) -> str:
+    return hashlib.sha256(jpeg_bytes).hexdigest()
+
+
+def find_cached_result(image_sha256: str, user=None) -> dict | None:
+    """
+    같은 JPEG로 TTL 안에 저장된 영수증이 있으면 OCR 없이 기존 결과를 돌려준다.
+    user가 있으면 그 사용자가 올린 영수증만 본다 (다른 사람 영수증이 보이지 않도록).
+    RECEIPT_OCR_CACHE_TTL(초)이 0이면 캐시를 쓰지 않는다.
+    """
+    ttl = getattr(settings, "RECEIPT_OCR_CACHE_TTL", 0)
+    if not ttl or not image_sha256:
+        return None
+    qs = Receipt.objects.filter(image_sha256=image_sha256, created__gte=timezone.now() - timedelta(seconds=ttl))
+    if user is not None:
+        qs = qs.filter(user=user)
+    row = qs.order_by("-id").first()
+    if row is None:
+        counter("receipts.ocr_cache.miss").inc()
+        return None
+    counter("receipts.ocr_cache.hit").inc()
+    return {"saved": serialize_with_matches([row]), "skipped": [], "cached": True}
+
+
+def call_ocr(jpeg_bytes: bytes, new_name: str) -> dict:
+    # 네이버 OCR 호출 (이미지 1장)
+    return call_ocr_images([(jpeg_bytes, new_name)])
+
+
+def call_ocr_images(images: list[tuple[bytes, str]]) -> dict:
+    # 네이버 OCR 호출: message.images와 file 파트를 같은 순서로 보냄 (응답 images[].name으로 되짚음)
+    try:
+        return get_ocr_client().recognize(images)
+    except CircuitOpen as e:
+        raise ReceiptPipelineError(str(e), status=503, retry_after=e.retry_after)
+    except OcrError as e:
+        # 재시도할 수 있는 실패(요청이 처리되지 않음)는 503, 처리됐을 수도 있는 실패는 502
+        raise ReceiptPipelineError(str(e), status=503 if e.retryable else 502)
+
+
+def combine_payment_datetime(pd, pt):
+    # payment_date + payment_time 결합 (둘 중 하나라도 없으면 None)
+    if not (pd and pt):
+        return None
+    try:
+        # 혹시 실수로 datetime이 들어왔다면 date로 보정
+        if isinstance(pd, _dt):
+            pd = pd.date()
+        # 혹시 문자열로 들어왔다면(비정상), 파싱하거나 건너뜀
+        if not isinstance(pd, _date):
+            raise TypeError(f"payment_date must be date, got: {type(pd)}")
+
+        # time은 datetime.time 여야 함. 문자열 등은 거부
+        if not isinstance(pt, _time):
+            raise TypeError(f"payment_time must be time, got: {type(pt)}")
+
+        return _dt.combine(pd, pt)
+    except Exception as e:
+        logger.warning("Failed to combine payment_datetime: %s", e)
+        return None
+
+
+def parse_receipt_image(img: dict) -> tuple[dict | None, dict | None]:
+    """
+    OCR 응답 images[i] 하나를 Receipt 필드로 변환.
+    (필드 dict, None) 또는 저장하지 않을 경우 (None, {"image_uid", "reason"})
+    """
+    image_uid = img.get("uid")
+    receipt = img.get("receipt") or {}
+    if not image_uid or not receipt:
+        return None, {"image_uid": image_uid, "reason": "NO_RECEIPT_OR_UID"}
+
+    result = receipt.get("result") or {}
+
+    # payment
+    payment_info = result.get("paymentInfo") or {}
+    payment_date = parse_date(payment_info.get("date"))
+    payment_time = parse_time(payment_info.get("time"))
+
+    # store
+    store_info = result.get("storeInfo") or {}
+    store_name = safe_get(store_info, "name", "formatted", "value") or safe_get(store_info, "name", "text")
+
+    store_address = None
+    addrs = store_info.get("addresses") or []
+    if addrs:
+        first = addrs[0] or {}
+        store_address = safe_get(first, "formatted", "value") or first.get("text")
+
+    # 주소 필수
+    if not store_address or not str(store_address).strip():
+        return None, {"image_uid": image_uid, "reason": "NO_ADDRESS"}
+
+    # totals
+    total_amount = parse_number(
+        safe_get(result, "totalPrice", "price", "formatted", "value")
+        or safe_get(result, "totalPrice", "price", "text")
+    )
+
+    return {
+        "image_uid": image_uid,
+        "payment_date": payment_date,
+        "payment_time": payment_time,
+        "payment_datetime": combine_payment_datetime(payment_date, payment_time),
+        "store_name": store_name,
+        "store_address": store_address,
+        "total_amount": total_amount,
+        "receipt_result_raw": result or None,
+    }, None
+
+
+def save_receipts(ocr: dict, image_sha256: str = "", user=None) -> tuple[list, list]:
+    # OCR 응답에서 images[].receipt만 저장
+    images = ocr.get("images") or []
+    if not images:
+        raise ReceiptPipelineError("OCR 응답에 images가 없습니다.", status=200, ocr=ocr)
+
+    rows = []
+    skipped = []
+
+    for img in images:
+        fields, skip = parse_receipt_image(img)
+        if skip is not None:
+            skipped.append(skip)
+            # 주소 필수 검증: 없으면 즉시 실패 반환
+            if skip["reason"] == "NO_ADDRESS":
+                raise ReceiptPipelineError(
+                    "영수증에서 주소를 추출하지 못했습니다.",
+                    status=400,
+                    image_uid=skip["image_uid"],
+                    skipped=skipped,
+                )
+            continue
+
+        # 헤더 저장 (원본 JSON은 압축해서 별도 테이블에)
+        raw = fields.pop("receipt_result_raw")
+        row = Receipt.objects.create(user=user, image_sha256=image_sha256, **fields)
+        if raw:
+            ReceiptRawPayload.build(row.id, raw).save(force_insert=True)
+        rows.append(row)
+
+    return rows, skipped
+
+
+def run_receipt_pipeline(
+    jpeg_bytes: bytes, new_name: str, image_sha256: str | None = None, uploaded: bool = False, user=None,
+    skip_cache: bool = False,
+) -> tuple[dict, int, list]:
+    """
+    변환된 JPEG로 OCR -> 파싱/저장 -> S3 업로드까지 수행. 같은 JPEG의 결과가 캐시에 있으면 그대로 반환.
+    S3 업로드는 OCR 호출과 동시에 시작하고, OCR/저장이 실패하면 업로드를 취소하거나 지운다 (업로드가 실패하면 저장한 영수증을 지움).
+    uploaded=True면 클라이언트가 이미 S3에 올린 사진이므로 다시 올리지 않는다.
+    skip_cache=True면 호출한 쪽에서 이미 캐시를 확인한 것이므로 다시 조회하지 않는다.
+    (응답 body, HTTP status, 저장된 Receipt 목록)을 반환하고, 단계 실패는 ReceiptPipelineError로 올린다.
+    """
+    if image_sha256 is None:
+        image_sha256 = jpeg_digest(jpeg_bytes)
+    if not skip_cache:
+        cached = find_cached_result(image_sha256, user=user)
+        if cached is not None:
+            return cached, 200, []
+
+    started = time.perf_counter()
+    s3_name = f"{uuid.uuid4().hex}_{new_name}"  # receipt/{uuid}_{new_name}
+    upload = None if uploaded else _s3_executor.submit(_timed_upload, jpeg_bytes, s3_name)
+
+    try:
+        ocr_started = time.perf_counter()
+        ocr = call_ocr(jpeg_bytes, new_name)
+        ocr_ms = (time.perf_counter() - ocr_started) * 1000
+        _observe_ocr([(jpeg_bytes, new_name)], ocr_ms)
+        rows, skipped = save_receipts(ocr, image_sha256=image_sha256, user=user)
+    except Exception:
+        if upload is not None:
+            _discard_upload(upload, s3_name)
+        raise
+
+    s3_ms = 0.0
+    if upload is not None:
+        try:
+            _, s3_ms = upload.result()
+        except Exception as e:
+            # 사진 없는 영수증이 남지 않도록 방금 저장한 행을 지우고 502
+            Receipt.objects.filter(pk__in=[r.pk for r in rows]).delete()
+            raise ReceiptPipelineError(f"S3 업로드 실패: {e}", status=502)
+
+    resp_saved = serialize_with_matches(rows, fresh=True)
+    body = {
+        "saved": resp_saved,
+        "skipped": skipped,
+        # OCR과 S3가 겹쳤다면 total_ms < ocr_ms + s3_ms
+        "timings": {
+            "ocr_ms": round(ocr_ms, 1),
+            "s3_ms": round(s3_ms, 1),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+    }
+    return body, (201 if rows else 200), rows
+
+
+# 배치 업로드에서 OCR 호출을 동시에 보내는 스레드 풀 (프로세스 공용, 크기 제한)
+_ocr_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "RECEIPT_OCR_CONCURRENCY", 4),
+    thread_name_prefix="receipt-ocr",
+)
+
+def _timed_ocr(images: list[tuple[bytes, str]]) -> dict:
+    started = time.perf_counter()
+    ocr = call_ocr_images(images)
+    _observe_ocr(images, (time.perf_counter() - started) * 1000)
+    return ocr
+
+def _ocr_chunks(items: list, size: int) -> list[list]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def run_receipt_batch(images: list[tuple[bytes, str]], user=None) -> tuple[list[dict], list]:
+    """
+    변환된 JPEG 여러 장을 한 번에 처리. 캐시에 있는 사진은 건너뛰고, 나머지는
+    RECEIPT_OCR_IMAGES_PER_CALL장씩 묶어 OCR을 동시에 호출한 뒤 Receipt를 한 트랜잭션으로 저장 (가능하면 bulk_create).
+    이미지 하나의 실패가 나머지에 영향을 주지 않도록 결과는 이미지별로 돌려준다.
+    (입력 순서대로의 결과 목록, 저장된 Receipt 목록)
+    """
+    results = [None] * len(images)
+    pending = []  # (index, jpeg, OCR 요청용 이름, sha256)
+    for i, (jpeg_bytes, new_name) in enumerate(images):
+        image_sha256 = jpeg_digest(jpeg_bytes)
+        cached = find_cached_result(image_sha256, user=user)
+        if cached is not None:
+            results[i] = {"status": "cached", **cached}
+            continue
+        # 같은 파일명이 섞여 와도 응답을 구분할 수 있게 순번을 붙임
+        pending.append((i, jpeg_bytes, f"{i}_{new_name}", image_sha256))
+
+    if not pending:
+        return results, []
+
+    uploads = {}
+    for i, jpeg_bytes, ocr_name, _ in pending:
+        s3_name = f"{uuid.uuid4().hex}_{ocr_name}"
+        uploads[i] = (_s3_executor.submit(_timed_upload, jpeg_bytes, s3_name), s3_name)
+
+    chunks = _ocr_chunks(pending, getattr(settings, "RECEIPT_OCR_IMAGES_PER_CALL", 1))
+    calls = [_ocr_executor.submit(_timed_ocr, [(jpeg, name) for _, jpeg, name, _ in chunk]) for chunk in chunks]
+
+    to_create = []  # (index, Receipt, 원본 JSON)
+    for chunk, call in zip(chunks, calls):
+        try:
+            ocr = call.result()
+        except ReceiptPipelineError as e:
+            for i, *_ in chunk:
+                results[i] = {"status": "error", **e.body}
+            continue
+
+        # 응답 images는 요청 순서를 따르지만, name이 있으면 name으로 맞춤
+        ocr_images = ocr.get("images") or []
+        by_name = {img.get("name"): img for img in ocr_images if img.get("name")}
+        for pos, (i, _, ocr_name, image_sha256) in enumerate(chunk):
+            img = by_name.get(ocr_name) or (ocr_images[pos] if pos < len(ocr_images) else None)
+            if img is None:
+                results[i] = {"status": "error", "detail": "OCR 응답에 images가 없습니다."}
+                continue
+            fields, skip = parse_receipt_image(img)
+            if skip is not None:
+                results[i] = {"status": "skipped", "saved": [], "skipped": [skip]}
+                continue
+            raw = fields.pop("receipt_result_raw")
+            to_create.append((i, Receipt(user=user, image_sha256=image_sha256, **fields), raw))
+
+    # 저장하지 않을 사진의 업로드는 정리, 저장할 사진은 업로드 완료 확인 후에만 저장
+    for i, (upload, s3_name) in uploads.items():
+        if results[i] is not None:
+            _discard_upload(upload, s3_name)
+    ready = []
+    for i, receipt, raw in to_create:
+        upload, s3_name = uploads[i]
+        try:
+            upload.result()
+        except Exception as e:
+            results[i] = {"status": "error", "detail": f"S3 업로드 실패: {e}"}
+            continue
+        ready.append((i, receipt, raw))
+
+    if not ready:
+        return results, []
+
+    rows = [receipt for _, receipt, _ in ready]
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Receipt.objects.bulk_create(rows)
+        else:
+            # MySQL 등은 bulk_create가 pk를 채워주지 않으므로 한 건씩 INSERT (커밋은 한 번)
+            for receipt in rows:
+                receipt.save(force_insert=True)
+        ReceiptRawPayload.objects.bulk_create(
+            [ReceiptRawPayload.build(row.id, raw) for row, (_, _, raw) in zip(rows, ready) if raw]
+        )
+    for (i, _, _), item in zip(ready, serialize_with_matches(rows, fresh=True)):
+        results[i] = {"status": "saved", "saved": [item], "skipped": []}
+    return results, rows
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.views import add_reward
+from .models import Receipt
+
+
+def credit_receipt_reward(receipt_id: int, user, candidate: dict | None) -> dict:
+    """
+    매칭된 점포 점수가 기준(RECEIPT_REWARD_MIN_SCORE) 이상이면 포인트를 적립하고 영수증에 지급 기록을 남긴다.
+    영수증 행을 잠근 채 한 트랜잭션에서 처리하므로 같은 영수증으로 두 번 적립되지 않는다.
+    같은 가게/결제 시각/금액의 영수증을 다른 사진으로 다시 올려도 적립하지 않는다.
+    """
+    threshold = settings.RECEIPT_REWARD_MIN_SCORE
+    if candidate is None:
+        return {"credited": False, "reason": "NO_STORE_MATCH"}
+    if candidate["score"] < threshold:
+        return {"credited": False, "reason": "LOW_MATCH_SCORE", "score": candidate["score"], "threshold": threshold}
+
+    points = settings.RECEIPT_REWARD_POINTS
+    with transaction.atomic():
+        receipt = Receipt.objects.select_for_update().get(pk=receipt_id)
+        if receipt.user_id != user.pk:
+            return {"credited": False, "reason": "NOT_OWNER"}
+        if receipt.rewarded_at is not None:
+            return {"credited": False, "reason": "ALREADY_REWARDED", "rewarded_at": receipt.rewarded_at}
+
+        if receipt.payment_datetime is not None:
+            duplicate = Receipt.objects.filter(
+                user_id=user.pk,
+                rewarded_at__isnull=False,
+                payment_datetime=receipt.payment_datetime,
+                total_amount=receipt.total_amount,
+                store_matches__rank=1,
+                store_matches__store_id=candidate["store_id"],
+            ).exclude(pk=receipt.pk)
+            if duplicate.exists():
+                return {"credited": False, "reason": "DUPLICATE_RECEIPT"}
+
+        try:
+            result = add_reward(
+                user_id=user.pk,
+                delta=points,
+                caption=f"영수증 인증 - {candidate.get('store_name') or ''}".strip(" -"),
+            )
+        except ValidationError as e:
+            return {"credited": False, "reason": "REWARD_FAILED", "detail": str(e)}
+
+        receipt.rewarded_at = timezone.now()
+        receipt.reward_history_id = result["history_id"]
+        receipt.save(update_fields=["rewarded_at", "reward_history", "updated"])
+
+    return {
+        "credited": True,
+        "delta": result["changed"],
+        "balance": result["balance"],
+        "history_id": result["history_id"],
+    }
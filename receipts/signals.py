@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from stores.models import Store
+from .matching import store_address_index
+
+
+# 점포가 바뀌면 주소 색인을 점포 단위로 갱신
+@receiver(post_save, sender=Store)
+def reindex_store_on_save(sender, instance, **kwargs):
+    store_address_index.upsert(instance)
+
+
+@receiver(post_delete, sender=Store)
+def unindex_store_on_delete(sender, instance, **kwargs):
+    store_address_index.remove(instance.store_id)
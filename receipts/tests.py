@@ -1,3 +1,463 @@
-from django.test import TestCase
+import io
+import json
+import random
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from accounts.models import RewardHistory, User
+from markets.models import Market
+from stores.catalog import invalidate_catalog
+from stores.models import Store
+
+from .address import normalize_address
+from .fields import parse_date, parse_number, parse_time
+from .management.commands.bench_address_index import synthetic_rows
+from .management.commands.bench_receipt_fields import (
+    SAMPLES_PATH, _mutations, _same, legacy_parse_date, legacy_parse_number, legacy_parse_time,
+)
+from .address import parse_address
+from .matching import BOUND_POOL_LIMIT, BatchStoreMatcher, StoreAddressIndex, best_of_store, match_entries
+from .management.commands import run_receipt_jobs
+from .models import Receipt, ReceiptJob
+from .pipeline import find_cached_result
+
+
+def _ranked(candidates):
+    # 점포, 점수, 선택된 주소 종류만 비교
+    return [(c["store_id"], round(c["score"], 6), c["select_type"]) for c in candidates]
+
+
+class StoreMatchEquivalenceTests(SimpleTestCase):
+    # match_entries / top_matches가 best_of_store를 돌린 결과와 같은지 (DB 미사용, 합성 점포)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.rows = synthetic_rows(1000)
+        cls.index = StoreAddressIndex()
+        cls.index.rebuild(cls.rows)
+        cls.stores = [SimpleNamespace(**row) for row in cls.rows]
+        cls._brute = {}
+
+    def brute_force(self, norm_addr, k):
+        if norm_addr not in self._brute:
+            scored = (best_of_store(norm_addr, s) for s in self.stores)
+            self._brute[norm_addr] = _ranked(sorted(scored, key=lambda c: (-c["score"], c["id"])))
+        return self._brute[norm_addr][:k]
+
+    def pool_brute_force(self, norm_addr, k):
+        # top_matches가 보는 후보(n-gram 후보 + 계층 색인 가지)에만 best_of_store
+        pool = {e.store_id: e for e in self.index.shortlist(norm_addr, limit=BOUND_POOL_LIMIT)}
+        pool.update((e.store_id, e) for e in self.index.resolve(parse_address(norm_addr)) or [])
+        scored = (best_of_store(norm_addr, e) for e in pool.values())
+        return _ranked(sorted(scored, key=lambda c: (-c["score"], c["id"]))[:k])
+
+    def realistic_queries(self):
+        # OCR로 읽힌 영수증 주소처럼 실제 점포 주소를 조금 흐트러뜨린 것
+        rng = random.Random(7)
+        out = []
+        for _ in range(25):
+            row = rng.choice(self.rows)
+            addr = row["road_address"] if rng.random() < 0.5 else row["street_address"]
+            parts = addr.split()
+            out.extend([
+                addr,
+                f"({addr.replace('서울특별시', '서울')} 1층)",  # 약칭 + 괄호/층수
+                addr[:-1] + "9",                                # 번지 오타
+                " ".join(parts[1:3]),                           # 구 + 로/동만
+            ])
+        return out
+
+    def queries(self):
+        rng = random.Random(11)
+        noise = ["".join(rng.choice("서울종로구창경궁로동가길123-") for _ in range(rng.randrange(1, 20))) for _ in range(20)]
+        return ["", "서울특별시"] + self.realistic_queries() + noise
+
+    def test_match_entries_over_all_stores_equals_best_of_store(self):
+        entries = self.index.entries()
+        queries = [normalize_address(q) for q in self.queries()]
+        for norm_addr, got in zip(queries, match_entries(queries, entries, k=5)):
+            with self.subTest(addr=norm_addr):
+                self.assertEqual(_ranked(got), self.brute_force(norm_addr, 5))
+
+    def test_top_matches_equals_best_of_store(self):
+        for k in (1, 5, 20):
+            for query in self.realistic_queries():
+                with self.subTest(addr=query, k=k):
+                    got = self.index.top_matches(query, k=k)
+                    self.assertEqual(_ranked(got), self.brute_force(normalize_address(query), k))
+
+    def test_top_matches_equals_best_of_store_over_candidates(self):
+        for k in (1, 5, 20):
+            for query in self.queries():
+                with self.subTest(addr=query, k=k):
+                    got = self.index.top_matches(query, k=k)
+                    self.assertEqual(_ranked(got), self.pool_brute_force(normalize_address(query), k))
+
+    def test_score_bounds_never_below_actual_score(self):
+        for query in self.queries():
+            norm_addr = normalize_address(query)
+            entries, bound = self.index.score_bounds(norm_addr)
+            for entry, upper in zip(entries, bound):
+                score = best_of_store(norm_addr, entry)["score"]
+                self.assertLessEqual(score, upper + 1e-9, msg=f"{query!r} store={entry.store_id}")
+
+
+class ExactMatchFillTests(TestCase):
+    # 주소가 정확히 일치해도 후보는 k개: 정확 일치 점포가 맨 앞, 나머지는 퍼지 점수 순
+
+    def setUp(self):
+        market = Market.objects.create(market_name="광장시장")
+        for i in range(8):
+            Store.objects.create(
+                market=market,
+                store_name=f"가게{i}",
+                road_address=f"서울 종로구 창경궁로 {80 + i}",
+                street_address=f"서울 종로구 예지동 {i + 1}-1",
+                store_english="store",
+            )
+        self.exact = Store.objects.get(store_name="가게3")
+        # 다른 테스트가 전역 색인에 남긴 점포와 섞이지 않도록 새 색인으로
+        self.matcher = BatchStoreMatcher(StoreAddressIndex())
+
+    def test_match_one_fills_k_after_exact_hit(self):
+        got = self.matcher.match_one(self.exact.road_address, k=5)
+        self.assertEqual(len(got), 5)
+        self.assertEqual(got[0]["store_id"], self.exact.store_id)
+        self.assertEqual(got[0]["score"], 100.0)
+        self.assertEqual(len({c["store_id"] for c in got}), 5)
+        self.assertEqual([c["score"] for c in got[1:]], sorted((c["score"] for c in got[1:]), reverse=True))
+
+    def test_match_many_fills_k_after_exact_hit(self):
+        got = self.matcher.match_many([self.exact.road_address, self.exact.street_address, "서울 종로구"], k=5)
+        self.assertEqual([len(cands) for cands in got], [5, 5, 5])
+        self.assertEqual(got[0][0]["store_id"], self.exact.store_id)
+        self.assertEqual(got[1][0]["store_id"], self.exact.store_id)
+        self.assertEqual(got[1][0]["select_type"], "number")
+        self.assertEqual(got[0], self.matcher.match_one(self.exact.road_address, k=5))
+
+
+class CatalogSyncTests(TestCase):
+    # 다른 프로세스(= 공유 버전을 보는 다른 색인)의 점포 변경은 바뀐 점포만 다시 읽어 반영
+
+    def setUp(self):
+        self.market = Market.objects.create(market_name="광장시장")
+        self.store = self.create_store(1)
+        self.writer = StoreAddressIndex(track_catalog=True)
+        self.reader = StoreAddressIndex(track_catalog=True)
+        self.writer.ensure_loaded()
+        self.reader.ensure_loaded()
+
+    def create_store(self, i):
+        return Store.objects.create(
+            market=self.market,
+            store_name=f"가게{i}",
+            road_address=f"서울 종로구 창경궁로 {i}",
+            street_address=f"서울 종로구 예지동 {i}-1",
+            store_english="store",
+        )
+
+    def ids(self, index):
+        return [e.store_id for e in index.entries()]
+
+    def test_store_change_is_reloaded_without_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            added = self.create_store(2)
+            self.writer.upsert(added)
+        with mock.patch.object(self.reader, "rebuild", side_effect=AssertionError("full rebuild")):
+            self.reader.ensure_loaded()
+            self.assertIn(added.store_id, self.ids(self.reader))
+            self.assertEqual(self.reader.top_matches(added.road_address, k=1)[0]["store_id"], added.store_id)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                store_id = added.store_id
+                added.delete()
+                self.writer.remove(store_id)
+            self.reader.ensure_loaded()
+            self.assertNotIn(store_id, self.ids(self.reader))
+
+    def test_bulk_change_rebuilds(self):
+        Store.objects.filter(pk=self.store.pk).update(store_name="새 이름")
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_catalog()
+        self.reader.ensure_loaded()
+        self.assertEqual(self.reader.entries()[0].store_name, "새 이름")
+
+
+class OcrCacheScopeTests(TestCase):
+    # 같은 사진을 다시 올렸을 때의 OCR 결과 재사용은 올린 본인 영수증에서만
+
+    def setUp(self):
+        self.owner = User.objects.create(email="owner@example.com", username="owner")
+        self.other = User.objects.create(email="other@example.com", username="other")
+        self.sha = "a" * 64
+        self.receipt = Receipt.objects.create(user=self.owner, image_uid="uid-1", image_sha256=self.sha)
+
+    def test_owner_gets_cached_result(self):
+        cached = find_cached_result(self.sha, user=self.owner)
+        self.assertIsNotNone(cached)
+        self.assertTrue(cached["cached"])
+        self.assertEqual([r["id"] for r in cached["saved"]], [self.receipt.id])
+
+    def test_other_user_does_not_see_owner_receipt(self):
+        self.assertIsNone(find_cached_result(self.sha, user=self.other))
+
+        mine = Receipt.objects.create(user=self.other, image_uid="uid-2", image_sha256=self.sha)
+        cached = find_cached_result(self.sha, user=self.other)
+        self.assertEqual([r["id"] for r in cached["saved"]], [mine.id])
+
+    def test_unknown_digest_misses(self):
+        self.assertIsNone(find_cached_result("b" * 64, user=self.owner))
+        self.assertIsNone(find_cached_result("", user=self.owner))
+
+    @override_settings(RECEIPT_OCR_CACHE_TTL=0)
+    def test_disabled_cache_misses(self):
+        self.assertIsNone(find_cached_result(self.sha, user=self.owner))
+
+
+class _OcrResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+def _ocr_result(address):
+    return {
+        "paymentInfo": {
+            "date": {"formatted": {"year": "2025", "month": "08", "day": "15"}},
+            "time": {"formatted": {"hour": "10", "minute": "01", "second": "02"}},
+        },
+        "storeInfo": {"name": {"text": "가게"}, "addresses": [{"text": address}]},
+        "totalPrice": {"price": {"text": "5,000원"}},
+    }
+
+
+def _receipt_image():
+    buf = io.BytesIO()
+    Image.new("RGB", (800, 1200), (random.randint(0, 255), 40, 40)).save(buf, "JPEG")
+    return SimpleUploadedFile("receipt.jpg", buf.getvalue(), "image/jpeg")
+
+
+@override_settings(X_OCR_URL="http://ocr.test")
+class IdempotentRewardTests(TestCase):
+    # 같은 Idempotency-Key로 재시도하면 저장된 첫 응답을 돌려주고 포인트는 한 번만 적립
+
+    def setUp(self):
+        market = Market.objects.create(market_name="광장시장")
+        self.store = Store.objects.create(
+            market=market,
+            store_name="가게",
+            road_address="서울 종로구 창경궁로 88",
+            street_address="서울 종로구 예지동 6-1",
+            store_english="store",
+        )
+        self.user = User.objects.create(email="reward@example.com", username="reward")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ocr_calls = 0
+        self.image = _receipt_image().read()  # 재시도는 같은 사진을 다시 보냄
+
+    def fake_ocr(self, *args, **kwargs):
+        self.ocr_calls += 1
+        result = _ocr_result(self.store.road_address)
+        return _OcrResponse({"images": [{"uid": f"uid-{self.ocr_calls}", "receipt": {"result": result}}]})
+
+    def verify(self, key, image=None):
+        upload = SimpleUploadedFile("receipt.jpg", image or self.image, "image/jpeg")
+        with mock.patch("requests.Session.post", self.fake_ocr), \
+                mock.patch("boto3.client", return_value=mock.MagicMock()):
+            return self.client.post(
+                "/receipt/verify/", {"file": upload}, format="multipart", HTTP_IDEMPOTENCY_KEY=key,
+            )
+
+    def test_verify_replay_does_not_credit_twice(self):
+        first = self.verify("verify-1")
+        self.assertEqual(first.status_code, 201, first.data)
+        self.assertTrue(first.data["reward"]["credited"])
+
+        replay = self.verify("verify-1")
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.headers.get("Idempotent-Replayed"), "true")
+        self.assertEqual(replay.json()["reward"]["history_id"], first.data["reward"]["history_id"])
+
+        self.assertEqual(self.ocr_calls, 1)
+        self.assertEqual(Receipt.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(RewardHistory.objects.filter(user=self.user).count(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.reward_count, settings.RECEIPT_REWARD_POINTS)
+
+    def test_reward_replay_does_not_credit_twice(self):
+        for _ in range(2):
+            response = self.client.post(
+                "/account/reward/", {"delta": 10, "caption": "test"}, format="json", HTTP_IDEMPOTENCY_KEY="reward-1",
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get("Idempotent-Replayed"), "true")
+        self.assertEqual(RewardHistory.objects.filter(user=self.user).count(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.reward_count, 10)
+
+    def test_key_reused_on_other_path_is_rejected(self):
+        self.client.post("/account/reward/", {"delta": 10, "caption": "test"}, format="json", HTTP_IDEMPOTENCY_KEY="k")
+        response = self.verify("k")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.ocr_calls, 0)
+
+    def test_key_reused_with_other_body_is_rejected(self):
+        first = self.verify("verify-2")
+        self.assertEqual(first.status_code, 201, first.data)
+        other = Image.new("RGB", (800, 1200), (0, 0, 255))
+        buf = io.BytesIO()
+        other.save(buf, "JPEG")
+        response = self.verify("verify-2", image=buf.getvalue())
+        self.assertEqual(response.status_code, 422)
+        self.assertNotIn("Idempotent-Replayed", response.headers)
+        self.assertEqual(self.ocr_calls, 1)
+
+        post = lambda body: self.client.post("/account/reward/", body, format="json", HTTP_IDEMPOTENCY_KEY="reward-2")
+        self.assertEqual(post({"delta": 10, "caption": "test"}).status_code, 200)
+        self.assertEqual(post({"caption": "test", "delta": 10}).headers.get("Idempotent-Replayed"), "true")
+        self.assertEqual(post({"delta": 1000, "caption": "test"}).status_code, 422)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.reward_count, settings.RECEIPT_REWARD_POINTS + 10)
+
+
+class ReceiptFieldParserTests(SimpleTestCase):
+    # 정규식 파서가 기존 구현(strptime/replace)과 같은 값을 내는지 (샘플 + 흔든 변형)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.samples = json.loads(SAMPLES_PATH.read_text(encoding="utf-8"))
+        cls.rng = random.Random(0)
+
+    def assertSameAsLegacy(self, legacy, parser, values):
+        for value in values:
+            with self.subTest(value=value):
+                expected, actual = legacy(value), parser(value)
+                self.assertTrue(_same(expected, actual), f"old={expected!r} new={actual!r}")
+
+    def text_variants(self, key):
+        values = [None, {}, {"text": ""}, {"formatted": {}}]
+        for sample in self.samples:
+            obj = sample.get(key) or {}
+            values.append(obj)
+            values.append({"text": obj.get("text")})
+            if obj.get("text"):
+                values.extend({"text": t} for t in _mutations(obj["text"], self.rng, 100))
+        return values
+
+    def test_parse_date_matches_legacy(self):
+        extra = [
+            {"formatted": {"year": "2025", "month": "02", "day": "30"}, "text": "2025.02.28"},
+            {"text": " 2025-8-1 "},
+            {"text": "2025.08.14."},
+            {"text": "20250814"},
+        ]
+        self.assertSameAsLegacy(legacy_parse_date, parse_date, self.text_variants("date") + extra)
+
+    def test_parse_time_matches_legacy(self):
+        extra = [
+            {"formatted": {"hour": "24", "minute": "00", "second": "00"}, "text": "23:59:59"},
+            {"formatted": {"hour": "9", "minute": "5", "second": "0"}},
+            {"text": "9:5:7"},
+            {"text": "18:59"},
+            {"text": "1 8 : 5 9 : 2 9"},
+        ]
+        self.assertSameAsLegacy(legacy_parse_time, parse_time, self.text_variants("time") + extra)
+
+    def test_parse_number_matches_legacy(self):
+        values = [None, "", "  ", 0, 12, 3.5, "(1,000원)", "₩ 12,000", "USD 3.50", "$-1", "1e3", "nan", "inf", "1_000", "-"]
+        for sample in self.samples:
+            price = sample.get("price")
+            values.append(price)
+            if isinstance(price, str) and price:
+                values.extend(_mutations(price, self.rng, 100))
+        self.assertSameAsLegacy(legacy_parse_number, parse_number, values)
+
+
+class ReceiptJobWorkerTests(TestCase):
+    # 작업 워커: OCR/S3 호출 중에는 트랜잭션을 열지 않고, 재시도해도 영수증을 중복 저장하지 않음
+
+    def setUp(self):
+        market = Market.objects.create(market_name="광장시장")
+        self.store = Store.objects.create(
+            market=market,
+            store_name="가게",
+            road_address="서울 종로구 창경궁로 88",
+            street_address="서울 종로구 예지동 6-1",
+            store_english="store",
+        )
+        self.user = User.objects.create(email="job@example.com", username="job")
+        self.job = ReceiptJob.objects.create(user=self.user, image=_receipt_image().read(), filename="r.jpg")
+        self.ocr_calls = 0
+        self.atomic_depth = []
+        patcher = mock.patch("requests.Session.post", self.fake_ocr)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("receipts.pipeline.upload_receipt_to_s3", return_value="https://s3.test/r.jpg")
+        self.upload = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_ocr(self, *args, **kwargs):
+        self.ocr_calls += 1
+        self.atomic_depth.append(len(connection.atomic_blocks))
+        result = _ocr_result(self.store.road_address)
+        return _OcrResponse({"images": [{"uid": f"uid-{self.ocr_calls}", "receipt": {"result": result}}]})
+
+    def run_next(self):
+        job = run_receipt_jobs.claim_next_job()
+        self.assertIsNotNone(job)
+        depth = len(connection.atomic_blocks)  # 테스트 자체의 트랜잭션
+        run_receipt_jobs.process_job(job)
+        self.assertEqual(self.atomic_depth[-1], depth)  # OCR 호출 중 워커가 연 트랜잭션 없음
+        job.refresh_from_db()
+        return job
+
+    def test_job_saves_receipt(self):
+        job = self.run_next()
+        self.assertEqual(job.status, ReceiptJob.STATUS_DONE)
+        self.assertEqual(job.http_status, 201)
+        self.assertEqual(list(Receipt.objects.filter(user=self.user).values_list("id", flat=True)), [job.receipt_id])
+        self.assertEqual(bytes(job.image), b"")
+
+    def test_retry_after_crash_reuses_saved_receipt(self):
+        # 영수증 저장 후 결과 기록 전에 워커가 죽은 경우
+        with mock.patch.object(run_receipt_jobs, "finish_job", side_effect=RuntimeError("worker died")):
+            with self.assertRaises(RuntimeError):
+                self.run_next()
+        saved = list(Receipt.objects.filter(user=self.user))
+        self.assertEqual(len(saved), 1)
+
+        # 멈춘 작업은 STALE_SECONDS가 지나면 다시 가져감
+        ReceiptJob.objects.filter(pk=self.job.pk).update(
+            locked_at=timezone.now() - timedelta(seconds=settings.RECEIPT_JOB_STALE_SECONDS + 1),
+        )
+        job = self.run_next()
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.status, ReceiptJob.STATUS_DONE)
+        self.assertEqual(job.receipt_id, saved[0].id)
+        self.assertTrue(job.result["cached"])
+        self.assertEqual(self.ocr_calls, 1)
+        self.assertEqual(Receipt.objects.filter(user=self.user).count(), 1)
+
+    def test_s3_failure_leaves_no_receipt(self):
+        self.upload.side_effect = RuntimeError("s3 down")
+        job = self.run_next()
+        self.assertEqual(job.status, ReceiptJob.STATUS_FAILED)
+        self.assertEqual(job.http_status, 502)
+        self.assertFalse(Receipt.objects.filter(user=self.user).exists())
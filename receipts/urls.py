@@ -3,5 +3,12 @@ from receipts.views import *
 
 urlpatterns = [
     path('', ReceiptView.as_view()),
+    path('verify/', ReceiptVerifyView.as_view()),
+    path('presigned/', GetReceiptPresignedUrlView.as_view()),
+    path('confirm/', ReceiptConfirmView.as_view()),
+    path('batch/', ReceiptBatchView.as_view()),
+    path('history/', ReceiptHistoryView.as_view()),
+    path('jobs/<uuid:job_id>/', ReceiptJobView.as_view()),
     path('match/', ReceiptAddressCompareView.as_view()),
+    path('match/bulk/', ReceiptBulkMatchView.as_view()),
 ]
\ No newline at end of file
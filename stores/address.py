@@ -0,0 +1,32 @@
+import re
+
+
+def normalize_address(addr: str) -> str:
+    if not addr:
+        return ""
+    s = str(addr).strip()
+
+    # 문자열 전체가 괄호로 시작·끝하면 한 겹 벗기기((), [], {})
+    # ex) "(서울 중구 ...)" -> "서울 중구 ..."
+    pairs = [("(", ")"), ("[", "]"), ("{", "}")]
+    changed = True
+    while changed and s:
+        changed = False
+        for left, right in pairs:
+            if len(s) >= 2 and s[0] == left and s[-1] == right:
+                s = s[1:-1].strip()
+                changed = True
+    # 다중 공백 -> 하나
+    s = " ".join(s.split())
+    # 쉼표/마침표만 제거(하이픈은 유지)
+    for ch in [",", "."]:
+        s = s.replace(ch, " ")
+    # 3) 괄호 안의 내용 제거
+    s = re.sub(r"\([^)]*\)", " ", s)  # ()
+    s = re.sub(r"\[[^\]]*\]", " ", s) # []
+    s = re.sub(r"\{[^}]*\}", " ", s)  # {}
+    # 특별시 변환
+    for token in ("서울특별시", "서울시"):
+        s = s.replace(token, "서울")
+    s = " ".join(s.split())
+    return s
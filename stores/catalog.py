@@ -0,0 +1,69 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# 점포 카탈로그 공유 버전
+# - 점포 데이터로 프로세스 로컬 색인/캐시를 만드는 쪽(receipts 주소 색인 등)이 이 값이 바뀌면 다시 만든다
+# - 점포 단위 변경은 버전마다 바뀐 store_id 목록을 남겨, 다른 프로세스가 그 점포만 다시 읽을 수 있게 함
+#   (목록이 없거나 만료된 버전이 끼어 있으면 전체를 다시 읽음)
+# - 버전 키는 기본 캐시에 있으므로 여러 워커가 같은 캐시 백엔드(Redis 등)를 써야 다른 프로세스에도 반영됨
+#   (프로세스별 locmem이면 같은 프로세스 안에서만 반영)
+
+VERSION_KEY = "stores:catalog:ver"
+CHANGES_KEY = "stores:catalog:changes:{}"
+CHANGES_TTL = 60 * 60  # 버전별 변경 점포 목록 보관 시간(초)
+MAX_CATCHUP = 200  # 이보다 많은 버전이 밀려 있으면 변경 목록을 모으지 않고 전체를 다시 읽음
+
+
+def _initial_version() -> int:
+    # 버전 키가 캐시에서 밀려나도 예전 버전 번호로 돌아가지 않도록 시각 기반으로 시작
+    return time.time_ns() // 1000
+
+
+def catalog_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version(store_ids=None) -> int | None:
+    """
+    올린 버전을 반환 (키가 없어 새로 만든 경우 None).
+    store_ids가 있으면 이 버전에서 바뀐 점포로 기록, 없으면 이 버전은 전체 변경으로 취급
+    """
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _initial_version(), timeout=None)
+        return None
+    if store_ids:
+        cache.set(CHANGES_KEY.format(version), sorted(set(store_ids)), timeout=CHANGES_TTL)
+    return version
+
+
+def catalog_changes(since: int, until: int) -> set[int] | None:
+    """
+    since 다음 버전부터 until 버전까지 바뀐 store_id 집합.
+    전체 변경(백필 등)이 끼어 있거나 목록이 만료됐으면 None -> 호출하는 쪽에서 전체를 다시 읽음
+    """
+    if not since or not until or until <= since or until - since > MAX_CATCHUP:
+        return None
+    keys = [CHANGES_KEY.format(v) for v in range(since + 1, until + 1)]
+    found = cache.get_many(keys)
+    if len(found) != len(keys):
+        return None
+    changed = set()
+    for ids in found.values():
+        changed.update(ids)
+    return changed
+
+
+def invalidate_catalog():
+    """
+    커밋 후 공유 버전을 올려 모든 프로세스가 점포 데이터를 다시 읽게 한다.
+    시그널이 나가지 않는 변경(bulk_update, queryset.update, 백필 등) 뒤에 호출.
+    """
+    transaction.on_commit(bump_catalog_version)
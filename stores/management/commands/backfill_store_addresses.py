@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from stores.catalog import invalidate_catalog
+from stores.models import Store
+
+
+class Command(BaseCommand):
+    help = '기존 가게의 정규화 주소(road_address_norm, street_address_norm)를 채웁니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        updated = 0
+        batch = []
+
+        qs = Store.objects.only('store_id', 'road_address', 'street_address', 'road_address_norm', 'street_address_norm')
+        for store in qs.iterator(chunk_size=batch_size):
+            total += 1
+            if store.sync_normalized_addresses():
+                batch.append(store)
+            if len(batch) >= batch_size:
+                Store.objects.bulk_update(batch, ['road_address_norm', 'street_address_norm'])
+                updated += len(batch)
+                batch = []
+        if batch:
+            Store.objects.bulk_update(batch, ['road_address_norm', 'street_address_norm'])
+            updated += len(batch)
+        if updated:
+            # bulk_update는 시그널이 없으므로 다른 프로세스의 주소 색인도 다시 만들도록 버전만 올림
+            invalidate_catalog()
+
+        self.stdout.write(self.style.SUCCESS(f'정규화 주소 갱신 완료: {updated}/{total}개'))
@@ -56,7 +56,8 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.ERROR(f"행 {row_number}: 다음 필드가 누락되었거나 비어있습니다: {', '.join(missing_fields)}. 해당 행을 건너뜁니다."))
                     continue
 
-                Store.objects.get_or_create(
+                # 새 가게는 save()에서 정규화 주소가 채워지고, 기존 가게는 비어있거나 낡았으면 갱신
+                store, created = Store.objects.get_or_create(
                     road_address=row['road_address'],
                     defaults={
                         'market': market_obj,
@@ -67,6 +68,8 @@ class Command(BaseCommand):
                         'store_image': row.get('store_image', '')
                     }
                 )
+                if not created and store.sync_normalized_addresses():
+                    store.save(update_fields=['road_address_norm', 'street_address_norm'])
             self.stdout.write(self.style.SUCCESS('가게 데이터 불러오기 성공.'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'오류가 발생했습니다: {e}'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0002_alter_store_category_alter_store_market'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='road_address_norm',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='store',
+            name='street_address_norm',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from markets.models import Market
+from .address import normalize_address
 
 class Store(models.Model):
     store_id = models.AutoField(primary_key=True)
@@ -12,6 +13,10 @@ class Store(models.Model):
     store_english = models.CharField(max_length=40)
     store_image = models.CharField(max_length=255, null=True, blank=True) 
 
+    # 주소 매칭용 정규화 주소 (save 시 자동 갱신)
+    road_address_norm = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    street_address_norm = models.CharField(max_length=100, blank=True, default='', db_index=True)
+
     class Meta:
         db_table = "store"
         verbose_name = "가게"
@@ -19,3 +24,19 @@ class Store(models.Model):
 
     def __str__(self):
         return f"{self.store_name} ({self.category})"
+
+    def sync_normalized_addresses(self) -> bool:
+        # 정규화 주소를 원본 주소에 맞춰 갱신, 바뀌었으면 True
+        road_norm = normalize_address(self.road_address)[:100]
+        street_norm = normalize_address(self.street_address)[:100]
+        changed = (road_norm, street_norm) != (self.road_address_norm, self.street_address_norm)
+        self.road_address_norm = road_norm
+        self.street_address_norm = street_norm
+        return changed
+
+    def save(self, *args, **kwargs):
+        self.sync_normalized_addresses()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"road_address", "street_address"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"road_address_norm", "street_address_norm"}
+        super().save(*args, **kwargs)